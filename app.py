@@ -1,10 +1,6 @@
 import os
 import streamlit as st
 
-from services.db import ensure_exam_tables
-
-ensure_exam_tables()
-
 # MUST be the first Streamlit command
 st.set_page_config(
     page_title="Chumcred Academy LMS",
@@ -13,8 +9,13 @@ st.set_page_config(
 )
 
 # Imports AFTER set_page_config
-from services.db import init_db, read_conn
-from services.auth import login_user
+from services.db import init_db
+from services.migrations import start_backfills
+from services.blocklist import block_reason
+from services.auth import login_user, sync_session_cookie
+from services.certificate_jobs import start_certificate_worker
+from services.password_policy import work_factor
+from services.write_queue import start_write_queue
 from ui.admin import admin_router
 from ui.student import student_router
 from ui.landing import render_landing_page
@@ -38,9 +39,13 @@ def _env_health_checks():
 
 
 # ----------------------------------------------------
-# 1. INITIALIZE DATABASE
+# 1. INITIALIZE DATABASE (runs once per process, not per rerun)
 # ----------------------------------------------------
 init_db()
+start_backfills()  # file hashing/linking for old rows, outside the startup transaction
+start_certificate_worker()
+work_factor()  # calibrate bcrypt cost once per process, not on first login
+start_write_queue()  # one writer thread for hot writes (LMS_WRITE_QUEUE=0 disables)
 
 # ----------------------------------------------------
 # 2. SESSION INITIALIZATION
@@ -118,39 +123,23 @@ if not user.get("role") or not user.get("username"):
     st.session_state.user = None
     st.rerun()
 
+# Session cookie queued at login (lets a page reload skip the password)
+sync_session_cookie()
+
 # ----------------------------------------------------
-# 5. BLOCK / UNBLOCK ENFORCEMENT (kept as-is)
+# 5. BLOCK / UNBLOCK ENFORCEMENT
 # ----------------------------------------------------
+# In-memory blocked set (services/blocklist.py): no SQL on most reruns
 try:
-    with read_conn() as conn:
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-
-        # Option A: is_blocked column
-        if "is_blocked" in cols:
-            row = conn.execute(
-                "SELECT is_blocked, blocked_reason FROM users WHERE id = ?",
-                (user.get("id"),)
-            ).fetchone()
-
-            if row and int(row[0] or 0) == 1:
-                st.error("🚫 Your account has been blocked. Please contact the administrator.")
-                if len(row) > 1 and row[1]:
-                    st.caption(f"Reason: {row[1]}")
-                st.stop()
-
-        # Option B: status column
-        elif "status" in cols:
-            row = conn.execute(
-                "SELECT status FROM users WHERE id = ?",
-                (user.get("id"),)
-            ).fetchone()
-
-            if row and str(row[0] or "").strip().lower() == "blocked":
-                st.error("🚫 Your account has been blocked. Please contact the administrator.")
-                st.stop()
-
+    reason = block_reason(user.get("id"))
 except Exception:
-    pass
+    reason = None
+
+if reason is not None:
+    st.error("🚫 Your account has been blocked. Please contact the administrator.")
+    if reason:
+        st.caption(f"Reason: {reason}")
+    st.stop()
 
 # ----------------------------------------------------
 # 6. ROLE-BASED ROUTING
@@ -0,0 +1,31 @@
+# benchmarks/bench_bcrypt.py
+#
+# Milliseconds per bcrypt hash at each allowed cost on this machine, and
+# the cost services/password_policy.py would calibrate to.
+#
+#   python benchmarks/bench_bcrypt.py [target_ms]
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services import password_policy  # noqa: E402
+
+
+def main():
+    target = float(sys.argv[1]) if len(sys.argv) > 1 else password_policy.BCRYPT_TARGET_MS
+
+    print(f"{'cost':>4}  {'ms/hash':>9}  {'hashes/s':>9}")
+    for rounds in range(password_policy.MIN_ROUNDS, password_policy.MAX_ROUNDS + 1):
+        ms = password_policy.measure_ms(rounds, samples=3 if rounds <= 12 else 1)
+        print(f"{rounds:>4}  {ms:9.1f}  {1000 / ms:9.1f}")
+
+    print(f"calibrated cost for {target:.0f} ms target: {password_policy.calibrate(target)}")
+    if password_policy.BCRYPT_ROUNDS:
+        print(f"LMS_BCRYPT_ROUNDS pins the cost to {password_policy.work_factor()}")
+
+
+if __name__ == "__main__":
+    main()
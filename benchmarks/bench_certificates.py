@@ -0,0 +1,62 @@
+# benchmarks/bench_certificates.py
+#
+# Certificates/second: old per-certificate background decode vs the
+# cached template page + overlay path in services/certificates.py.
+#
+#   python benchmarks/bench_certificates.py [count]
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+TMP = tempfile.mkdtemp(prefix="lms_bench_cert_")
+os.environ.setdefault("LMS_DB_PATH", os.path.join(TMP, "bench.db"))
+os.environ.setdefault("LMS_UPLOAD_PATH", os.path.join(TMP, "uploads"))
+
+from reportlab.lib.pagesizes import A4, landscape  # noqa: E402
+from reportlab.lib.utils import ImageReader  # noqa: E402
+from reportlab.pdfgen import canvas  # noqa: E402
+
+from services import certificates  # noqa: E402
+
+
+def _build_uncached(full_name: str, out_path: str) -> None:
+    """The pre-cache behaviour: resolve + decode + embed the PNG every time."""
+    w, h = landscape(A4)
+    c = canvas.Canvas(out_path, pagesize=(w, h))
+    bg_path = certificates._resolve_bg_path()
+    c.drawImage(ImageReader(bg_path), 0, 0, width=w, height=h, mask="auto")
+    certificates._draw_static_text(c, w, h)
+    certificates._draw_personal_text(c, w, h, full_name, bg_path)
+    c.showPage()
+    c.save()
+
+
+def _run(label: str, build, count: int) -> float:
+    t0 = time.perf_counter()
+    for i in range(count):
+        build(f"Benchmark Student {i}", os.path.join(TMP, f"{label}_{i}.pdf"))
+    elapsed = time.perf_counter() - t0
+    rate = count / elapsed if elapsed else float("inf")
+    print(f"{label:<10} {count:>5} certs  {elapsed:8.2f}s  {rate:8.1f} certs/s")
+    return rate
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    # Warm the cache so "after" measures steady state
+    certificates._build_certificate_pdf("Warmup", os.path.join(TMP, "warmup.pdf"))
+
+    before = _run("before", _build_uncached, count)
+    after = _run("after", certificates._build_certificate_pdf, count)
+    print(f"speedup    {after / before:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
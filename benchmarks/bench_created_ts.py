@@ -0,0 +1,113 @@
+# benchmarks/bench_created_ts.py
+#
+# datetime(created_at) filtering/sorting vs the indexed created_ts column
+# on a synthetic support_tickets / broadcasts table (default 1,000,000 rows).
+#
+#   python benchmarks/bench_created_ts.py [rows]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="lms_bench_ts_")
+os.environ["LMS_DB_PATH"] = os.path.join(TMP, "bench.db")
+os.environ.setdefault("LMS_UPLOAD_PATH", os.path.join(TMP, "uploads"))
+os.environ.setdefault("LMS_BCRYPT_ROUNDS", "4")
+
+from services.db import get_conn, init_db  # noqa: E402
+
+USERS = 5000
+REPEAT = 20
+
+
+def _stamp(ts: float, i: int) -> str:
+    # Same mix the app writes: ISO 'T' (utcnow().isoformat()) and 'YYYY-MM-DD HH:MM:SS'
+    if i % 2:
+        return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(ts)) + ".%06d" % (i % 1000000)
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(ts))
+
+
+def _fill(conn, rows: int) -> None:
+    now = time.time()
+    rnd = random.Random(42)
+
+    def tickets():
+        for i in range(rows):
+            uid = rnd.randrange(1, USERS)
+            yield (uid, f"user{uid}", "subject", "message", "open", _stamp(now - rnd.random() * 365 * 86400, i))
+
+    def broadcasts():
+        for i in range(rows):
+            yield ("title", "message", rnd.random() < 0.5, _stamp(now - rnd.random() * 365 * 86400, i))
+
+    conn.executemany(
+        "INSERT INTO support_tickets (user_id, username, subject, message, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        tickets(),
+    )
+    conn.executemany(
+        "INSERT INTO broadcasts (title, message, active, created_at) VALUES (?, ?, ?, ?)",
+        broadcasts(),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def _time(conn, sql: str, params=()) -> float:
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - t0) * 1000 / REPEAT
+
+
+CASES = [
+    (
+        "student tickets",
+        "SELECT * FROM support_tickets WHERE user_id = ? ORDER BY datetime(created_at) DESC LIMIT 20",
+        "SELECT * FROM support_tickets WHERE user_id = ? ORDER BY created_ts DESC, id DESC LIMIT 20",
+        lambda: (42,),
+        lambda: (42,),
+    ),
+    (
+        "admin tickets",
+        "SELECT * FROM support_tickets ORDER BY datetime(created_at) DESC LIMIT 500",
+        "SELECT * FROM support_tickets ORDER BY created_ts DESC, id DESC LIMIT 500",
+        lambda: (),
+        lambda: (),
+    ),
+    (
+        "active broadcasts",
+        "SELECT * FROM broadcasts WHERE active = 1 AND datetime(created_at) >= datetime('now', '-3 days') "
+        "ORDER BY created_at DESC",
+        "SELECT * FROM broadcasts WHERE active = 1 AND created_ts >= ? ORDER BY created_ts DESC, id DESC",
+        lambda: (),
+        lambda: (int(time.time()) - 3 * 86400,),
+    ),
+]
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    init_db()
+    conn = get_conn()
+
+    t0 = time.perf_counter()
+    _fill(conn, rows)
+    print(f"seeded {rows:,} tickets + {rows:,} broadcasts in {time.perf_counter() - t0:.1f}s\n")
+
+    print(f"{'query':<18} {'datetime()':>12} {'created_ts':>12} {'speedup':>9}")
+    for label, old_sql, new_sql, old_params, new_params in CASES:
+        before = _time(conn, old_sql, old_params())
+        after = _time(conn, new_sql, new_params())
+        print(f"{label:<18} {before:10.2f}ms {after:10.2f}ms {before / after:8.1f}x")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
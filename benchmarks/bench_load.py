@@ -0,0 +1,367 @@
+# benchmarks/bench_load.py
+#
+# Deadline-day load test: N simulated students hammer the service layer
+# (login, dashboard/progress reads, assignment upload, week completion,
+# support ticket, certificate) against a throwaway SQLite DB filled with
+# synthetic data. Reports p50/p95/p99 per operation, lock timeouts,
+# shed logins, throughput and peak memory.
+#
+#   python benchmarks/bench_load.py [--users 50] [--rounds 3] [--students 500]
+#                                  [--mode threads|processes] [--processes 4]
+#                                  [--cert-ratio 0.05] [--json]
+#
+# --mode processes runs --processes app processes (each with its own write
+# queue and connection pool) sharing one DB, like several Streamlit replicas.
+# Set LMS_WRITE_QUEUE=0 to compare against plain write_txn() writes.
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PASSWORD = "load-test-pass"
+PDF_BYTES = b"%PDF-1.4\n" + b"0" * 64 * 1024 + b"\n%%EOF\n"  # ~64 KB upload
+
+OPS = ("login", "dashboard", "progress", "upload", "complete_week", "ticket", "certificate")
+
+
+class _Busy(Exception):
+    """Login shed by the bounded bcrypt queue (services/login_security)."""
+
+
+class _Upload(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile (getbuffer() + name)."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+# ==================================================
+# ENVIRONMENT
+# ==================================================
+def _use_temp_environment() -> str:
+    """
+    Point services.* at a throwaway DB/upload tree. Runs from main() only
+    (never on import), before any service module is loaded; spawned
+    workers inherit the environment and working directory.
+    """
+    os.chdir(ROOT)  # certificate background is a repo-relative asset path
+
+    tmp = os.environ.get("LMS_LOAD_TEST_DIR") or tempfile.mkdtemp(prefix="lms_load_")
+    os.environ["LMS_LOAD_TEST_DIR"] = tmp  # spawned workers reuse the same DB
+    os.environ["LMS_DB_PATH"] = os.path.join(tmp, "load.db")
+    os.environ["LMS_UPLOAD_PATH"] = os.path.join(tmp, "uploads")
+    os.environ["CERT_OUTPUT_DIR"] = os.path.join(tmp, "certificates")
+    os.environ.setdefault("LMS_BCRYPT_ROUNDS", "12")  # policy minimum; real cost is set by calibration
+    return tmp
+
+
+# ==================================================
+# SYNTHETIC DATA
+# ==================================================
+def generate(students: int, seed: int = 42) -> None:
+    """Create `students` students with progress, some graded work and tickets."""
+    from services.db import init_db, write_txn
+    from services.password_policy import hash_password
+    from services.progress import ORIENTATION_WEEK, TOTAL_WEEKS
+
+    init_db()
+    rnd = random.Random(seed)
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    # Everyone shares one password: one hash instead of `students` hashes
+    pw_hash = hash_password(PASSWORD)
+
+    with write_txn() as conn:
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO users (username, full_name, cohort, role, password_hash, active, created_at)
+            VALUES (?, ?, ?, 'student', ?, 1, ?)
+            """,
+            [(f"load{i}", f"Load Student {i}", f"Cohort {i % 4 + 1}", pw_hash, now) for i in range(students)],
+        )
+        ids = [r["id"] for r in conn.execute("SELECT id FROM users WHERE username LIKE 'load%'").fetchall()]
+
+        progress = []
+        graded = []
+        for uid in ids:
+            done = rnd.randint(0, TOTAL_WEEKS)
+            for week in range(ORIENTATION_WEEK, TOTAL_WEEKS + 1):
+                status = "completed" if week < done else ("unlocked" if week == done else "locked")
+                progress.append((uid, week, status, now))
+            for week in range(1, done):
+                graded.append((uid, week, f"/nonexistent/{uid}/week_{week}.pdf", now, rnd.randint(40, 100)))
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO progress (user_id, week, status, override_by_admin, updated_at) VALUES (?, ?, ?, 0, ?)",
+            progress,
+        )
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO assignments (user_id, week, file_path, submitted_at, status, grade)
+            VALUES (?, ?, ?, ?, 'graded', ?)
+            """,
+            graded,
+        )
+        conn.executemany(
+            "INSERT INTO support_tickets (user_id, username, subject, message, status, created_at) VALUES (?, ?, ?, ?, 'open', ?)",
+            [(uid, f"load{uid}", "Synthetic", "Seed ticket", now) for uid in rnd.sample(ids, min(len(ids), students // 5))],
+        )
+
+    print(f"📌 LOAD TEST DB: {os.environ['LMS_DB_PATH']} ({len(ids)} students, {len(graded)} graded assignments)")
+
+
+# ==================================================
+# ONE SIMULATED STUDENT
+# ==================================================
+def _is_lock_error(e: BaseException) -> bool:
+    msg = str(e).lower()
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in msg or "busy" in msg)
+
+
+def _student_session(index: int, rounds: int, cert_ratio: float, seed: int, record) -> None:
+    from services.auth import authenticate
+    from services.assignments import submit_assignment
+    from services.certificates import issue_certificate
+    from services.dashboard import get_dashboard_snapshot
+    from services.progress import get_progress, mark_week_completed
+    from ui.support import _insert_support_ticket
+    from services.write_queue import run_write
+
+    rnd = random.Random(seed + index)
+    username = f"load{index}"
+
+    def timed(op, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            record(op, (time.perf_counter() - t0) * 1000, e)
+            return None
+        record(op, (time.perf_counter() - t0) * 1000, None)
+        return result
+
+    def login():
+        user, error = authenticate(username, PASSWORD, ip=f"10.0.{index // 250}.{index % 250}")
+        if error:
+            raise (_Busy if "busy" in error.lower() else RuntimeError)(error)
+        return user
+
+    for _ in range(rounds):
+        user = timed("login", login)
+        if user is None:
+            continue
+        uid = user["id"]
+        week = rnd.randint(1, 6)
+
+        timed("dashboard", get_dashboard_snapshot, uid)
+        timed("progress", get_progress, uid)
+        timed("upload", submit_assignment, uid, username, week, _Upload(PDF_BYTES, f"week_{week}.pdf"))
+        timed("complete_week", mark_week_completed, uid, week)
+        timed("ticket", run_write, _insert_support_ticket, user, "Deadline question", "Is my upload in?")
+        if rnd.random() < cert_ratio:
+            timed("certificate", issue_certificate, uid, f"Load Student {index}")
+        time.sleep(rnd.uniform(0, 0.05))  # think time
+
+
+def _run_threads(first: int, count: int, rounds: int, cert_ratio: float, seed: int) -> dict:
+    """Run `count` students as threads in this process; return raw samples."""
+    lock = threading.Lock()
+    samples = {op: [] for op in OPS}
+    errors = {op: {"lock": 0, "timeout": 0, "busy": 0, "other": 0} for op in OPS}
+    last_error = {}
+
+    def record(op, ms, err):
+        with lock:
+            samples[op].append(ms)
+            if err is None:
+                return
+            if _is_lock_error(err):
+                errors[op]["lock"] += 1
+            elif isinstance(err, TimeoutError):
+                errors[op]["timeout"] += 1
+            elif isinstance(err, _Busy):
+                errors[op]["busy"] += 1
+            else:
+                errors[op]["other"] += 1
+            last_error[op] = f"{type(err).__name__}: {err}"
+
+    threads = [
+        threading.Thread(target=_student_session, args=(first + i, rounds, cert_ratio, seed, record))
+        for i in range(count)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    from services.write_queue import write_queue_stats
+
+    return {
+        "samples": samples,
+        "errors": errors,
+        "last_error": last_error,
+        "write_queue": write_queue_stats(),
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+def _process_worker(args) -> dict:
+    return _run_threads(*args)
+
+
+# ==================================================
+# REPORT
+# ==================================================
+def _max_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def _pct(ordered, p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def _merge(parts) -> dict:
+    merged = {
+        "samples": {op: [] for op in OPS},
+        "errors": {op: {"lock": 0, "timeout": 0, "busy": 0, "other": 0} for op in OPS},
+        "last_error": {},
+        "max_rss_mb": 0.0,
+        "write_queue": [],
+    }
+    for part in parts:
+        for op in OPS:
+            merged["samples"][op].extend(part["samples"][op])
+            for kind, n in part["errors"][op].items():
+                merged["errors"][op][kind] += n
+        merged["last_error"].update(part["last_error"])
+        merged["max_rss_mb"] = max(merged["max_rss_mb"], part["max_rss_mb"])
+        merged["write_queue"].append(part["write_queue"])
+    return merged
+
+
+def summarize(merged: dict, elapsed: float) -> dict:
+    ops = {}
+    total = 0
+    for op in OPS:
+        ordered = sorted(merged["samples"][op])
+        if not ordered:
+            continue
+        errs = merged["errors"][op]
+        total += len(ordered)
+        ops[op] = {
+            "count": len(ordered),
+            "p50_ms": _pct(ordered, 50),
+            "p95_ms": _pct(ordered, 95),
+            "p99_ms": _pct(ordered, 99),
+            "max_ms": ordered[-1],
+            "lock_errors": errs["lock"],
+            "timeouts": errs["timeout"],
+            "busy": errs["busy"],
+            "other_errors": errs["other"],
+        }
+
+    return {
+        "elapsed_seconds": elapsed,
+        "operations": total,
+        "ops_per_second": total / elapsed if elapsed else 0.0,
+        "lock_errors": sum(o["lock_errors"] for o in ops.values()),
+        "timeouts": sum(o["timeouts"] for o in ops.values()),
+        "busy": sum(o["busy"] for o in ops.values()),
+        "other_errors": sum(o["other_errors"] for o in ops.values()),
+        "max_rss_mb": merged["max_rss_mb"],
+        "by_operation": ops,
+        "last_error": merged["last_error"],
+        "write_queue": merged["write_queue"],
+    }
+
+
+def _print_report(report: dict, args) -> None:
+    print(
+        f"\n{args.users} students x {args.rounds} round(s), mode={args.mode}, "
+        f"write queue={'off' if os.getenv('LMS_WRITE_QUEUE', '1').strip() == '0' else 'on'}"
+    )
+    print(f"{'operation':<15}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'locked':>8}{'t/o':>6}{'busy':>6}{'other':>7}")
+    for op, s in report["by_operation"].items():
+        print(
+            f"{op:<15}{s['count']:>7}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}"
+            f"{s['max_ms']:>10.1f}{s['lock_errors']:>8}{s['timeouts']:>6}{s['busy']:>6}{s['other_errors']:>7}"
+        )
+    print(
+        f"\n{report['operations']} ops in {report['elapsed_seconds']:.2f}s = {report['ops_per_second']:.1f} ops/s, "
+        f"{report['lock_errors']} lock error(s), {report['timeouts']} timeout(s), "
+        f"{report['busy']} login(s) shed, "
+        f"peak RSS {report['max_rss_mb']:.0f} MB/process"
+    )
+    for wq in report["write_queue"]:
+        if wq.get("batches"):
+            print(
+                f"write queue: {wq['batches']} batches, avg {wq['avg_batch']:.1f} ops, max depth {wq['max_depth']}, "
+                f"commit p95 {wq['commit_p95_ms']:.1f} ms, wait p95 {wq['wait_p95_ms']:.1f} ms"
+            )
+    for op, err in report["last_error"].items():
+        print(f"⚠️ {op}: {err}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent students against a temp DB.")
+    parser.add_argument("--users", type=int, default=50, help="concurrent simulated students")
+    parser.add_argument("--rounds", type=int, default=3, help="sessions per student")
+    parser.add_argument("--students", type=int, default=500, help="synthetic students in the DB")
+    parser.add_argument("--mode", choices=("threads", "processes"), default="threads")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--cert-ratio", type=float, default=0.05, help="share of sessions that request a certificate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    _use_temp_environment()
+    args.students = max(args.students, args.users)
+    generate(args.students, seed=args.seed)
+
+    t0 = time.perf_counter()
+    if args.mode == "threads":
+        parts = [_run_threads(0, args.users, args.rounds, args.cert_ratio, args.seed)]
+    else:
+        procs = max(1, min(args.processes, args.users))
+        step = -(-args.users // procs)
+        jobs = [
+            (first, min(step, args.users - first), args.rounds, args.cert_ratio, args.seed)
+            for first in range(0, args.users, step)
+        ]
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=ctx) as pool:
+            parts = list(pool.map(_process_worker, jobs))
+    elapsed = time.perf_counter() - t0
+
+    report = summarize(_merge(parts), elapsed)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report, args)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/bench_storage_audit.py
+#
+# Storage audit on a synthetic upload tree (default 100,000 files):
+# serial vs threaded os.scandir walk, plus reconcile time.
+#
+#   python benchmarks/bench_storage_audit.py [files] [threads]
+#
+# Each student/week has 3 resubmissions of which only the latest is
+# referenced (the rest are orphans); ~2% of rows point at files that were
+# deleted or moved (the moved half is resolvable: same user/week dir + name).
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="lms_bench_audit_")
+os.environ["LMS_DB_PATH"] = os.path.join(TMP, "bench.db")
+os.environ["LMS_UPLOAD_PATH"] = os.path.join(TMP, "uploads")
+os.environ["CERT_OUTPUT_DIR"] = os.path.join(TMP, "certificates")
+os.environ.setdefault("LMS_BCRYPT_ROUNDS", "4")
+
+from services.db import UPLOAD_ROOT, init_db, write_txn  # noqa: E402
+from services.storage_audit import run_audit, scan_files  # noqa: E402
+
+FILES_PER_WEEK = 3  # resubmissions per student and week
+
+
+def _build(total: int) -> dict:
+    rnd = random.Random(42)
+    base = os.path.join(UPLOAD_ROOT, "assignments")
+    rows = []
+    moved = 0
+    i = 0
+    uid = 0
+
+    while i < total:
+        uid += 1
+        for week in range(1, 7):
+            week_dir = os.path.join(base, str(uid), f"week{week}")
+            os.makedirs(week_dir, exist_ok=True)
+            for n in range(FILES_PER_WEEK):
+                path = os.path.join(week_dir, f"2025010{n}_120000_submission.pdf")
+                with open(path, "wb") as fh:
+                    fh.write(b"%PDF-1.4 bench")
+                i += 1
+            # Only the latest resubmission is referenced; earlier ones are orphans
+            rows.append((uid, week, path, 14))
+
+    for uid, week, path, _ in rows:
+        roll = rnd.random()
+        if roll < 0.01:
+            os.remove(path)  # missing, unresolvable
+        elif roll < 0.02:
+            # missing, resolvable: same week dir + name under another parent
+            target = os.path.join(UPLOAD_ROOT, "restored", str(uid), f"week{week}")
+            os.makedirs(target, exist_ok=True)
+            os.replace(path, os.path.join(target, os.path.basename(path)))
+            moved += 1
+
+    with write_txn() as conn:
+        conn.executemany(
+            "INSERT INTO assignments (user_id, week, file_path, file_size, status) VALUES (?, ?, ?, ?, 'submitted')",
+            rows,
+        )
+
+    return {"rows": len(rows), "moved": moved}
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    init_db()
+    t0 = time.perf_counter()
+    built = _build(total)
+    print(f"📌 Built {total} files / {built['rows']} rows in {time.perf_counter() - t0:.1f}s under {TMP}")
+
+    scan_files([UPLOAD_ROOT], workers=threads)  # warm the dentry cache for a fair comparison
+    for workers in (1, threads):
+        t0 = time.perf_counter()
+        files, dirs = scan_files([UPLOAD_ROOT], workers=workers)
+        print(f"scan  {workers:>2} thread(s): {len(files):>7} files, {dirs:>6} dirs in {time.perf_counter() - t0:6.2f}s")
+
+    report = run_audit(repair=True, workers=threads)
+    print(
+        f"\naudit: {report['elapsed_seconds']:.2f}s total (scan {report['scan_seconds']:.2f}s, "
+        f"reconcile {report['reconcile_seconds']:.2f}s) — {report['missing']} missing, "
+        f"{report['orphaned']} orphaned, {report['mismatched']} mismatched, {report['repaired']} repaired"
+    )
+
+
+if __name__ == "__main__":
+    main()
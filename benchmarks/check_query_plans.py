@@ -0,0 +1,149 @@
+# benchmarks/check_query_plans.py
+#
+# Asserts the hot per-student / per-page queries use an index.
+# Builds a fresh database through the migration layer, then runs
+# EXPLAIN QUERY PLAN on each query. Any full table scan fails the check;
+# a temp B-tree sort is reported but allowed.
+#
+#   python benchmarks/check_query_plans.py      (exit code 1 on failure)
+
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="lms_plans_")
+os.environ["LMS_DB_PATH"] = os.path.join(TMP, "plans.db")
+os.environ.setdefault("LMS_UPLOAD_PATH", os.path.join(TMP, "uploads"))
+os.environ.setdefault("LMS_BCRYPT_ROUNDS", "4")
+
+from services.db import init_db, read_conn  # noqa: E402
+from services.indexes import missing_indexes  # noqa: E402
+
+# (label, sql, params) — keep in step with the queries in services/ and ui/
+HOT_QUERIES = [
+    (
+        "assignment upsert target",
+        "SELECT id FROM assignments WHERE user_id=? AND week=?",
+        (1, 1),
+    ),
+    (
+        "assignments for student",
+        "SELECT * FROM assignments WHERE user_id=? ORDER BY week ASC",
+        (1,),
+    ),
+    (
+        "blob reference count",
+        "SELECT COUNT(*) FROM assignments WHERE file_sha256=?",
+        ("0" * 64,),
+    ),
+    (
+        "review queue first page",
+        "SELECT a.id, u.username FROM assignments a JOIN users u ON u.id = a.user_id "
+        "ORDER BY a.submitted_ts DESC, a.id DESC LIMIT 26",
+        (),
+    ),
+    (
+        "review queue next page",
+        "SELECT a.id, u.username FROM assignments a JOIN users u ON u.id = a.user_id "
+        "WHERE a.week = ? AND a.status = ? AND (a.submitted_ts, a.id) < (?, ?) "
+        "ORDER BY a.submitted_ts DESC, a.id DESC LIMIT 26",
+        (1, "submitted", 1700000000, 10),
+    ),
+    (
+        "certificate eligibility",
+        "SELECT COUNT(*) FROM assignments WHERE user_id=? AND status IN ('approved','graded') AND grade IS NOT NULL",
+        (1,),
+    ),
+    (
+        "latest certificate",
+        "SELECT id, user_id, issued_at, certificate_path, template_version "
+        "FROM certificates WHERE user_id=? ORDER BY id DESC LIMIT 1",
+        (1,),
+    ),
+    (
+        "student progress",
+        "SELECT week, status FROM progress WHERE user_id=?",
+        (1,),
+    ),
+    (
+        "student tickets",
+        "SELECT * FROM support_tickets WHERE user_id=? ORDER BY created_ts DESC, id DESC LIMIT 20",
+        (1,),
+    ),
+    (
+        "admin tickets",
+        "SELECT * FROM support_tickets ORDER BY created_ts DESC, id DESC LIMIT 500",
+        (),
+    ),
+    (
+        "active broadcasts",
+        "SELECT * FROM broadcasts WHERE active=1 AND created_ts >= ? ORDER BY created_ts DESC, id DESC",
+        (0,),
+    ),
+    (
+        "broadcasts with read state",
+        "SELECT b.*, r.read_at FROM broadcasts b "
+        "LEFT JOIN broadcast_reads r ON r.broadcast_id = b.id AND r.user_id = ? "
+        "WHERE b.active = 1 AND b.created_ts >= ? ORDER BY b.created_ts DESC, b.id DESC",
+        (1, 0),
+    ),
+    (
+        "broadcast read check",
+        "SELECT 1 FROM broadcast_reads WHERE broadcast_id=? AND user_id=?",
+        (1, 1),
+    ),
+    (
+        "students by cohort",
+        "SELECT id, username FROM users WHERE role='student' AND cohort=?",
+        ("Cohort 1",),
+    ),
+    (
+        "bulk week status by cohort",
+        "SELECT id FROM users WHERE role = 'student' "
+        "AND (cohort = ? OR (? = 'Cohort 1' AND cohort IS NULL))",
+        ("Cohort 1", "Cohort 1"),
+    ),
+    (
+        "cohort list",
+        "SELECT DISTINCT COALESCE(cohort,'Cohort 1') AS cohort FROM users WHERE role='student' ORDER BY cohort",
+        (),
+    ),
+    (
+        "login lookup",
+        "SELECT id, password_hash, active FROM users WHERE username=?",
+        ("someone",),
+    ),
+]
+
+def _is_full_scan(detail: str) -> bool:
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+
+def main() -> int:
+    init_db()
+    failures = 0
+
+    with read_conn() as conn:
+        missing = missing_indexes(conn)
+        if missing:
+            print("❌ missing indexes:", ", ".join(missing))
+            failures += len(missing)
+
+        for label, sql, params in HOT_QUERIES:
+            plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+            scans = [p for p in plan if _is_full_scan(p)]
+            sorts = [p for p in plan if "TEMP B-TREE" in p]
+
+            mark = "❌" if scans else ("⚠️" if sorts else "✅")
+            print(f"{mark} {label}: {' | '.join(plan)}")
+            failures += bool(scans)
+
+    print(f"\n{len(HOT_QUERIES)} queries, {failures} failure(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
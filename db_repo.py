@@ -1,5 +1,6 @@
 # db_repo.py
 import sqlite3
+import threading
 from typing import Any, Dict, List, Optional
 from config import DB_PATH
 
@@ -9,23 +10,77 @@ def connect():
     conn.row_factory = sqlite3.Row
     return conn
 
+_INIT_DONE = False
+_INIT_LOCK = threading.Lock()
+
+
 def init_db():
-    with connect() as conn:
-        conn.execute("""
-        CREATE TABLE IF NOT EXISTS help_support_tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            created_at TEXT NOT NULL DEFAULT (datetime('now')),
-            student_id TEXT,
-            student_name TEXT,
-            week INTEGER,
-            category TEXT,
-            subject TEXT,
-            message TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'open',
-            admin_reply TEXT
-        );
-        """)
-        conn.commit()
+    """Create/upgrade help_support_tickets once per process."""
+    global _INIT_DONE
+    if _INIT_DONE:
+        return
+
+    with _INIT_LOCK:
+        if _INIT_DONE:
+            return
+
+        with connect() as conn:
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS help_support_tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                student_id TEXT,
+                student_name TEXT,
+                week INTEGER,
+                category TEXT,
+                subject TEXT,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'open',
+                admin_reply TEXT
+            );
+            """)
+
+            # created_ts: sortable/indexable epoch copy of created_at
+            cols = {r[1] for r in conn.execute("PRAGMA table_info(help_support_tickets)")}
+            if "created_ts" not in cols:
+                conn.execute("ALTER TABLE help_support_tickets ADD COLUMN created_ts INTEGER")
+            # Also heals rows whose created_at was edited before the UPDATE trigger existed
+            conn.execute("""
+                UPDATE help_support_tickets
+                SET created_ts = CAST(strftime('%s', created_at) AS INTEGER)
+                WHERE created_ts IS NOT CAST(strftime('%s', created_at) AS INTEGER)
+            """)
+            # Same pair of triggers as services.migrations._add_epoch_column
+            # (this table lives in the config.DB_PATH database, not services.db)
+            conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_help_support_tickets_created_ts
+            AFTER INSERT ON help_support_tickets WHEN NEW.created_ts IS NULL
+            BEGIN
+                UPDATE help_support_tickets
+                SET created_ts = CAST(strftime('%s', NEW.created_at) AS INTEGER)
+                WHERE id = NEW.id;
+            END
+            """)
+            conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_help_support_tickets_created_ts_update
+            AFTER UPDATE OF created_at ON help_support_tickets
+            BEGIN
+                UPDATE help_support_tickets
+                SET created_ts = CAST(strftime('%s', NEW.created_at) AS INTEGER)
+                WHERE id = NEW.id;
+            END
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_help_support_tickets_created_ts "
+                "ON help_support_tickets(created_ts)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_help_support_tickets_status_created_ts "
+                "ON help_support_tickets(status, created_ts)"
+            )
+            conn.commit()
+
+        _INIT_DONE = True
 
 def create_ticket(student_id: str, student_name: str, week: int, category: str, subject: str, message: str) -> int:
     init_db()
@@ -44,13 +99,13 @@ def list_tickets(status: Optional[str] = None, limit: int = 200) -> List[Dict[st
             rows = conn.execute("""
                 SELECT * FROM help_support_tickets
                 WHERE status = ?
-                ORDER BY datetime(created_at) DESC
+                ORDER BY created_ts DESC, id DESC
                 LIMIT ?
             """, (status, limit)).fetchall()
         else:
             rows = conn.execute("""
                 SELECT * FROM help_support_tickets
-                ORDER BY datetime(created_at) DESC
+                ORDER BY created_ts DESC, id DESC
                 LIMIT ?
             """, (limit,)).fetchall()
         return [dict(r) for r in rows]
@@ -1,4 +1,5 @@
 import streamlit as st
+from services.dashboard import invalidate_snapshot
 from services.db import read_conn, write_txn
 from utils.certificate_generator import generate_certificate
 
@@ -32,6 +33,7 @@ def show_exam(user):
                 """,
                 (user_id,)
             )
+        invalidate_snapshot(user_id)
         st.warning("Final exam not yet unlocked by admin.")
         st.stop()
 
@@ -136,6 +138,7 @@ def show_exam(user):
                     """,
                     (score, user_id)
                 )
+            invalidate_snapshot(user_id)
 
             st.success(f"Your Score: {score}/10")
 
@@ -166,6 +169,7 @@ def show_exam(user):
                     """,
                     (user_id,)
                 )
+            invalidate_snapshot(user_id)
 
     with col3:
         if st.button("Back to Dashboard"):
@@ -1,5 +1,5 @@
 from services.db import write_txn
-import bcrypt
+from services.password_policy import hash_many
 
 # 🔧 EDIT THIS LIST
 STUDENTS = [
@@ -9,14 +9,13 @@ STUDENTS = [
     {"username": "Alex Chunedu Chineke", "password": "lmsaicohort104"},
 ]
 
+# Hash up front, in parallel, outside the write transaction
+hashes = hash_many([s["password"] for s in STUDENTS])
+
 with write_txn() as conn:
     cur = conn.cursor()
 
-    for s in STUDENTS:
-        pw_hash = bcrypt.hashpw(
-            s["password"].encode(),
-            bcrypt.gensalt()
-        )
+    for s, pw_hash in zip(STUDENTS, hashes):
 
         cur.execute("""
             INSERT OR IGNORE INTO users
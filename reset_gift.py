@@ -1,10 +1,10 @@
 from services.db import write_txn
-import bcrypt
+from services.password_policy import hash_password
 
 USERNAME = "Gift Nwokoye"   # change if username is different
 NEW_PASSWORD = "GiftN@26"
 
-hashed = bcrypt.hashpw(NEW_PASSWORD.encode(), bcrypt.gensalt())
+hashed = hash_password(NEW_PASSWORD)
 
 with write_txn() as conn:
     cur = conn.cursor()
@@ -1,13 +1,10 @@
-import bcrypt
+from services.password_policy import hash_password
 from services.db import write_txn
 
 USERNAME = "Gift Nwokoye"
 NEW_PASSWORD = "GiftN@26"
 
-hashed = bcrypt.hashpw(
-    NEW_PASSWORD.encode(),
-    bcrypt.gensalt()
-)
+hashed = hash_password(NEW_PASSWORD)
 
 with write_txn() as conn:
     cur = conn.cursor()
@@ -1,5 +1,5 @@
 from services.db import init_db, get_conn
-import bcrypt
+from services.password_policy import hash_password
 
 USERNAME = "Adekunle Adegbie"   # change if your username is different
 NEW_PASSWORD = "1234"    # change to what you want
@@ -9,7 +9,7 @@ def main():
     conn = get_conn()
     cur = conn.cursor()
 
-    pw_hash = bcrypt.hashpw(NEW_PASSWORD.encode("utf-8"), bcrypt.gensalt())
+    pw_hash = hash_password(NEW_PASSWORD)
 
     cur.execute("UPDATE users SET password_hash=?, active=1 WHERE username=?", (pw_hash, USERNAME))
     conn.commit()
@@ -2,15 +2,18 @@
 # services/assignments.py
 # ==================================================
 import os
+import re
 from datetime import datetime
 
-from services.db import read_conn, write_txn
+from services.blob_store import StoredBlob, UploadTooLarge, put_stream
+from services.dashboard import invalidate_snapshot
+from services.db import columns, read_conn, write_txn
+from services.write_queue import run_write
 
 # ==================================================
 # CONFIG
 # ==================================================
 UPLOAD_ROOT = os.getenv("LMS_UPLOAD_PATH", "/app/data/uploads")
-ASSIGNMENT_DIR = os.path.join(UPLOAD_ROOT, "assignments")
 
 print("📌 ASSIGNMENTS DB:", os.getenv("LMS_DB_PATH"))
 print("📌 ASSIGNMENTS UPLOAD:", UPLOAD_ROOT)
@@ -23,14 +26,11 @@ def _now_iso() -> str:
     return datetime.utcnow().isoformat()
 
 
-def _ensure_user_dir(user_id: int) -> str:
-    user_dir = os.path.join(ASSIGNMENT_DIR, str(user_id))
-    os.makedirs(user_dir, exist_ok=True)
-    return user_dir
-
-
-def _assignment_filename(week: int) -> str:
-    return f"week_{int(week)}.pdf"
+def _safe_filename(name: str) -> str:
+    name = (name or "").strip()
+    name = re.sub(r"[^\w\-. ]+", "", name)
+    name = name.replace(" ", "_")
+    return name or "assignment_file"
 
 
 def _grade_to_badge(grade: float) -> str:
@@ -53,43 +53,134 @@ def save_assignment(user_id: int, week: int, uploaded_file) -> None:
     week = int(week)
     user_id = int(user_id)
 
-    os.makedirs(ASSIGNMENT_DIR, exist_ok=True)
-    user_dir = _ensure_user_dir(user_id)
-
-    filename = _assignment_filename(week)
-    file_path = os.path.join(user_dir, filename)
-
     try:
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        blob = put_stream(uploaded_file)
+    except UploadTooLarge:
+        raise
     except Exception as e:
         raise RuntimeError(f"Failed to write uploaded file: {e}") from e
 
     submitted_at = _now_iso()
     original_filename = getattr(uploaded_file, "name", None)
 
-    with write_txn() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO assignments (
-                user_id, week, file_path, submitted_at, original_filename,
-                status, grade, feedback, reviewed_at, reviewed_by
-            )
-            VALUES (?, ?, ?, ?, ?, 'submitted', NULL, NULL, NULL, NULL)
+    run_write(
+        _upsert_assignment, user_id, week, blob.path, blob.sha256, blob.size, submitted_at, original_filename
+    )
+    invalidate_snapshot(user_id)
+
+
+def _upsert_assignment(conn, user_id, week, file_path, file_sha256, file_size, submitted_at, original_filename):
+    """Write-queue op: one submission per (user_id, week)."""
+    conn.execute(
+        """
+        INSERT INTO assignments (
+            user_id, week, file_path, file_sha256, file_size, submitted_at, original_filename,
+            status, grade, feedback, reviewed_at, reviewed_by
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, 'submitted', NULL, NULL, NULL, NULL)
+        ON CONFLICT(user_id, week)
+        DO UPDATE SET
+            file_path=excluded.file_path,
+            file_sha256=excluded.file_sha256,
+            file_size=excluded.file_size,
+            submitted_at=excluded.submitted_at,
+            original_filename=excluded.original_filename,
+            status='submitted',
+            grade=NULL,
+            feedback=NULL,
+            reviewed_at=NULL,
+            reviewed_by=NULL
+        """,
+        (user_id, week, file_path, file_sha256, file_size, submitted_at, original_filename),
+    )
+
+
+def submit_assignment(user_id: int, username: str, week: int, uploaded_file) -> StoredBlob:
+    """
+    Student page submission. Stores the upload, then upserts the row on
+    the writer thread. Fills whichever legacy name/path columns the table
+    has; an earlier grade/feedback is kept until the admin reviews again.
+    """
+    if uploaded_file is None:
+        raise ValueError("No file uploaded.")
+
+    safe_name = _safe_filename(getattr(uploaded_file, "name", None))
+    # Content-addressed: a resubmission replaces the row's reference,
+    # the previous blob is collected by blob_store.gc_orphans()
+    blob = put_stream(uploaded_file)
+    now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    payload = {
+        "user_id": int(user_id),
+        "student_id": int(user_id),
+        "username": username,
+        "student_username": username,
+        "week": int(week),
+        "file_path": blob.path,
+        "file_sha256": blob.sha256,
+        "file_size": blob.size,
+        "path": blob.path,
+        "filename": safe_name,
+        "file_name": safe_name,
+        "original_filename": safe_name,
+        "submitted_at": now_str,
+        "created_at": now_str,
+        "status": "submitted",
+    }
+
+    run_write(_upsert_submission_row, set(columns("assignments")), payload)
+    invalidate_snapshot(int(user_id))
+    return blob
+
+
+def _upsert_submission_row(conn, cols: set, payload: dict) -> None:
+    """Write-queue op: the batch owns the transaction (no commit here)."""
+    usable = {k: v for k, v in payload.items() if k in cols}
+    if not usable:
+        raise RuntimeError("Assignments table schema did not match expected fields.")
+
+    keys = list(usable.keys())
+    placeholders = ", ".join(["?"] * len(keys))
+
+    if "user_id" in usable and "week" in usable:
+        update_keys = [k for k in keys if k not in {"user_id", "week"}]
+        if update_keys:
+            conflict = "DO UPDATE SET " + ", ".join([f"{k}=excluded.{k}" for k in update_keys])
+        else:
+            conflict = "DO NOTHING"
+        conn.execute(
+            f"""
+            INSERT INTO assignments ({', '.join(keys)})
+            VALUES ({placeholders})
             ON CONFLICT(user_id, week)
-            DO UPDATE SET
-                file_path=excluded.file_path,
-                submitted_at=excluded.submitted_at,
-                original_filename=excluded.original_filename,
-                status='submitted',
-                grade=NULL,
-                feedback=NULL,
-                reviewed_at=NULL,
-                reviewed_by=NULL
+            {conflict}
             """,
-            (user_id, week, file_path, submitted_at, original_filename),
+            tuple(usable[k] for k in keys),
         )
+        return
+
+    # fallback delete+insert
+    where = []
+    params = []
+
+    if "user_id" in usable:
+        where.append("user_id = ?")
+        params.append(usable["user_id"])
+    elif "student_id" in usable:
+        where.append("student_id = ?")
+        params.append(usable["student_id"])
+
+    if "week" in usable:
+        where.append("week = ?")
+        params.append(usable["week"])
+
+    if where:
+        conn.execute(f"DELETE FROM assignments WHERE {' AND '.join(where)}", tuple(params))
+
+    conn.execute(
+        f"INSERT INTO assignments ({', '.join(keys)}) VALUES ({placeholders})",
+        tuple(usable[k] for k in keys),
+    )
 
 
 def has_assignment(user_id: int, week: int) -> bool:
@@ -211,6 +302,85 @@ def list_all_assignments():
         ).fetchall()
 
 
+def list_assignments_page(
+    week: int = None,
+    status: str = None,
+    cohort: str = None,
+    ungraded_only: bool = False,
+    after: tuple = None,
+    limit: int = 25,
+):
+    """
+    Keyset-paginated review queue, newest first.
+
+    `after` is the cursor returned by the previous page: (submitted_ts, id)
+    of its last row. submitted_ts is submitted_at as Unix seconds (both
+    timestamp formats in the table parse to it) and is indexed with id.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    where = []
+    params = []
+
+    if week is not None:
+        where.append("a.week = ?")
+        params.append(int(week))
+
+    if status:
+        where.append("a.status = ?")
+        params.append(status)
+
+    if cohort:
+        where.append("COALESCE(u.cohort, 'Cohort 1') = ?")
+        params.append(cohort)
+
+    if ungraded_only:
+        where.append("(a.grade IS NULL OR a.status NOT IN ('approved','graded'))")
+
+    if after:
+        after_ts, after_id = after
+        where.append("(a.submitted_ts, a.id) < (?, ?)")
+        params.extend([int(after_ts or 0), int(after_id)])
+
+    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+    limit = max(1, int(limit))
+
+    with read_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT
+                a.id,
+                a.user_id,
+                u.username,
+                u.cohort,
+                a.week,
+                a.file_path,
+                a.submitted_at,
+                a.submitted_ts,
+                a.original_filename,
+                a.status,
+                a.grade,
+                a.feedback,
+                a.reviewed_at,
+                a.reviewed_by
+            FROM assignments a
+            JOIN users u ON u.id = a.user_id
+            {where_sql}
+            ORDER BY a.submitted_ts DESC, a.id DESC
+            LIMIT ?
+            """,
+            (*params, limit + 1),
+        ).fetchall()
+
+    rows = [dict(r) for r in rows]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = (last["submitted_ts"] or 0, last["id"])
+
+    return rows, next_cursor
+
+
 def list_student_assignments(user_id: int):
     with read_conn() as conn:
         return conn.execute(
@@ -227,6 +397,11 @@ def list_student_assignments(user_id: int):
 
 def review_assignment(assignment_id: int, grade: float, feedback: str, reviewed_by: int = None):
     with write_txn() as conn:
+        row = conn.execute(
+            "SELECT user_id FROM assignments WHERE id=?",
+            (int(assignment_id),),
+        ).fetchone()
+
         conn.execute(
             """
             UPDATE assignments
@@ -246,6 +421,9 @@ def review_assignment(assignment_id: int, grade: float, feedback: str, reviewed_
             ),
         )
 
+    if row and row["user_id"] is not None:
+        invalidate_snapshot(row["user_id"])
+
 
 def can_issue_certificate(user_id: int) -> bool:
     with read_conn() as conn:
@@ -1,6 +1,7 @@
 
 
 # services/auth.py
+import json
 import sqlite3
 from typing import Optional, Any
 
@@ -8,13 +9,26 @@ import streamlit as st
 import bcrypt
 
 from services.db import read_conn, write_txn
+from services.password_policy import hash_password as policy_hash_password
+from services.password_policy import needs_rehash
+from services.login_security import (
+    SESSION_TTL_SECONDS,
+    LoginBusy,
+    client_ip,
+    issue_session_token,
+    record_attempt,
+    resume_session,
+    revoke_session,
+    run_bounded,
+    throttle_wait,
+)
 
 
 # -----------------------------
 # Password helpers (bcrypt) new
 # -----------------------------
 def hash_password(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    return policy_hash_password(password)
 
 
 def _to_bytes(value: Any) -> Optional[bytes]:
@@ -141,23 +155,39 @@ def reset_user_password(username: str, new_password: str) -> None:
 
 
 # -----------------------------
-# Streamlit login/logout
+# Authentication (no Streamlit)
 # -----------------------------
-def login_user():
+def _upgrade_hash(user_id: int, password: str, old_hash: Any) -> Any:
     """
-    Streamlit login form. Returns user dict if authenticated else None.
+    Re-hash at the current work factor after a successful login.
+    Best effort: on a busy pool or a concurrent password change the old
+    hash stays. Returns the hash now stored.
     """
-    with st.form("login_form", clear_on_submit=False):
-        username = st.text_input("Username", placeholder="e.g. admin")
-        password = st.text_input("Password", type="password", placeholder="••••••••")
-        submitted = st.form_submit_button("Login")
+    try:
+        new_hash = run_bounded(hash_password, password)
+    except LoginBusy:
+        return old_hash
 
-    if not submitted:
-        return None
+    with write_txn() as conn:
+        cur = conn.execute(
+            "UPDATE users SET password_hash=? WHERE id=? AND password_hash=?",
+            (new_hash, int(user_id), old_hash),
+        )
+    return new_hash if cur.rowcount else old_hash
 
-    if not username or not password:
-        st.error("Please enter username and password.")
-        return None
+
+def authenticate(username: str, password: str, ip: Optional[str] = None):
+    """
+    Throttled credential check. Returns (user_dict, None) on success,
+    (None, error_message) otherwise.
+    """
+    uname = (username or "").strip()
+    if not uname or not password:
+        return None, "Please enter username and password."
+
+    wait = throttle_wait(uname, ip)
+    if wait:
+        return None, f"Too many failed attempts. Try again in {wait} seconds."
 
     with read_conn() as conn:
         cur = conn.cursor()
@@ -167,36 +197,129 @@ def login_user():
             FROM users
             WHERE username = ?
             """,
-            (username.strip(),),
+            (uname,),
         )
         row = cur.fetchone()
 
     if not row:
-        st.error("Invalid username or password.")
-        return None
+        record_attempt(uname, ip, success=False)
+        return None, "Invalid username or password."
 
     if int(row["active"]) != 1:
-        st.error("Your account is disabled. Please contact admin.")
-        return None
+        return None, "Your account is disabled. Please contact admin."
 
-    if not verify_password(password, row["password_hash"]):
-        st.error("Invalid username or password.")
-        return None
+    try:
+        ok = run_bounded(verify_password, password, row["password_hash"])
+    except LoginBusy:
+        return None, "The server is busy. Please try again in a moment."
+
+    record_attempt(uname, ip, success=ok)
+    if not ok:
+        return None, "Invalid username or password."
 
-    return {
+    password_hash = row["password_hash"]
+    if needs_rehash(password_hash):
+        password_hash = _upgrade_hash(row["id"], password, password_hash)
+
+    user = {
         "id": row["id"],
         "username": row["username"],
         "role": row["role"],
         "cohort": row["cohort"],
     }
+    user["session_token"] = issue_session_token(row["id"], password_hash)
+    return user, None
 
 
-def logout():
-    st.session_state.user = None
-    st.rerun()
+# -----------------------------
+# Streamlit login/logout
+# -----------------------------
+# The session token is a bearer credential: it lives in a SameSite cookie
+# (set from the page, Streamlit has no Set-Cookie API) and in
+# st.session_state, never in the URL. Logout revokes it server-side.
+SESSION_COOKIE = "lms_session"
+LEGACY_SESSION_PARAM = "session"  # older builds put the token in ?session=
+_TOKEN_KEY = "session_token"
+_PENDING_COOKIE_KEY = "_session_cookie_pending"
 
 
-import bcrypt
-from services.db import write_txn
+def _client_ip() -> Optional[str]:
+    try:
+        peer = getattr(st.context, "ip_address", None)
+        return client_ip(st.context.headers, peer if isinstance(peer, str) else None)
+    except Exception:
+        return None
+
+
+def _write_cookie(value: str, max_age: int) -> None:
+    cookie = json.dumps(f"{SESSION_COOKIE}={value}; Max-Age={int(max_age)}; Path=/; SameSite=Strict")
+    st.html(
+        f"<script>document.cookie = {cookie}"
+        " + (location.protocol === 'https:' ? '; Secure' : '');</script>",
+        unsafe_allow_javascript=True,
+    )
+
+
+def sync_session_cookie() -> None:
+    """Store the cookie queued by login_user() (call once per logged-in run)."""
+    pending = st.session_state.pop(_PENDING_COOKIE_KEY, None)
+    if pending is not None:
+        _write_cookie(*pending)
+
+
+def forget_session() -> None:
+    """Revoke this browser's session token and drop its cookie (call on logout)."""
+    token = st.session_state.pop(_TOKEN_KEY, None)
+    if token:
+        try:
+            revoke_session(token)
+        except Exception:
+            pass
+    try:
+        _write_cookie("", 0)
+    except Exception:
+        pass
+
+
+def login_user():
+    """
+    Streamlit login form. Returns user dict if authenticated else None.
+    A valid session cookie logs the user back in without bcrypt.
+    """
+    try:
+        # Never honor (or keep) a token from an old ?session= link
+        st.query_params.pop(LEGACY_SESSION_PARAM, None)
+    except Exception:
+        pass
+
+    token = st.context.cookies.get(SESSION_COOKIE)
+    if token:
+        user = resume_session(token)
+        if user:
+            st.session_state[_TOKEN_KEY] = token
+            return user
+        _write_cookie("", 0)
+
+    with st.form("login_form", clear_on_submit=False):
+        username = st.text_input("Username", placeholder="e.g. admin")
+        password = st.text_input("Password", type="password", placeholder="••••••••")
+        submitted = st.form_submit_button("Login")
+
+    if not submitted:
+        return None
+
+    user, error = authenticate(username, password, ip=_client_ip())
+    if error:
+        st.error(error)
+        return None
 
+    token = user.pop("session_token")
+    st.session_state[_TOKEN_KEY] = token
+    st.session_state[_PENDING_COOKIE_KEY] = (token, SESSION_TTL_SECONDS)
+    return user
 
+
+def logout():
+    forget_session()
+    st.session_state.user = None
+    st.rerun()
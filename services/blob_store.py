@@ -0,0 +1,386 @@
+# ==================================================
+# services/blob_store.py
+# ==================================================
+# Content-addressed storage for assignment uploads.
+#
+# Uploads used to land in two layouts (week_{N}.pdf from save_assignment,
+# {ts}_{name} per resubmission from the student page); resubmissions were
+# never removed and identical files were stored once per upload. Now:
+#
+# - a file is stored ONCE under blobs/ab/cd/<sha256>, whoever uploads it
+# - the hash and size are computed while streaming the upload to disk in
+#   chunks (no getbuffer() copy of the whole file); the temp file is
+#   fsynced and atomically renamed, so a crash never leaves a truncated
+#   blob behind a DB row
+# - uploads over LMS_MAX_UPLOAD_MB are rejected before any byte is copied
+#   when the size is known (UploadedFile.size), else as soon as the stream
+#   passes the cap
+# - assignments.file_sha256 is the reference; a blob no row points at is
+#   an orphan and gc_orphans() deletes it (after a grace period, so an
+#   upload whose row is not committed yet is never collected)
+# - files referenced by existing rows are imported after startup by a
+#   resumable background backfill (services/migrations.start_backfills),
+#   never inside the migration transaction
+#
+# CLI:
+#   python -m services.blob_store gc [--dry-run] [--grace SECONDS]
+#   python -m services.blob_store import [--remove-originals]
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from typing import BinaryIO, NamedTuple, Optional
+
+from services.db import UPLOAD_ROOT, init_db, read_conn, write_txn
+
+# ==================================================
+# CONFIG
+# ==================================================
+BLOB_ROOT = os.getenv("LMS_BLOB_PATH", os.path.join(UPLOAD_ROOT, "blobs"))
+CHUNK_SIZE = 1024 * 1024
+# Keep at or below Streamlit's server.maxUploadSize (200 MB default)
+MAX_UPLOAD_BYTES = int(float(os.getenv("LMS_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+# Orphans younger than this are kept: their row may still be in flight
+GC_GRACE_SECONDS = float(os.getenv("LMS_BLOB_GC_GRACE_SECONDS", "3600"))
+# Rows repointed per write transaction by the legacy import / size backfill
+BACKFILL_BATCH = max(1, int(os.getenv("LMS_BLOB_BACKFILL_BATCH", "200")))
+
+# Same filesystem as the blobs, so the final os.replace() is atomic
+_TMP_DIR = os.path.join(BLOB_ROOT, "tmp")
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class StoredBlob(NamedTuple):
+    sha256: str
+    path: str
+    size: int
+
+
+# ==================================================
+# PATHS
+# ==================================================
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_ROOT, sha256[:2], sha256[2:4], sha256)
+
+
+def is_blob_path(path: Optional[str]) -> bool:
+    if not path:
+        return False
+    return os.path.abspath(path).startswith(os.path.abspath(BLOB_ROOT) + os.sep)
+
+
+def _iter_chunks(src: BinaryIO):
+    if hasattr(src, "seek"):
+        try:
+            src.seek(0)
+        except (OSError, ValueError):
+            pass
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def _fsync_dir(path: str) -> None:
+    """Persist a rename (POSIX only; Windows cannot open directories)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _commit_tmp(tmp_path: str, sha256: str) -> str:
+    """Move a fully written temp file to its content address (dedupe)."""
+    dest = blob_path(sha256)
+    if os.path.exists(dest):
+        os.remove(tmp_path)
+        os.utime(dest)  # fresh mtime keeps it out of the GC grace window
+        return dest
+
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(tmp_path, dest)
+    _fsync_dir(os.path.dirname(dest))
+    return dest
+
+
+def _too_large(limit: int, size: Optional[int] = None) -> UploadTooLarge:
+    mb = f"{limit / 1024 / 1024:.0f} MB"
+    if size is None:
+        return UploadTooLarge(f"File exceeds the {mb} upload limit.")
+    return UploadTooLarge(f"File is {size / 1024 / 1024:.1f} MB; the upload limit is {mb}.")
+
+
+# ==================================================
+# WRITE
+# ==================================================
+def put_stream(src: BinaryIO, max_bytes: Optional[int] = None) -> StoredBlob:
+    """
+    Store a binary stream (e.g. a Streamlit UploadedFile) atomically.
+    Identical content is stored once. Raises UploadTooLarge over the cap
+    (max_bytes=0 disables it).
+    """
+    limit = MAX_UPLOAD_BYTES if max_bytes is None else int(max_bytes)
+    declared = getattr(src, "size", None)
+    if limit and isinstance(declared, int) and declared > limit:
+        raise _too_large(limit, declared)
+
+    os.makedirs(_TMP_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=_TMP_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in _iter_chunks(src):
+                size += len(chunk)
+                if limit and size > limit:
+                    raise _too_large(limit)
+                digest.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        sha256 = digest.hexdigest()
+        return StoredBlob(sha256, _commit_tmp(tmp_path, sha256), size)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in _iter_chunks(fh):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def put_file(path: str) -> StoredBlob:
+    """
+    Store an existing file. Hard-links into the store when possible (no
+    copy, same filesystem); otherwise streams a copy. No size cap.
+    """
+    sha256 = file_sha256(path)
+    size = os.path.getsize(path)
+    dest = blob_path(sha256)
+    if os.path.exists(dest):
+        return StoredBlob(sha256, dest, size)
+
+    os.makedirs(_TMP_DIR, exist_ok=True)
+    tmp_path = os.path.join(_TMP_DIR, f"{sha256}.{os.getpid()}.link")
+    try:
+        os.link(path, tmp_path)
+    except OSError:
+        with open(path, "rb") as fh:
+            return put_stream(fh, max_bytes=0)
+    os.utime(tmp_path)  # a link keeps the old mtime; stay inside the GC grace window
+    return StoredBlob(sha256, _commit_tmp(tmp_path, sha256), size)
+
+
+# ==================================================
+# REFERENCES + GC
+# ==================================================
+def ref_count(sha256: str) -> int:
+    """Assignment rows pointing at this blob."""
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT COUNT(*) AS n FROM assignments WHERE file_sha256 = ?", (sha256,)
+        ).fetchone()
+    return int(row["n"])
+
+
+def _walk_blobs():
+    if not os.path.isdir(BLOB_ROOT):
+        return
+    for top in os.scandir(BLOB_ROOT):
+        if not top.is_dir() or top.name == "tmp":
+            continue
+        for mid in os.scandir(top.path):
+            if not mid.is_dir():
+                continue
+            for entry in os.scandir(mid.path):
+                if entry.is_file():
+                    yield entry
+
+
+def gc_orphans(grace_seconds: Optional[float] = None, dry_run: bool = False) -> dict:
+    """
+    Delete blobs no assignment references, plus abandoned temp files.
+    Only files older than grace_seconds are touched.
+    """
+    grace = GC_GRACE_SECONDS if grace_seconds is None else float(grace_seconds)
+    cutoff = time.time() - grace
+    t0 = time.perf_counter()
+
+    with read_conn() as conn:
+        referenced = {
+            r["file_sha256"]
+            for r in conn.execute(
+                "SELECT DISTINCT file_sha256 FROM assignments WHERE file_sha256 IS NOT NULL"
+            ).fetchall()
+        }
+
+    report = {"blobs": 0, "referenced": 0, "orphans": 0, "deleted": 0, "bytes_freed": 0, "tmp_deleted": 0}
+
+    for entry in _walk_blobs():
+        report["blobs"] += 1
+        if entry.name in referenced:
+            report["referenced"] += 1
+            continue
+
+        st = entry.stat()
+        if st.st_mtime > cutoff:
+            continue
+        report["orphans"] += 1
+        if dry_run:
+            continue
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            continue
+        report["deleted"] += 1
+        report["bytes_freed"] += st.st_size
+
+    if os.path.isdir(_TMP_DIR):
+        for entry in os.scandir(_TMP_DIR):
+            if entry.is_file() and entry.stat().st_mtime <= cutoff and not dry_run:
+                os.remove(entry.path)
+                report["tmp_deleted"] += 1
+
+    report["elapsed_seconds"] = time.perf_counter() - t0
+    return report
+
+
+# ==================================================
+# LEGACY IMPORT + SIZE BACKFILL (run after migrations 15, 16)
+# ==================================================
+# Hashing and linking happen outside any transaction; each batch of row
+# updates is one short write_txn with compare-and-set, so a row changed
+# meanwhile is left alone. Both are safe to re-run: finished rows are
+# skipped, and a blob from an interrupted run is either reused (same
+# content address) or collected by gc_orphans().
+def import_legacy_files(remove_originals: bool = False, batch_size: Optional[int] = None) -> dict:
+    """
+    Move files referenced by assignments rows without file_sha256 into the
+    store and repoint the rows. Missing files are left untouched (reported).
+    """
+    batch_size = max(1, int(batch_size or BACKFILL_BATCH))
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, file_path FROM assignments WHERE file_sha256 IS NULL AND file_path IS NOT NULL"
+        ).fetchall()
+
+    report = {"rows": len(rows), "imported": 0, "missing": 0}
+    pending = []
+    originals = []
+
+    def flush():
+        with write_txn() as conn:
+            for blob, row_id, path in pending:
+                cur = conn.execute(
+                    "UPDATE assignments SET file_path = ?, file_sha256 = ?, file_size = ? "
+                    "WHERE id = ? AND file_sha256 IS NULL AND file_path = ?",
+                    (blob.path, blob.sha256, blob.size, row_id, path),
+                )
+                if cur.rowcount:
+                    report["imported"] += 1
+                    if not is_blob_path(path):
+                        originals.append(path)
+        pending.clear()
+
+    for row in rows:
+        path = row["file_path"]
+        if not path or not os.path.isfile(path):
+            report["missing"] += 1
+            continue
+        pending.append((put_file(path), row["id"], path))
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
+
+    if remove_originals:
+        for path in originals:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    if report["rows"]:
+        print(
+            f"📌 BLOB IMPORT: {report['imported']} file(s) imported, "
+            f"{report['missing']} row(s) with missing files"
+        )
+    return report
+
+
+def backfill_sizes(batch_size: Optional[int] = None) -> int:
+    """file_size for rows already in the store."""
+    batch_size = max(1, int(batch_size or BACKFILL_BATCH))
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, file_sha256 FROM assignments WHERE file_size IS NULL AND file_sha256 IS NOT NULL"
+        ).fetchall()
+
+    updates = []
+    for row in rows:
+        try:
+            updates.append((os.path.getsize(blob_path(row["file_sha256"])), row["id"], row["file_sha256"]))
+        except OSError:
+            continue
+
+    for i in range(0, len(updates), batch_size):
+        with write_txn() as conn:
+            conn.executemany(
+                "UPDATE assignments SET file_size = ? WHERE id = ? AND file_sha256 = ? AND file_size IS NULL",
+                updates[i:i + batch_size],
+            )
+    return len(updates)
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assignment blob store maintenance.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_gc = sub.add_parser("gc", help="delete unreferenced blobs")
+    p_gc.add_argument("--dry-run", action="store_true")
+    p_gc.add_argument("--grace", type=float, default=None, help="seconds (default LMS_BLOB_GC_GRACE_SECONDS)")
+
+    p_imp = sub.add_parser("import", help="import files of rows not in the store yet")
+    p_imp.add_argument("--remove-originals", action="store_true", help="delete legacy files once imported")
+
+    args = parser.parse_args(argv)
+    init_db()
+
+    if args.command == "gc":
+        r = gc_orphans(grace_seconds=args.grace, dry_run=args.dry_run)
+        mode = "DRY RUN — " if args.dry_run else ""
+        print(
+            f"✅ {mode}{r['blobs']} blob(s), {r['referenced']} referenced, {r['orphans']} orphan(s), "
+            f"{r['deleted']} deleted ({r['bytes_freed'] / 1024 / 1024:.1f} MB), "
+            f"{r['tmp_deleted']} temp file(s) removed in {r['elapsed_seconds']:.2f}s"
+        )
+    else:
+        r = import_legacy_files(remove_originals=args.remove_originals)
+        print(f"✅ {r['imported']} imported, {r['missing']} missing of {r['rows']} row(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+# ==================================================
+# services/blocklist.py
+# ==================================================
+# Blocked-student check without SQL on every rerun.
+#
+# app.py used to read users.is_blocked for the logged-in user on every
+# Streamlit rerun. Now the blocked ids live in a process-wide dict:
+#
+# - loaded once, then re-validated at most every RECHECK_SECONDS by
+#   reading ONE counter row (app_counters.blocked_users)
+# - triggers on users bump that counter on any block/unblock, so changes
+#   from other processes or scripts show up within seconds
+# - block_users()/unblock_users() (Admin -> Block / Unblock Students)
+#   update the dict immediately in this process
+#
+# PRAGMA data_version is per connection and the pool hands out many, so a
+# trigger-maintained counter is the reliable change signal here.
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from services.db import read_conn, write_txn
+
+RECHECK_SECONDS = float(os.getenv("LMS_BLOCKLIST_RECHECK_SECONDS", "3"))
+
+COUNTER = "blocked_users"
+
+_LOCK = threading.Lock()
+_BLOCKED: Dict[int, str] = {}  # user_id -> reason ("" if none)
+_VERSION: Optional[int] = None
+_CHECKED_AT = 0.0
+
+
+def _read_counter(conn) -> int:
+    row = conn.execute("SELECT value FROM app_counters WHERE name = ?", (COUNTER,)).fetchone()
+    return int(row["value"]) if row else 0
+
+
+def _refresh(force: bool = False) -> None:
+    global _BLOCKED, _VERSION, _CHECKED_AT
+
+    now = time.monotonic()
+    if not force and _VERSION is not None and now - _CHECKED_AT < RECHECK_SECONDS:
+        return
+
+    with _LOCK:
+        if not force and _VERSION is not None and now - _CHECKED_AT < RECHECK_SECONDS:
+            return
+
+        with read_conn() as conn:
+            version = _read_counter(conn)
+            if force or version != _VERSION:
+                rows = conn.execute(
+                    "SELECT id, COALESCE(blocked_reason, '') AS reason FROM users WHERE is_blocked = 1"
+                ).fetchall()
+                _BLOCKED = {int(r["id"]): r["reason"] for r in rows}
+                _VERSION = version
+
+        _CHECKED_AT = time.monotonic()
+
+
+def block_reason(user_id) -> Optional[str]:
+    """None if the user is not blocked, else the reason ("" if none given)."""
+    if user_id is None:
+        return None
+    _refresh()
+    return _BLOCKED.get(int(user_id))
+
+
+def is_blocked(user_id) -> bool:
+    return block_reason(user_id) is not None
+
+
+def invalidate_blocklist() -> None:
+    """Force a reload on the next check (e.g. after a manual DB edit)."""
+    global _VERSION
+    with _LOCK:
+        _VERSION = None
+
+
+# ==================================================
+# ADMIN ACTIONS
+# ==================================================
+def block_users(user_ids: Iterable[int], reason: str = "") -> int:
+    """Block students; takes effect in this process immediately."""
+    ids = [int(i) for i in user_ids]
+    if not ids:
+        return 0
+
+    placeholders = ",".join("?" * len(ids))
+    with write_txn() as conn:
+        before = _read_counter(conn)
+        cur = conn.execute(
+            f"""
+            UPDATE users
+            SET is_blocked=1, blocked_at=?, blocked_reason=?
+            WHERE role='student' AND id IN ({placeholders})
+            """,
+            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reason, *ids),
+        )
+        changed = cur.rowcount
+        after = _read_counter(conn)
+        blocked = conn.execute(
+            f"SELECT id FROM users WHERE role='student' AND is_blocked=1 AND id IN ({placeholders})",
+            ids,
+        ).fetchall()
+
+    _apply({int(r["id"]): reason or "" for r in blocked}, [], before, after)
+    return changed
+
+
+def unblock_users(user_ids: Iterable[int]) -> int:
+    """Unblock students; takes effect in this process immediately."""
+    ids = [int(i) for i in user_ids]
+    if not ids:
+        return 0
+
+    placeholders = ",".join("?" * len(ids))
+    with write_txn() as conn:
+        before = _read_counter(conn)
+        cur = conn.execute(
+            f"""
+            UPDATE users
+            SET is_blocked=0, blocked_at=NULL, blocked_reason=NULL
+            WHERE role='student' AND id IN ({placeholders})
+            """,
+            ids,
+        )
+        changed = cur.rowcount
+        after = _read_counter(conn)
+
+    _apply({}, ids, before, after)
+    return changed
+
+
+def _apply(blocked: Dict[int, str], unblocked: Iterable[int], before: int, after: int) -> None:
+    """
+    Patch the in-memory set after our own write. `before`/`after` are the
+    counter inside our write transaction; if `before` is not the version we
+    loaded, someone else changed users since -> full reload next check.
+    """
+    global _BLOCKED, _VERSION, _CHECKED_AT
+
+    with _LOCK:
+        if _VERSION is None:
+            return  # not loaded yet; first check loads everything
+
+        updated = dict(_BLOCKED)
+        for uid in unblocked:
+            updated.pop(int(uid), None)
+        updated.update(blocked)
+        _BLOCKED = updated
+
+        _VERSION = after if before == _VERSION else None
+        _CHECKED_AT = time.monotonic()
@@ -1,6 +1,9 @@
 # --------------------------------------------------
 # services/broadcasts.py
 # --------------------------------------------------
+import os
+import threading
+import time
 from datetime import datetime
 from services.db import read_conn, write_txn
 
@@ -14,6 +17,7 @@ def create_broadcast(title, message, admin_id):
             """,
             (title, message, admin_id, datetime.utcnow().isoformat()),
         )
+    _invalidate_unread()
 
 
 def delete_broadcast(broadcast_id):
@@ -22,21 +26,28 @@ def delete_broadcast(broadcast_id):
             "DELETE FROM broadcasts WHERE id = ?",
             (broadcast_id,),
         )
+    _invalidate_unread()
+
+
+ACTIVE_WINDOW_SECONDS = 3 * 24 * 3600
 
 
 def get_active_broadcasts():
     """
     Fetch only active broadcasts from the last 3 days
+    (range on indexed created_ts, not datetime(created_at)).
     """
+    since = int(time.time()) - ACTIVE_WINDOW_SECONDS
     with read_conn() as conn:
         return conn.execute(
             """
             SELECT *
             FROM broadcasts
             WHERE active = 1
-              AND datetime(created_at) >= datetime('now', '-3 days')
-            ORDER BY created_at DESC
-            """
+              AND created_ts >= ?
+            ORDER BY created_ts DESC, id DESC
+            """,
+            (since,),
         ).fetchall()
 
 
@@ -54,12 +65,118 @@ def has_read(broadcast_id, user_id):
 
 
 def mark_as_read(broadcast_id, user_id):
+    mark_many_as_read([broadcast_id], user_id)
+
+
+def mark_many_as_read(broadcast_ids, user_id):
+    """Mark several broadcasts read for one user in one transaction."""
+    ids = sorted({int(b) for b in broadcast_ids})
+    if not ids:
+        return
+
+    read_at = datetime.utcnow().isoformat()
     with write_txn() as conn:
-        conn.execute(
+        conn.executemany(
             """
             INSERT OR IGNORE INTO broadcast_reads
             (broadcast_id, user_id, read_at)
             VALUES (?, ?, ?)
             """,
-            (broadcast_id, user_id, datetime.utcnow().isoformat()),
+            [(b, int(user_id), read_at) for b in ids],
         )
+
+    _invalidate_unread(user_id)
+
+
+# --------------------------------------------------
+# Per-user view (one round-trip)
+# --------------------------------------------------
+def get_broadcasts_for_user(user_id):
+    """
+    Active broadcasts (same window as get_active_broadcasts) as dicts,
+    each with is_read / read_at for this user. Newest first.
+    """
+    since = int(time.time()) - ACTIVE_WINDOW_SECONDS
+    with read_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT b.*,
+                   r.read_at AS read_at,
+                   (r.broadcast_id IS NOT NULL) AS is_read
+            FROM broadcasts b
+            LEFT JOIN broadcast_reads r
+                   ON r.broadcast_id = b.id AND r.user_id = ?
+            WHERE b.active = 1
+              AND b.created_ts >= ?
+            ORDER BY b.created_ts DESC, b.id DESC
+            """,
+            (int(user_id), since),
+        ).fetchall()
+
+    items = [dict(r) for r in rows]
+    for item in items:
+        item["is_read"] = bool(item["is_read"])
+
+    # Free refresh of the badge cache
+    _store_unread(user_id, sum(1 for i in items if not i["is_read"]))
+    return items
+
+
+# --------------------------------------------------
+# Unread badge cache
+# --------------------------------------------------
+# The sidebar badge renders on every rerun; counts are cached per user for
+# UNREAD_CACHE_TTL seconds and dropped on create/delete/mark-read.
+UNREAD_CACHE_TTL = float(os.getenv("LMS_UNREAD_CACHE_TTL", "30"))
+
+_UNREAD_LOCK = threading.Lock()
+_UNREAD = {}          # user_id -> (expires_at, count)
+_UNREAD_GENERATION = 0
+
+
+def _invalidate_unread(user_id=None):
+    global _UNREAD_GENERATION
+    with _UNREAD_LOCK:
+        _UNREAD_GENERATION += 1
+        if user_id is None:
+            _UNREAD.clear()
+        else:
+            _UNREAD.pop(int(user_id), None)
+
+
+def _store_unread(user_id, count, generation=None):
+    if UNREAD_CACHE_TTL <= 0:
+        return
+    with _UNREAD_LOCK:
+        if generation is None or generation == _UNREAD_GENERATION:
+            _UNREAD[int(user_id)] = (time.monotonic() + UNREAD_CACHE_TTL, int(count))
+
+
+def unread_count(user_id):
+    """Number of active broadcasts this user has not read (cached)."""
+    user_id = int(user_id)
+
+    with _UNREAD_LOCK:
+        hit = _UNREAD.get(user_id)
+    if hit and hit[0] > time.monotonic():
+        return hit[1]
+
+    generation = _UNREAD_GENERATION
+    since = int(time.time()) - ACTIVE_WINDOW_SECONDS
+    with read_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT COUNT(*) AS cnt
+            FROM broadcasts b
+            LEFT JOIN broadcast_reads r
+                   ON r.broadcast_id = b.id AND r.user_id = ?
+            WHERE b.active = 1
+              AND b.created_ts >= ?
+              AND r.broadcast_id IS NULL
+            """,
+            (user_id, since),
+        ).fetchone()
+
+    count = int(row["cnt"]) if row else 0
+    _store_unread(user_id, count, generation)
+    return count
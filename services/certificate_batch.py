@@ -0,0 +1,218 @@
+# ==================================================
+# services/certificate_batch.py
+# ==================================================
+# Issue certificates for a whole cohort at once.
+#
+# issue_certificate() is strictly one student at a time. This engine:
+# - selects every student who passes can_issue_certificate (>= 6 approved/
+#   graded assignments with a grade) in ONE query
+# - renders their PDFs in parallel across CPU cores (process pool)
+# - writes all certificates rows in ONE batched transaction
+# - reports throughput and per-student failures
+#
+# Admin page: Admin -> Certificates.  CLI:
+#   python -m services.certificate_batch [--workers N] [--limit N] [--cohort C] [--all]
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from services.certificates import (
+    CERT_TEMPLATE_VERSION,
+    OUTPUT_DIR,
+    _build_certificate_pdf,
+    _ensure_cert_table,
+    _ensure_dir,
+    certificate_facts,
+    certificate_output_path,
+    record_certificate,
+)
+from services.dashboard import invalidate_snapshot
+from services.db import init_db, read_conn, write_txn
+
+REQUIRED_GRADED = 6
+
+
+# ==================================================
+# SELECTION
+# ==================================================
+def eligible_students(cohort: Optional[str] = None, include_current: bool = False) -> List[dict]:
+    """
+    Students with >= 6 approved/graded assignments.
+    By default skips students already holding a current-version certificate.
+    """
+    _ensure_cert_table()
+
+    where = ["u.role = 'student'"]
+    params: list = []
+
+    if cohort:
+        where.append("COALESCE(u.cohort, 'Cohort 1') = ?")
+        params.append(cohort)
+
+    if not include_current:
+        where.append(
+            "COALESCE((SELECT c.template_version FROM certificates c "
+            "WHERE c.user_id = u.id ORDER BY c.id DESC LIMIT 1), '') != ?"
+        )
+        params.append(CERT_TEMPLATE_VERSION)
+
+    with read_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT u.id AS user_id,
+                   COALESCE(NULLIF(TRIM(u.full_name), ''), u.username) AS full_name
+            FROM users u
+            JOIN (
+                SELECT user_id
+                FROM assignments
+                WHERE status IN ('approved','graded') AND grade IS NOT NULL
+                GROUP BY user_id
+                HAVING COUNT(*) >= ?
+            ) g ON g.user_id = u.id
+            WHERE {" AND ".join(where)}
+            ORDER BY u.id
+            """,
+            (REQUIRED_GRADED, *params),
+        ).fetchall()
+
+    return [dict(r) for r in rows]
+
+
+# ==================================================
+# RENDERING (runs in worker processes)
+# ==================================================
+def _render_one(job: Tuple[int, str, str]) -> Tuple[int, Optional[str], Optional[dict], Optional[str]]:
+    user_id, full_name, out_path = job
+    try:
+        path = _build_certificate_pdf(full_name, out_path)
+        return user_id, path, certificate_facts(path), None
+    except Exception as e:
+        return user_id, None, None, str(e)[:500]
+
+
+# ==================================================
+# ENGINE
+# ==================================================
+def issue_certificates_bulk(
+    workers: Optional[int] = None,
+    cohort: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_current: bool = False,
+) -> dict:
+    """
+    Render + record certificates for every eligible student.
+    Returns a report dict (selected/issued/failed/elapsed/per_second).
+    """
+    t0 = time.perf_counter()
+
+    students = eligible_students(cohort=cohort, include_current=include_current)
+    if limit:
+        students = students[: int(limit)]
+
+    report = {
+        "selected": len(students),
+        "issued": 0,
+        "failed": [],
+        "workers": 0,
+        "render_seconds": 0.0,
+        "elapsed_seconds": 0.0,
+        "per_second": 0.0,
+    }
+
+    if not students:
+        report["elapsed_seconds"] = time.perf_counter() - t0
+        return report
+
+    _ensure_dir(OUTPUT_DIR)
+
+    jobs = []
+    for s in students:
+        full_name = (s["full_name"] or "").strip() or "Student"
+        jobs.append((int(s["user_id"]), full_name, certificate_output_path(s["user_id"], full_name)))
+
+    workers = max(1, min(int(workers or os.cpu_count() or 1), len(jobs)))
+    report["workers"] = workers
+
+    # spawn: never fork a multi-threaded Streamlit process
+    t_render = time.perf_counter()
+    results = []
+    if workers == 1:
+        results = [_render_one(j) for j in jobs]
+    else:
+        ctx = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                chunk = max(1, len(jobs) // (workers * 4))
+                results = list(pool.map(_render_one, jobs, chunksize=chunk))
+        except BrokenProcessPool as e:
+            print("⚠️ Certificate process pool failed, rendering serially:", e)
+            report["workers"] = 1
+            results = [_render_one(j) for j in jobs]
+    report["render_seconds"] = time.perf_counter() - t_render
+
+    issued_at = datetime.utcnow().isoformat()
+    rendered = []
+    for user_id, path, facts, error in results:
+        if error or not path:
+            report["failed"].append((user_id, error or "no file produced"))
+            continue
+        rendered.append((user_id, (
+            issued_at, path, CERT_TEMPLATE_VERSION,
+            facts["certificate_key"], facts["file_size"], facts["file_sha256"],
+        )))
+
+    # One transaction for every row. Update-vs-insert is decided inside it
+    # (not at selection time): the background worker may have issued a
+    # certificate for the same student while the pool was rendering.
+    with write_txn() as conn:
+        for user_id, values in rendered:
+            record_certificate(conn, user_id, values)
+
+    invalidate_snapshot()
+
+    report["issued"] = len(rendered)
+    report["elapsed_seconds"] = time.perf_counter() - t0
+    if report["elapsed_seconds"] > 0:
+        report["per_second"] = report["issued"] / report["elapsed_seconds"]
+    return report
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Issue certificates for all eligible students.")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: CPU count)")
+    parser.add_argument("--cohort", default=None, help="only this cohort")
+    parser.add_argument("--limit", type=int, default=None, help="at most N students")
+    parser.add_argument("--all", action="store_true", help="also re-issue current-version certificates")
+    args = parser.parse_args(argv)
+
+    init_db()
+
+    report = issue_certificates_bulk(
+        workers=args.workers,
+        cohort=args.cohort,
+        limit=args.limit,
+        include_current=args.all,
+    )
+
+    print(f"🎓 Selected: {report['selected']}  Issued: {report['issued']}  Failed: {len(report['failed'])}")
+    print(
+        f"⏱ {report['elapsed_seconds']:.2f}s total, {report['render_seconds']:.2f}s rendering "
+        f"on {report['workers']} process(es) — {report['per_second']:.1f} certs/s"
+    )
+    for user_id, error in report["failed"]:
+        print(f"❌ user {user_id}: {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# ==================================================
+# services/certificate_jobs.py
+# ==================================================
+# Background certificate rendering.
+#
+# issue_certificate() renders the ReportLab PDF synchronously, and the
+# student dashboard used to call it on first view whenever
+# CERT_TEMPLATE_VERSION changed — so a template bump made every student's
+# next page load block on PDF rendering. Instead:
+#
+# - requests are written to certificate_jobs (persistent, survives restarts)
+# - worker threads (LMS_CERT_WORKERS, default 1) claim and render them
+# - the UI polls get_latest_job() for status
+# - admins can queue a regeneration for everyone on an old template
+
+from __future__ import annotations
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from services.certificates import CERT_TEMPLATE_VERSION, issue_certificate
+from services.db import read_conn, write_txn
+
+CERT_WORKERS = int(os.getenv("LMS_CERT_WORKERS", "1"))
+POLL_SECONDS = float(os.getenv("LMS_CERT_POLL_SECONDS", "5"))
+
+# A job another process has kept "running" this long is assumed orphaned
+# (that process crashed). This process's own running jobs are requeued at
+# worker startup regardless of age.
+STALE_RUNNING_MINUTES = 10
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat()
+
+
+# ==================================================
+# QUEUE
+# ==================================================
+def enqueue_certificate(user_id: int, full_name: str) -> int:
+    """
+    Queue a (re)render for one student. Returns the job id.
+    An already queued/running job for the student is reused.
+    """
+    user_id = int(user_id)
+    full_name = (full_name or "").strip() or "Student"
+
+    with write_txn() as conn:
+        row = conn.execute(
+            """
+            SELECT id FROM certificate_jobs
+            WHERE user_id = ? AND status IN ('queued','running')
+            ORDER BY id DESC LIMIT 1
+            """,
+            (user_id,),
+        ).fetchone()
+        if row:
+            return int(row["id"])
+
+        cur = conn.execute(
+            """
+            INSERT INTO certificate_jobs (user_id, full_name, template_version, status, created_at)
+            VALUES (?, ?, ?, 'queued', ?)
+            """,
+            (user_id, full_name, CERT_TEMPLATE_VERSION, _now_iso()),
+        )
+        job_id = int(cur.lastrowid)
+
+    _WAKE.set()
+    return job_id
+
+
+def enqueue_regeneration() -> int:
+    """
+    Queue a job for every student whose latest certificate is NOT on the
+    current CERT_TEMPLATE_VERSION. That is exactly the set the worker's
+    issue_certificate() re-renders, so no job finishes as a no-op.
+    One INSERT ... SELECT in one transaction. Returns jobs queued.
+    """
+    with write_txn() as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO certificate_jobs (user_id, full_name, template_version, status, created_at)
+            SELECT u.id,
+                   COALESCE(NULLIF(TRIM(u.full_name), ''), u.username),
+                   ?, 'queued', ?
+            FROM users u
+            JOIN certificates c ON c.id = (
+                SELECT id FROM certificates WHERE user_id = u.id ORDER BY id DESC LIMIT 1
+            )
+            WHERE COALESCE(c.template_version, '') != ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM certificate_jobs j
+                  WHERE j.user_id = u.id AND j.status IN ('queued','running')
+              )
+            """,
+            (CERT_TEMPLATE_VERSION, _now_iso(), CERT_TEMPLATE_VERSION),
+        )
+        queued = max(cur.rowcount, 0)
+
+    if queued:
+        _WAKE.set()
+    return queued
+
+
+def get_latest_job(user_id: int) -> Optional[dict]:
+    with read_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT id, user_id, status, error, certificate_path,
+                   template_version, created_at, started_at, finished_at
+            FROM certificate_jobs
+            WHERE user_id = ?
+            ORDER BY id DESC LIMIT 1
+            """,
+            (int(user_id),),
+        ).fetchone()
+    return dict(row) if row else None
+
+
+def job_counts() -> dict:
+    """{status: count} across all jobs (admin overview)."""
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT status, COUNT(*) AS cnt FROM certificate_jobs GROUP BY status"
+        ).fetchall()
+    return {r["status"]: int(r["cnt"]) for r in rows}
+
+
+# ==================================================
+# WORKER
+# ==================================================
+_WAKE = threading.Event()
+_STARTED = False
+_START_LOCK = threading.Lock()
+
+
+def _claim_next_job() -> Optional[dict]:
+    with write_txn() as conn:
+        row = conn.execute(
+            """
+            SELECT id, user_id, full_name
+            FROM certificate_jobs
+            WHERE status = 'queued'
+            ORDER BY id
+            LIMIT 1
+            """
+        ).fetchone()
+        if not row:
+            return None
+
+        conn.execute(
+            "UPDATE certificate_jobs SET status='running', started_at=? WHERE id=?",
+            (_now_iso(), int(row["id"])),
+        )
+        return dict(row)
+
+
+def _finish_job(job_id: int, status: str, certificate_path: str = None, error: str = None) -> None:
+    with write_txn() as conn:
+        conn.execute(
+            """
+            UPDATE certificate_jobs
+            SET status=?, certificate_path=?, error=?, finished_at=?
+            WHERE id=?
+            """,
+            (status, certificate_path, error, _now_iso(), int(job_id)),
+        )
+
+
+def _requeue_running_jobs(older_than_minutes: Optional[float] = None) -> int:
+    """
+    Put "running" jobs back in the queue. With no age limit every running
+    job is requeued (startup: the workers that claimed them died with the
+    old process; a job a live replica is still rendering just renders
+    twice, and record_certificate keeps one row). With a limit, only jobs
+    started that long ago. Returns jobs requeued.
+    """
+    where = "status='running'"
+    params: tuple = ()
+    if older_than_minutes is not None:
+        cutoff = (datetime.utcnow() - timedelta(minutes=older_than_minutes)).isoformat()
+        where += " AND (started_at IS NULL OR started_at < ?)"
+        params = (cutoff,)
+
+    with write_txn() as conn:
+        cur = conn.execute(f"UPDATE certificate_jobs SET status='queued', started_at=NULL WHERE {where}", params)
+        return max(cur.rowcount, 0)
+
+
+def run_pending_jobs(max_jobs: Optional[int] = None) -> int:
+    """Render queued jobs on the calling thread. Returns jobs processed."""
+    done = 0
+    while max_jobs is None or done < max_jobs:
+        job = _claim_next_job()
+        if job is None:
+            break
+
+        try:
+            path = issue_certificate(job["user_id"], job["full_name"])
+            _finish_job(job["id"], "done", certificate_path=path)
+        except Exception as e:
+            _finish_job(job["id"], "failed", error=str(e)[:500])
+        done += 1
+
+    return done
+
+
+def _worker_loop() -> None:
+    while True:
+        try:
+            _requeue_running_jobs(STALE_RUNNING_MINUTES)
+            run_pending_jobs()
+        except Exception as e:
+            print("⚠️ Certificate worker error:", e)
+
+        _WAKE.wait(POLL_SECONDS)
+        _WAKE.clear()
+
+
+def start_certificate_worker() -> bool:
+    """Start the background workers once per process."""
+    global _STARTED
+
+    if _STARTED or CERT_WORKERS <= 0:
+        return _STARTED
+
+    with _START_LOCK:
+        if _STARTED:
+            return True
+
+        requeued = _requeue_running_jobs()
+        if requeued:
+            print(f"📌 Requeued {requeued} certificate job(s) left running by a restart")
+
+        for i in range(CERT_WORKERS):
+            threading.Thread(
+                target=_worker_loop,
+                name=f"lms-cert-worker-{i}",
+                daemon=True,
+            ).start()
+
+        _STARTED = True
+        return True
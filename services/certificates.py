@@ -1,13 +1,24 @@
+import io
 import os
 import re
+import threading
+import time
 from datetime import datetime
+from typing import Optional
 
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.lib.utils import ImageReader
 
-from services.db import read_conn, write_txn
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # fall back to drawing the cached background per PDF
+    PdfReader = PdfWriter = None
+
+from services.blob_store import file_sha256
+from services.dashboard import invalidate_snapshot
+from services.db import columns, invalidate_schema, read_conn, write_txn
 
 # =========================================================
 # CONFIG
@@ -21,6 +32,9 @@ BG_IMG_PATH = os.getenv("CERT_BG_IMG_PATH", "assets/certificate_bg_blank_v2.png"
 # Old students will auto-regenerate to this new version.
 CERT_TEMPLATE_VERSION = "blank_v2_layout_v1"
 
+# How long "certificate file not found" is remembered before probing again
+RESOLVE_MISS_TTL = float(os.getenv("LMS_CERT_RESOLVE_MISS_TTL", "30"))
+
 # ---- TUNING ----
 NAME_MAX_WIDTH_FRAC = 0.78  # allow slightly longer names
 
@@ -62,11 +76,71 @@ def _resolve_bg_path() -> str:
     raise FileNotFoundError("Blank background not found at assets/certificate_bg_blank_v2.png")
 
 
+# =========================================================
+# BACKGROUND / TEMPLATE CACHE
+# =========================================================
+# The PNG used to be located (several os.path.exists) and decoded +
+# re-embedded for EVERY certificate. Now the resolved path, the decoded
+# ImageReader and a pre-rendered template page (background + static text)
+# are cached per process and rebuilt only when the PNG's mtime changes.
+_BG_LOCK = threading.Lock()
+_BG_CACHE = {}
+
+
+def _background() -> dict:
+    """{"path", "mtime", "reader"} for the current background PNG."""
+    with _BG_LOCK:
+        path = _BG_CACHE.get("path")
+        try:
+            mtime = os.stat(path).st_mtime if path else None
+        except OSError:
+            path = None
+
+        if path is None:
+            path = _resolve_bg_path()
+            mtime = os.stat(path).st_mtime
+
+        if _BG_CACHE.get("path") != path or _BG_CACHE.get("mtime") != mtime:
+            _BG_CACHE.clear()
+            _BG_CACHE.update(path=path, mtime=mtime, reader=ImageReader(path))
+
+        return dict(_BG_CACHE)
+
+
+def _template_pdf_bytes(bg: dict) -> bytes:
+    """One-page PDF with the background + every line that is the same on all certificates."""
+    with _BG_LOCK:
+        cached = _BG_CACHE.get("template")
+        if cached and _BG_CACHE.get("mtime") == bg["mtime"]:
+            return cached
+
+    w, h = landscape(A4)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=(w, h))
+    c.drawImage(bg["reader"], 0, 0, width=w, height=h, mask="auto")
+    _draw_static_text(c, w, h)
+    c.showPage()
+    c.save()
+    data = buf.getvalue()
+
+    with _BG_LOCK:
+        if _BG_CACHE.get("mtime") == bg["mtime"]:
+            _BG_CACHE["template"] = data
+    return data
+
+
 # =========================================================
 # DATABASE
 # =========================================================
+_CERT_COLUMNS = {"user_id", "issued_at", "certificate_path", "template_version"}
+
+
 def _ensure_cert_table():
     """Ensure certificates table exists + required columns (non-destructive)."""
+    # Fast path: cached schema registry, no DB round-trip
+    if _CERT_COLUMNS <= columns("certificates"):
+        return
+
     with write_txn() as conn:
         exists = conn.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='certificates'"
@@ -84,19 +158,44 @@ def _ensure_cert_table():
                 )
                 """
             )
-            conn.commit()
-            return
+        else:
+            cols = [r[1] for r in conn.execute("PRAGMA table_info(certificates)").fetchall()]
+            if "user_id" not in cols:
+                conn.execute("ALTER TABLE certificates ADD COLUMN user_id INTEGER")
+            if "issued_at" not in cols:
+                conn.execute("ALTER TABLE certificates ADD COLUMN issued_at TEXT")
+            if "certificate_path" not in cols:
+                conn.execute("ALTER TABLE certificates ADD COLUMN certificate_path TEXT")
+            if "template_version" not in cols:
+                conn.execute("ALTER TABLE certificates ADD COLUMN template_version TEXT")
+
+    invalidate_schema()
 
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(certificates)").fetchall()]
-        if "user_id" not in cols:
-            conn.execute("ALTER TABLE certificates ADD COLUMN user_id INTEGER")
-        if "issued_at" not in cols:
-            conn.execute("ALTER TABLE certificates ADD COLUMN issued_at TEXT")
-        if "certificate_path" not in cols:
-            conn.execute("ALTER TABLE certificates ADD COLUMN certificate_path TEXT")
-        if "template_version" not in cols:
-            conn.execute("ALTER TABLE certificates ADD COLUMN template_version TEXT")
-        conn.commit()
+
+def record_certificate(conn, user_id: int, values: tuple) -> None:
+    """
+    Point the student's latest certificates row at a new file, or insert
+    the first one. `values` = (issued_at, certificate_path,
+    template_version, certificate_key, file_size, file_sha256).
+    The latest row is looked up HERE, inside the caller's write
+    transaction, so the worker and a bulk run never both insert.
+    """
+    row = conn.execute(
+        "SELECT id FROM certificates WHERE user_id=? ORDER BY id DESC LIMIT 1",
+        (int(user_id),),
+    ).fetchone()
+    if row:
+        conn.execute(
+            "UPDATE certificates SET issued_at=?, certificate_path=?, template_version=?, "
+            "certificate_key=?, file_size=?, file_sha256=? WHERE id=?",
+            (*values, int(row[0])),
+        )
+    else:
+        conn.execute(
+            "INSERT INTO certificates (issued_at, certificate_path, template_version, "
+            "certificate_key, file_size, file_sha256, user_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (*values, int(user_id)),
+        )
 
 
 def has_certificate(user_id: int) -> bool:
@@ -112,8 +211,7 @@ def get_certificate_record(user_id: int):
     with read_conn() as conn:
         cur = conn.cursor()
         cur.execute(
-            "SELECT id, user_id, issued_at, certificate_path, template_version "
-            "FROM certificates WHERE user_id=? ORDER BY id DESC LIMIT 1",
+            "SELECT * FROM certificates WHERE user_id=? ORDER BY id DESC LIMIT 1",
             (int(user_id),),
         )
         row = cur.fetchone()
@@ -121,79 +219,255 @@ def get_certificate_record(user_id: int):
 
 
 # =========================================================
-# PDF GENERATOR
+# CANONICAL STORAGE + RESOLVER
 # =========================================================
-def _build_certificate_pdf(full_name: str, out_path: str) -> str:
+# A certificate is recorded as certificate_key (path relative to
+# OUTPUT_DIR) + file_size + file_sha256 at issue time. resolve_certificate()
+# turns a row into a readable path and caches the answer, so dashboard
+# renders do not stat the filesystem; only a cache miss probes.
+_RESOLVED = {}  # key or raw path -> (abs path or None, resolved_at)
+_RESOLVE_LOCK = threading.Lock()
+_RESOLVE_MAX = 10000
+
+
+def certificate_key(path: str) -> Optional[str]:
+    """Path relative to OUTPUT_DIR ('/' separated), None if outside it."""
+    root = os.path.abspath(OUTPUT_DIR)
+    path = os.path.abspath(path)
+    if not path.startswith(root + os.sep):
+        return None
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def certificate_facts(path: str) -> dict:
+    """Columns recorded for a freshly written certificate file."""
+    return {
+        "certificate_key": certificate_key(path),
+        "file_size": os.path.getsize(path),
+        "file_sha256": file_sha256(path),
+    }
+
+
+def _legacy_candidates(raw_path: str) -> list:
+    """Where rows written before certificate_key may point (old deployments)."""
+    base = os.path.basename(raw_path)
+    return [
+        raw_path,
+        os.path.join(OUTPUT_DIR, base),
+        os.path.join("/app/data", raw_path),
+        os.path.join("/app/data/generated_certificates", base),
+        os.path.join("/app/data/certificates", base),
+        os.path.join(os.getcwd(), raw_path),
+        os.path.join(os.getcwd(), "generated_certificates", base),
+    ]
+
+
+def _locate(rec: dict) -> Optional[str]:
+    key = rec.get("certificate_key")
+    if key:
+        path = os.path.abspath(os.path.join(OUTPUT_DIR, key))
+        return path if os.path.isfile(path) else None
+
+    raw = str(_raw_path(rec) or "").strip()
+    if not raw:
+        return None
+    for candidate in _legacy_candidates(raw):
+        candidate = os.path.abspath(candidate)
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def _raw_path(rec: dict) -> Optional[str]:
+    for k in ("certificate_path", "file_path", "path", "pdf_path"):
+        if rec.get(k):
+            return rec[k]
+    return None
+
+
+def _cache_key(rec: dict) -> Optional[str]:
+    return rec.get("certificate_key") or _raw_path(rec)
+
+
+def resolve_certificate(rec: Optional[dict]) -> Optional[str]:
     """
-    Uses blank PNG background and overlays the missing body lines.
+    Absolute path of a certificate row's file, or None.
+    Hits are cached until invalidated; misses for RESOLVE_MISS_TTL seconds.
     """
-    _ensure_dir(os.path.dirname(out_path))
+    if not rec:
+        return None
+    ck = _cache_key(rec)
+    if not ck:
+        return None
+
+    hit = _RESOLVED.get(ck)
+    if hit is not None:
+        path, at = hit
+        if path is not None or time.monotonic() - at < RESOLVE_MISS_TTL:
+            return path
+
+    path = _locate(rec)
+    with _RESOLVE_LOCK:
+        if len(_RESOLVED) >= _RESOLVE_MAX:
+            _RESOLVED.clear()
+        _RESOLVED[ck] = (path, time.monotonic())
+    return path
+
+
+def invalidate_certificate_cache(rec: Optional[dict] = None) -> None:
+    """Forget one row's resolution (or all), e.g. after a file was removed."""
+    with _RESOLVE_LOCK:
+        if rec is None:
+            _RESOLVED.clear()
+        else:
+            _RESOLVED.pop(_cache_key(rec), None)
 
-    w, h = landscape(A4)
-    c = canvas.Canvas(out_path, pagesize=(w, h))
 
-    # Background
-    bg_path = _resolve_bg_path()
-    bg = ImageReader(bg_path)
-    c.drawImage(bg, 0, 0, width=w, height=h, mask="auto")
+def _remember(key: Optional[str], path: str) -> None:
+    if key:
+        with _RESOLVE_LOCK:
+            _RESOLVED[key] = (os.path.abspath(path), time.monotonic())
 
-    cx = w / 2
 
-    # Colors
-    body_color = (0.10, 0.12, 0.18)   # deep navy
-    muted_color = (0.25, 0.28, 0.35)  # muted navy/grey
+def backfill_certificate_keys(batch_size: int = 200) -> int:
+    """
+    Record key/size/checksum for rows issued before they existed (run in
+    the background after migration 18). Files are hashed with no
+    transaction open; rows are updated in short batches, compare-and-set
+    on certificate_path, and only rows still without a key are picked up.
+    """
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT id, certificate_path FROM certificates "
+            "WHERE certificate_key IS NULL AND certificate_path IS NOT NULL AND certificate_path <> ''"
+        ).fetchall()
+
+    updates = []
+    for row_id, raw in rows:
+        path = _locate({"certificate_path": raw})
+        if path is None:
+            continue
+        facts = certificate_facts(path)
+        updates.append((path, facts["certificate_key"], facts["file_size"], facts["file_sha256"], row_id, raw))
+
+    batch_size = max(1, int(batch_size))
+    for i in range(0, len(updates), batch_size):
+        with write_txn() as conn:
+            conn.executemany(
+                "UPDATE certificates SET certificate_path=?, certificate_key=?, file_size=?, file_sha256=? "
+                "WHERE id=? AND certificate_path=? AND certificate_key IS NULL",
+                updates[i:i + batch_size],
+            )
+    return len(updates)
+
+
+# =========================================================
+# PDF GENERATOR
+# =========================================================
+# Colors
+BODY_COLOR = (0.10, 0.12, 0.18)   # deep navy
+MUTED_COLOR = (0.25, 0.28, 0.35)  # muted navy/grey
+
+
+def _draw_static_text(c, w: float, h: float) -> None:
+    """Lines identical on every certificate (baked into the template page)."""
+    cx = w / 2
 
     # 1) This certifies that
-    c.setFillColorRGB(*muted_color)
+    c.setFillColorRGB(*MUTED_COLOR)
     c.setFont("Helvetica", 18)
     c.drawCentredString(cx, h * 0.56, "This certifies that")
 
-    # 2) Student name
-    name_font = "Helvetica-Bold"
-    max_name_width = w * NAME_MAX_WIDTH_FRAC
-    name_size = _fit_font_size(full_name, name_font, max_size=42, min_size=22, max_width=max_name_width)
-    c.setFillColorRGB(*body_color)
-    c.setFont(name_font, name_size)
-    c.drawCentredString(cx, h * 0.47, full_name)
-
     # 3) Completion statement
-    c.setFillColorRGB(*muted_color)
+    c.setFillColorRGB(*MUTED_COLOR)
     c.setFont("Helvetica", 18)
     c.drawCentredString(cx, h * 0.40, "has successfully completed the AI Essentials Program")
 
     # 4) Academy
-    c.setFillColorRGB(*body_color)
+    c.setFillColorRGB(*BODY_COLOR)
     c.setFont("Helvetica-Bold", 20)
     c.drawCentredString(cx, h * 0.30, "Chumcred Academy")
 
-    # 5) Issued date
-    issued_text = "Issued: " + datetime.now().strftime("%B %d, %Y")
-    c.setFillColorRGB(*muted_color)
-    c.setFont("Helvetica", 16)
-    c.drawCentredString(cx, h * 0.22, issued_text)
-
     # 6) Coordinator
-    c.setFillColorRGB(*body_color)
+    c.setFillColorRGB(*BODY_COLOR)
     c.setFont("Helvetica-Bold", 14)
     c.drawCentredString(cx, h * 0.16, "Dr. Adekunle Adegbie")
 
-    c.setFillColorRGB(*muted_color)
+    c.setFillColorRGB(*MUTED_COLOR)
     c.setFont("Helvetica", 13)
     c.drawCentredString(cx, h * 0.12, "Program Coordinator")
 
+
+def _draw_personal_text(c, w: float, h: float, full_name: str, bg_path: str) -> None:
+    """Lines that change per certificate (the overlay)."""
+    cx = w / 2
+
+    # 2) Student name
+    name_font = "Helvetica-Bold"
+    max_name_width = w * NAME_MAX_WIDTH_FRAC
+    name_size = _fit_font_size(full_name, name_font, max_size=42, min_size=22, max_width=max_name_width)
+    c.setFillColorRGB(*BODY_COLOR)
+    c.setFont(name_font, name_size)
+    c.drawCentredString(cx, h * 0.47, full_name)
+
+    # 5) Issued date
+    issued_text = "Issued: " + datetime.now().strftime("%B %d, %Y")
+    c.setFillColorRGB(*MUTED_COLOR)
+    c.setFont("Helvetica", 16)
+    c.drawCentredString(cx, h * 0.22, issued_text)
+
     # Invisible marker
     c.setFont("Helvetica", 1)
     c.setFillColorRGB(0, 0, 0)
     c.drawString(2, 2, f"CERT_VER={CERT_TEMPLATE_VERSION}|BG={os.path.basename(bg_path)}")
 
+
+def _build_certificate_pdf(full_name: str, out_path: str) -> str:
+    """
+    Uses blank PNG background and overlays the missing body lines.
+    The background + static lines come from the cached template page;
+    only the name/date overlay is rendered per certificate.
+    """
+    _ensure_dir(os.path.dirname(out_path))
+
+    w, h = landscape(A4)
+    bg = _background()
+
+    if PdfReader is None:
+        c = canvas.Canvas(out_path, pagesize=(w, h))
+        c.drawImage(bg["reader"], 0, 0, width=w, height=h, mask="auto")
+        _draw_static_text(c, w, h)
+        _draw_personal_text(c, w, h, full_name, bg["path"])
+        c.showPage()
+        c.save()
+        return os.path.abspath(out_path)
+
+    overlay = io.BytesIO()
+    c = canvas.Canvas(overlay, pagesize=(w, h))
+    _draw_personal_text(c, w, h, full_name, bg["path"])
     c.showPage()
     c.save()
+
+    # Merge on the writer's copy (pypdf deprecates merging detached pages)
+    writer = PdfWriter()
+    page = writer.add_page(PdfReader(io.BytesIO(_template_pdf_bytes(bg))).pages[0])
+    page.merge_page(PdfReader(overlay).pages[0])
+    with open(out_path, "wb") as f:
+        writer.write(f)
+
     return os.path.abspath(out_path)
 
 
 # =========================================================
 # PUBLIC API
 # =========================================================
+def certificate_output_path(user_id: int, full_name: str) -> str:
+    safe = _safe_filename(full_name)
+    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    filename = f"certificate_{safe}_{int(user_id)}_{ts}.pdf"
+    return os.path.abspath(os.path.join(OUTPUT_DIR, filename))
+
+
 def issue_certificate(user_id: int, full_name: str) -> str:
     """
     Global fix:
@@ -211,35 +485,27 @@ def issue_certificate(user_id: int, full_name: str) -> str:
     # ✅ If old template version (or missing version), force regeneration
     needs_regen = (rec is None) or (rec.get("template_version") != CERT_TEMPLATE_VERSION)
 
-    # Also regen if file path is missing on disk
-    if rec and rec.get("certificate_path"):
-        if not os.path.exists(rec["certificate_path"]):
-            needs_regen = True
+    # Also regen if the file is gone (cached lookup, no stat on a hit)
+    if rec and resolve_certificate(rec) is None:
+        needs_regen = True
 
     if not needs_regen:
-        return rec["certificate_path"]
+        return resolve_certificate(rec)
 
     # Generate new certificate
-    safe = _safe_filename(full_name)
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"certificate_{safe}_{user_id}_{ts}.pdf"
-    out_path = os.path.abspath(os.path.join(OUTPUT_DIR, filename))
+    out_path = certificate_output_path(user_id, full_name)
 
     cert_path = _build_certificate_pdf(full_name, out_path)
+    facts = certificate_facts(cert_path)
     issued_at = datetime.utcnow().isoformat()
+    values = (
+        issued_at, cert_path, CERT_TEMPLATE_VERSION,
+        facts["certificate_key"], facts["file_size"], facts["file_sha256"],
+    )
 
     with write_txn() as conn:
-        cur = conn.cursor()
-        if rec:
-            cur.execute(
-                "UPDATE certificates SET issued_at=?, certificate_path=?, template_version=? WHERE id=?",
-                (issued_at, cert_path, CERT_TEMPLATE_VERSION, int(rec["id"])),
-            )
-        else:
-            cur.execute(
-                "INSERT INTO certificates (user_id, issued_at, certificate_path, template_version) VALUES (?, ?, ?, ?)",
-                (user_id, issued_at, cert_path, CERT_TEMPLATE_VERSION),
-            )
-        conn.commit()
+        record_certificate(conn, user_id, values)
 
+    _remember(facts["certificate_key"] or cert_path, cert_path)
+    invalidate_snapshot(user_id)
     return cert_path
\ No newline at end of file
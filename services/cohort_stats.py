@@ -0,0 +1,239 @@
+# ==================================================
+# services/cohort_stats.py
+# ==================================================
+# Cohort x week progress overview without scanning progress/assignments.
+#
+# cohort_progress_stats holds one row per (cohort, week):
+#   students   — students with a progress row for that week
+#   unlocked / completed — progress rows in that status
+#   submitted  — assignment rows (any status)
+#   graded     — approved/graded assignments with a grade
+#   grade_sum  — sum of those grades (avg = grade_sum / graded)
+#
+# The table is maintained by triggers (created in migration 19), so every
+# writer keeps it exact: mark_week_completed, admin_unlock_week / lock,
+# bulk unlocks, save_assignment, review_assignment, student imports and
+# one-off scripts alike. Each write applies a +/- delta to one row via
+# UPSERT; moving a student to another cohort moves their contributions.
+# Only users with role='student' are counted.
+#
+# Admin page: Admin -> Cohort Progress (reads cohorts x weeks rows).
+# CLI:
+#   python -m services.cohort_stats rebuild   # recompute from scratch
+#   python -m services.cohort_stats check     # compare with a full scan
+
+from __future__ import annotations
+
+import argparse
+from typing import List
+
+from services.db import init_db, read_conn, write_txn
+
+TABLE = "cohort_progress_stats"
+
+_COUNTERS = ("students", "unlocked", "completed", "submitted", "graded", "grade_sum")
+
+_GRADED = "({a}.status IN ('approved','graded') AND {a}.grade IS NOT NULL)"
+
+_UPSERT = f"""
+INSERT INTO {TABLE} (cohort, week, {', '.join(_COUNTERS)})
+{{select}}
+ON CONFLICT(cohort, week) DO UPDATE SET
+    {', '.join(f'{c} = {c} + excluded.{c}' for c in _COUNTERS)};
+"""
+
+
+# ==================================================
+# TRIGGER SQL
+# ==================================================
+def _cohort_of(user: str) -> str:
+    return f"(SELECT COALESCE(u.cohort, 'Cohort 1') FROM users u WHERE u.id = {user}.user_id AND u.role = 'student')"
+
+
+def _progress_delta(row: str, sign: str) -> str:
+    """+/-1 for one progress row (NEW or OLD)."""
+    return _UPSERT.format(select=f"""
+SELECT c.cohort, {row}.week, {sign}1,
+       {sign}({row}.status = 'unlocked'), {sign}({row}.status = 'completed'), 0, 0, 0
+FROM (SELECT {_cohort_of(row)} AS cohort) c
+WHERE c.cohort IS NOT NULL AND {row}.week IS NOT NULL""")
+
+
+def _assignment_delta(row: str, sign: str) -> str:
+    """+/-1 for one assignment row (NEW or OLD)."""
+    graded = _GRADED.format(a=row)
+    return _UPSERT.format(select=f"""
+SELECT c.cohort, {row}.week, 0, 0, 0, {sign}1, {sign}{graded},
+       {sign}(CASE WHEN {graded} THEN {row}.grade ELSE 0 END)
+FROM (SELECT {_cohort_of(row)} AS cohort) c
+WHERE c.cohort IS NOT NULL AND {row}.week IS NOT NULL""")
+
+
+def _user_delta(row: str, sign: str) -> str:
+    """+/- every progress + assignment row of one student (cohort moves, deletes)."""
+    cohort = f"COALESCE({row}.cohort, 'Cohort 1')"
+    graded = _GRADED.format(a="a")
+    progress = _UPSERT.format(select=f"""
+SELECT {cohort}, p.week, {sign}COUNT(*),
+       {sign}SUM(p.status = 'unlocked'), {sign}SUM(p.status = 'completed'), 0, 0, 0
+FROM progress p
+WHERE p.user_id = {row}.id AND {row}.role = 'student' AND p.week IS NOT NULL
+GROUP BY p.week""")
+    assignments = _UPSERT.format(select=f"""
+SELECT {cohort}, a.week, 0, 0, 0, {sign}COUNT(*), {sign}SUM({graded}),
+       {sign}TOTAL(CASE WHEN {graded} THEN a.grade ELSE 0 END)
+FROM assignments a
+WHERE a.user_id = {row}.id AND {row}.role = 'student' AND a.week IS NOT NULL
+GROUP BY a.week""")
+    return progress + assignments
+
+
+def _triggers() -> List[tuple]:
+    return [
+        ("trg_cps_progress_insert", "AFTER INSERT ON progress", _progress_delta("NEW", "+")),
+        ("trg_cps_progress_delete", "AFTER DELETE ON progress", _progress_delta("OLD", "-")),
+        (
+            "trg_cps_progress_update",
+            "AFTER UPDATE OF status, user_id, week ON progress",
+            _progress_delta("OLD", "-") + _progress_delta("NEW", "+"),
+        ),
+        ("trg_cps_assignments_insert", "AFTER INSERT ON assignments", _assignment_delta("NEW", "+")),
+        ("trg_cps_assignments_delete", "AFTER DELETE ON assignments", _assignment_delta("OLD", "-")),
+        (
+            "trg_cps_assignments_update",
+            "AFTER UPDATE OF status, grade, user_id, week ON assignments",
+            _assignment_delta("OLD", "-") + _assignment_delta("NEW", "+"),
+        ),
+        (
+            "trg_cps_users_update",
+            "AFTER UPDATE OF cohort, role ON users",
+            _user_delta("OLD", "-") + _user_delta("NEW", "+"),
+        ),
+        ("trg_cps_users_delete", "AFTER DELETE ON users", _user_delta("OLD", "-")),
+    ]
+
+
+# ==================================================
+# INSTALL / REBUILD
+# ==================================================
+def _aggregate_sql() -> str:
+    graded = _GRADED.format(a="a")
+    return f"""
+    SELECT cohort, week,
+           SUM(students), SUM(unlocked), SUM(completed),
+           SUM(submitted), SUM(graded), TOTAL(grade_sum)
+    FROM (
+        SELECT COALESCE(u.cohort, 'Cohort 1') AS cohort, p.week AS week,
+               COUNT(*) AS students,
+               SUM(p.status = 'unlocked') AS unlocked,
+               SUM(p.status = 'completed') AS completed,
+               0 AS submitted, 0 AS graded, 0 AS grade_sum
+        FROM progress p JOIN users u ON u.id = p.user_id AND u.role = 'student'
+        WHERE p.week IS NOT NULL
+        GROUP BY 1, 2
+        UNION ALL
+        SELECT COALESCE(u.cohort, 'Cohort 1'), a.week,
+               0, 0, 0,
+               COUNT(*),
+               SUM({graded}),
+               TOTAL(CASE WHEN {graded} THEN a.grade ELSE 0 END)
+        FROM assignments a JOIN users u ON u.id = a.user_id AND u.role = 'student'
+        WHERE a.week IS NOT NULL
+        GROUP BY 1, 2
+    )
+    GROUP BY cohort, week
+    """
+
+
+def rebuild_cohort_stats(cur) -> int:
+    """Recompute the whole table from progress + assignments. Returns rows."""
+    cur.execute(f"DELETE FROM {TABLE}")
+    cur.execute(f"INSERT INTO {TABLE} (cohort, week, {', '.join(_COUNTERS)}) {_aggregate_sql()}")
+    return cur.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+
+def install_cohort_stats(cur) -> None:
+    """Create the table + triggers and fill it (migration 19)."""
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        cohort TEXT NOT NULL,
+        week INTEGER NOT NULL,
+        students INTEGER NOT NULL DEFAULT 0,
+        unlocked INTEGER NOT NULL DEFAULT 0,
+        completed INTEGER NOT NULL DEFAULT 0,
+        submitted INTEGER NOT NULL DEFAULT 0,
+        graded INTEGER NOT NULL DEFAULT 0,
+        grade_sum REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (cohort, week)
+    )
+    """)
+    for name, event, body in _triggers():
+        cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cur.execute(f"CREATE TRIGGER {name} {event} BEGIN {body} END")
+    rebuild_cohort_stats(cur)
+
+
+# ==================================================
+# READ
+# ==================================================
+def _row_dict(r) -> dict:
+    row = dict(r)
+    row["avg_grade"] = round(row["grade_sum"] / row["graded"], 1) if row["graded"] else None
+    return row
+
+
+def get_cohort_progress(cohort: str = None) -> List[dict]:
+    """One dict per (cohort, week), ordered; reads only the aggregate table."""
+    sql = f"SELECT cohort, week, {', '.join(_COUNTERS)} FROM {TABLE}"
+    params = ()
+    if cohort:
+        sql += " WHERE cohort = ?"
+        params = (cohort,)
+    sql += " ORDER BY cohort, week"
+
+    with read_conn() as conn:
+        return [_row_dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+def check_cohort_stats() -> List[dict]:
+    """Rows where the table disagrees with a full scan (should be empty)."""
+    with read_conn() as conn:
+        stored = {
+            (r[0], r[1]): tuple(r[2:])
+            for r in conn.execute(f"SELECT cohort, week, {', '.join(_COUNTERS)} FROM {TABLE}").fetchall()
+        }
+        fresh = {(r[0], r[1]): tuple(r[2:]) for r in conn.execute(_aggregate_sql()).fetchall()}
+
+    zero = (0,) * len(_COUNTERS)
+    drift = []
+    for key in sorted(set(stored) | set(fresh), key=lambda k: (str(k[0]), k[1])):
+        have, want = stored.get(key, zero), fresh.get(key, zero)
+        if any(abs((h or 0) - (w or 0)) > 1e-6 for h, w in zip(have, want)):
+            drift.append({"cohort": key[0], "week": key[1], "stored": have, "expected": want})
+    return drift
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cohort progress aggregates.")
+    parser.add_argument("command", choices=("rebuild", "check"))
+    args = parser.parse_args(argv)
+
+    init_db()
+
+    if args.command == "rebuild":
+        with write_txn() as conn:
+            rows = rebuild_cohort_stats(conn.cursor())
+        print(f"✅ Rebuilt {TABLE}: {rows} cohort/week row(s)")
+        return
+
+    drift = check_cohort_stats()
+    for d in drift:
+        print(f"❌ {d['cohort']} week {d['week']}: stored {d['stored']}, expected {d['expected']}")
+    print("✅ cohort_progress_stats is consistent" if not drift else f"⚠️ {len(drift)} row(s) drifted; run rebuild")
+
+
+if __name__ == "__main__":
+    main()
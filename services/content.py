@@ -0,0 +1,170 @@
+# ==================================================
+# services/content.py
+# ==================================================
+# Read-through cache for the course markdown in content/.
+#
+# Students used to re-read content/week{N}.md from disk on every rerun,
+# and the admin Dashboard read all six week files per rerun. The store
+# loads the directory once, keeps text + sections in memory keyed by
+# path and mtime, and re-stats a file at most every
+# CONTENT_RECHECK_SECONDS to pick up edits (hot reload).
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTENT_DIR = os.getenv("LMS_CONTENT_DIR", os.path.join(BASE_DIR, "content"))
+
+# How often a cached file is re-stat'ed for changes
+CONTENT_RECHECK_SECONDS = float(os.getenv("LMS_CONTENT_RECHECK_SECONDS", "2"))
+
+_HEADING_RE = re.compile(r"^(#{1,2})\s+(.*)$")
+
+
+class ContentEntry:
+    __slots__ = ("path", "mtime", "size", "text", "sections", "checked_at")
+
+    def __init__(self, path: str, mtime: float, size: int, text: str):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.text = text
+        self.sections = split_sections(text)
+        self.checked_at = time.monotonic()
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Split markdown into [(heading, body), ...] on # / ## headings.
+    Text before the first heading gets an empty heading.
+    Headings inside ``` fences are ignored.
+    """
+    sections: List[Tuple[str, str]] = []
+    heading = ""
+    body: List[str] = []
+    in_fence = False
+
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+
+        m = None if in_fence else _HEADING_RE.match(line)
+        if m:
+            if heading or any(b.strip() for b in body):
+                sections.append((heading, "\n".join(body).strip()))
+            heading = m.group(2).strip()
+            body = []
+        else:
+            body.append(line)
+
+    if heading or any(b.strip() for b in body):
+        sections.append((heading, "\n".join(body).strip()))
+
+    return sections
+
+
+class ContentStore:
+    """
+    In-memory view of a content directory with mtime-based hot reload.
+    """
+
+    def __init__(self, directory: str, recheck_seconds: float = 2.0):
+        self.directory = directory
+        self.recheck_seconds = float(recheck_seconds)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Optional[ContentEntry]] = {}
+        self._missing_checked: Dict[str, float] = {}
+        self._loaded = False
+
+    # ----------------------------------------------
+    # LOADING
+    # ----------------------------------------------
+    def load_all(self) -> None:
+        """Read every .md file in the directory (once)."""
+        try:
+            names = [n for n in os.listdir(self.directory) if n.endswith(".md")]
+        except FileNotFoundError:
+            names = []
+
+        for name in names:
+            self._reload(name)
+
+        self._loaded = True
+
+    def _reload(self, name: str) -> Optional[ContentEntry]:
+        path = os.path.join(self.directory, name)
+        try:
+            st = os.stat(path)
+            with open(path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._entries.pop(name, None)
+                self._missing_checked[name] = time.monotonic()
+            return None
+
+        entry = ContentEntry(path, st.st_mtime, st.st_size, text)
+        with self._lock:
+            self._entries[name] = entry
+            self._missing_checked.pop(name, None)
+        return entry
+
+    # ----------------------------------------------
+    # LOOKUP
+    # ----------------------------------------------
+    def get(self, name: str) -> Optional[ContentEntry]:
+        if not self._loaded:
+            self.load_all()
+
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(name)
+            missing_at = self._missing_checked.get(name)
+
+        if entry is None:
+            # Missing files are re-checked on the same schedule
+            if missing_at is not None and (now - missing_at) < self.recheck_seconds:
+                return None
+            return self._reload(name)
+
+        if (now - entry.checked_at) < self.recheck_seconds:
+            return entry
+
+        try:
+            st = os.stat(entry.path)
+        except FileNotFoundError:
+            return self._reload(name)
+
+        if st.st_mtime != entry.mtime or st.st_size != entry.size:
+            return self._reload(name)
+
+        entry.checked_at = now
+        return entry
+
+    def week(self, week: int) -> Optional[ContentEntry]:
+        return self.get(week_filename(week))
+
+
+def week_filename(week: int) -> str:
+    return f"week{int(week)}.md"
+
+
+# ==================================================
+# PROCESS-WIDE STORE
+# ==================================================
+_STORE = ContentStore(CONTENT_DIR, recheck_seconds=CONTENT_RECHECK_SECONDS)
+
+
+def get_week_content(week: int) -> Optional[ContentEntry]:
+    """Cached content for week N (None if the file does not exist)."""
+    return _STORE.week(week)
+
+
+def week_content_path(week: int) -> str:
+    return os.path.join(CONTENT_DIR, week_filename(week))
@@ -0,0 +1,176 @@
+# ==================================================
+# services/dashboard.py
+# ==================================================
+# One batched read for the student dashboard.
+#
+# student_router used to call get_progress, a SELECT * over assignments,
+# the student_exam_status lookup, the certificate row lookup and
+# can_issue_certificate — each on its own connection. This builds the
+# same data from ONE connection and three queries, and keeps it in a
+# short-TTL per-user cache. Service functions that write progress,
+# assignments, exam status or certificates call invalidate_snapshot().
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from services.db import columns, read_conn
+
+TOTAL_WEEKS = 6          # Weeks 1–6
+ORIENTATION_WEEK = 0     # Week 0
+CERT_REQUIRED_GRADED = 6
+
+# Seconds a snapshot may be served from memory (0 disables the cache)
+DASHBOARD_CACHE_TTL = float(os.getenv("LMS_DASHBOARD_CACHE_TTL", "10"))
+
+
+@dataclass
+class DashboardSnapshot:
+    user_id: int
+    progress: Dict[int, str] = field(default_factory=dict)
+    # latest submission per week, as full assignment dicts
+    assignments: Dict[int, dict] = field(default_factory=dict)
+    exam_unlocked: bool = False
+    exam_reviewed: bool = False
+    certificate: Optional[dict] = None
+    graded_count: int = 0
+    loaded_at: float = 0.0
+
+    @property
+    def certificate_eligible(self) -> bool:
+        return self.graded_count >= CERT_REQUIRED_GRADED
+
+    @property
+    def completed_weeks(self) -> int:
+        return sum(1 for wk in range(1, TOTAL_WEEKS + 1) if self.progress.get(wk) == "completed")
+
+
+# ==================================================
+# CACHE
+# ==================================================
+_CACHE: Dict[int, tuple] = {}
+_CACHE_LOCK = threading.Lock()
+_GENERATION = 0  # bumped on every invalidation; stale loads are not cached
+
+
+def invalidate_snapshot(user_id: Optional[int] = None) -> None:
+    """Drop one user's cached snapshot (or everyone's if user_id is None)."""
+    global _GENERATION
+
+    with _CACHE_LOCK:
+        _GENERATION += 1
+        if user_id is None:
+            _CACHE.clear()
+        else:
+            _CACHE.pop(int(user_id), None)
+
+
+# ==================================================
+# LOADING
+# ==================================================
+def _submission_sort_key(row: dict):
+    return (row.get("submitted_at") or row.get("created_at") or "", row.get("id") or 0)
+
+
+def _load_snapshot(user_id: int) -> DashboardSnapshot:
+    snap = DashboardSnapshot(user_id=user_id)
+
+    a_cols = columns("assignments")
+    a_user_col = "user_id" if "user_id" in a_cols else ("student_id" if "student_id" in a_cols else None)
+
+    c_cols = columns("certificates")
+    c_user_col = "user_id" if "user_id" in c_cols else ("student_id" if "student_id" in c_cols else None)
+    c_order_col = next((c for c in ("issued_at", "created_at", "id") if c in c_cols), None)
+
+    with read_conn() as conn:
+        # 1) progress
+        rows = conn.execute(
+            "SELECT week, status FROM progress WHERE user_id = ?",
+            (user_id,),
+        ).fetchall()
+        for r in rows:
+            snap.progress[int(r["week"])] = str(r["status"])
+
+        # 2) assignments (every submission; reduced to latest per week below)
+        if a_user_col:
+            rows = conn.execute(
+                f"SELECT * FROM assignments WHERE {a_user_col} = ?",
+                (user_id,),
+            ).fetchall()
+
+            for r in rows:
+                row = dict(r)
+                if row.get("status") in ("approved", "graded") and row.get("grade") is not None:
+                    snap.graded_count += 1
+
+                wk = row.get("week")
+                if wk is None:
+                    continue
+                wk = int(wk)
+                current = snap.assignments.get(wk)
+                if current is None or _submission_sort_key(row) > _submission_sort_key(current):
+                    snap.assignments[wk] = row
+
+        # 3) exam status + latest certificate, joined on the user id
+        cert_select = ""
+        cert_join = ""
+        if c_user_col and "id" in c_cols:
+            order_sql = f" ORDER BY {c_order_col} DESC" if c_order_col else ""
+            cert_select = ", c.*"
+            cert_join = (
+                "LEFT JOIN certificates c ON c.id = ("
+                f"SELECT id FROM certificates WHERE {c_user_col} = u.uid{order_sql} LIMIT 1)"
+            )
+
+        row = conn.execute(
+            f"""
+            SELECT e.exam_unlocked AS _exam_unlocked,
+                   e.exam_reviewed AS _exam_reviewed{cert_select}
+            FROM (SELECT ? AS uid) u
+            LEFT JOIN student_exam_status e ON e.user_id = u.uid
+            {cert_join}
+            """,
+            (user_id,),
+        ).fetchone()
+
+    if row is not None:
+        snap.exam_unlocked = bool(row["_exam_unlocked"])
+        snap.exam_reviewed = bool(row["_exam_reviewed"])
+        if cert_select and row["id"] is not None:
+            snap.certificate = {k: row[k] for k in row.keys() if not k.startswith("_exam_")}
+
+    # Defensive defaults (same policy as services.progress.get_progress)
+    snap.progress.setdefault(ORIENTATION_WEEK, "unlocked")
+    for week in range(1, TOTAL_WEEKS + 1):
+        snap.progress.setdefault(week, "locked")
+
+    snap.loaded_at = time.monotonic()
+    return snap
+
+
+def get_dashboard_snapshot(user_id: int, use_cache: bool = True) -> DashboardSnapshot:
+    """
+    Progress by week, latest assignment per week, exam status,
+    certificate record and certificate eligibility for one student.
+    """
+    user_id = int(user_id)
+
+    if use_cache and DASHBOARD_CACHE_TTL > 0:
+        with _CACHE_LOCK:
+            hit = _CACHE.get(user_id)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+
+    generation = _GENERATION
+    snap = _load_snapshot(user_id)
+
+    if DASHBOARD_CACHE_TTL > 0:
+        with _CACHE_LOCK:
+            if generation == _GENERATION:
+                _CACHE[user_id] = (time.monotonic() + DASHBOARD_CACHE_TTL, snap)
+
+    return snap
@@ -2,11 +2,15 @@
 # services/db.py
 # services/db.py
 
+import atexit
 import os
 import sqlite3
+import threading
 from contextlib import contextmanager
 from datetime import datetime
-import bcrypt
+
+from services.db_pool import close_all_pools, get_pool
+from services.password_policy import hash_password
 
 
 # ==================================================
@@ -53,13 +57,16 @@ ensure_dirs()
 # CONNECTION
 # ==================================================
 
-def get_conn():
-    """Open SQLite connection safely"""
+# Pool tuning (set LMS_DB_POOL_SIZE=0 to disable reuse)
+DB_POOL_SIZE = int(os.getenv("LMS_DB_POOL_SIZE", "8"))
+DB_POOL_MAX_AGE = float(os.getenv("LMS_DB_POOL_MAX_AGE", "300"))
 
-    ensure_dirs()
+
+def _connect(path):
+    """Open + configure a SQLite connection (PRAGMAs run once per connection)"""
 
     conn = sqlite3.connect(
-        DB_PATH,
+        path,
         check_same_thread=False,
         timeout=30
     )
@@ -74,18 +81,35 @@ def get_conn():
     return conn
 
 
+def get_conn():
+    """Open SQLite connection safely (unpooled — caller must close it)"""
+
+    ensure_dirs()
+
+    return _connect(DB_PATH)
+
+
+_POOL = get_pool(DB_PATH, _connect, size=DB_POOL_SIZE, max_age=DB_POOL_MAX_AGE)
+atexit.register(close_all_pools)
+
+
+def pool_stats():
+    """Hit/miss/open counters for the connection pool"""
+    return _POOL.stats()
+
+
 @contextmanager
 def read_conn():
-    conn = get_conn()
+    conn = _POOL.acquire()
     try:
         yield conn
     finally:
-        conn.close()
+        _POOL.release(conn)
 
 
 @contextmanager
 def write_txn():
-    conn = get_conn()
+    conn = _POOL.acquire()
     try:
         conn.execute("BEGIN IMMEDIATE;")
         yield conn
@@ -94,7 +118,73 @@ def write_txn():
         conn.rollback()
         raise
     finally:
-        conn.close()
+        _POOL.release(conn)
+
+
+# ==================================================
+# SCHEMA REGISTRY
+# ==================================================
+# Column sets for every table, introspected ONCE and cached in memory.
+# Hot paths adapt to schema drift via columns()/has_column() instead of
+# running PRAGMA table_info on every rerun. Migrations call
+# invalidate_schema() after changing the schema.
+# Each table keeps (ordered tuple, frozenset): the tuple preserves
+# table_info order for anything that builds SELECT lists or DataFrames.
+
+_SCHEMA = None
+_SCHEMA_LOCK = threading.Lock()
+
+
+def _load_schema():
+    with read_conn() as conn:
+        tables = [
+            r[0] for r in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table'"
+            ).fetchall()
+        ]
+        schema = {}
+        for t in tables:
+            ordered = tuple(r[1] for r in conn.execute(f"PRAGMA table_info({t})").fetchall())
+            schema[t] = (ordered, frozenset(ordered))
+        return schema
+
+
+def _schema():
+    global _SCHEMA
+
+    schema = _SCHEMA
+    if schema is None:
+        with _SCHEMA_LOCK:
+            if _SCHEMA is None:
+                _SCHEMA = _load_schema()
+            schema = _SCHEMA
+    return schema
+
+
+def columns(table):
+    """Cached column names of `table` (empty if the table does not exist)"""
+    return _schema().get(table, ((), frozenset()))[1]
+
+
+def ordered_columns(table):
+    """Cached column names of `table` in declaration order (empty if missing)"""
+    return _schema().get(table, ((), frozenset()))[0]
+
+
+def has_column(table, column):
+    return column in columns(table)
+
+
+def table_exists(table):
+    return table in _schema()
+
+
+def invalidate_schema():
+    """Drop the cached schema; the next lookup re-introspects"""
+    global _SCHEMA
+
+    with _SCHEMA_LOCK:
+        _SCHEMA = None
 
 
 # ==================================================
@@ -135,7 +225,7 @@ def _ensure_default_admin(cur):
     if cur.fetchone():
         return
 
-    pw_hash = bcrypt.hashpw(password.encode(), bcrypt.gensalt())
+    pw_hash = hash_password(password)
 
     cur.execute("""
         INSERT INTO users
@@ -154,164 +244,18 @@ def _ensure_default_admin(cur):
 # ==================================================
 # INIT DATABASE
 # ==================================================
+# Schema lives in services/migrations.py (versioned, once per process).
+# These entry points are kept for app.py and the maintenance scripts.
 
-def init_exam_tables():
+def init_db():
+    from services.migrations import run_migrations
 
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    run_migrations()
 
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS student_exam_status (
-        user_id INTEGER PRIMARY KEY,
-        exam_unlocked INTEGER DEFAULT 0,
-        exam_reviewed INTEGER DEFAULT 0,
-        attempts INTEGER DEFAULT 0,
-        last_score REAL DEFAULT 0,
-        last_attempt_at TEXT
-    )
-    """)
-
-    conn.commit()
-    conn.close()
-def init_db():
 
+def init_exam_tables():
+    init_db()
 
-    with write_txn() as conn:
-
-        cur = conn.cursor()
-
-
-        # ================= USERS =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            full_name TEXT,
-            email TEXT,
-            password_hash BLOB,
-            role TEXT DEFAULT 'student',
-            cohort TEXT DEFAULT 'Cohort 1',
-            active INTEGER DEFAULT 1,
-            created_at TEXT
-        )
-        """)
-
-        _safe_add_column(cur, "users", "full_name TEXT")
-        _safe_add_column(cur, "users", "email TEXT")
-        _safe_add_column(cur, "users", "password_hash BLOB")
-        _safe_add_column(cur, "users", "role TEXT DEFAULT 'student'")
-        _safe_add_column(cur, "users", "cohort TEXT DEFAULT 'Cohort 1'")
-        _safe_add_column(cur, "users", "active INTEGER DEFAULT 1")
-        _safe_add_column(cur, "users", "created_at TEXT")
-
-
-        # ================= PROGRESS =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS progress (
-            user_id INTEGER,
-            week INTEGER,
-            status TEXT DEFAULT 'locked',
-            orientation_done INTEGER DEFAULT 0,
-            updated_at TEXT,
-            UNIQUE(user_id, week)
-        )
-        """)
-
-        _safe_add_column(cur, "progress", "status TEXT DEFAULT 'locked'")
-        _safe_add_column(cur, "progress", "orientation_done INTEGER DEFAULT 0")
-        _safe_add_column(cur, "progress", "updated_at TEXT")
-
-
-        # ================= ASSIGNMENTS =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS assignments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            week INTEGER,
-            file_path TEXT,
-            original_filename TEXT,
-            status TEXT DEFAULT 'submitted',
-            grade REAL,
-            feedback TEXT,
-            submitted_at TEXT,
-            reviewed_at TEXT,
-            reviewed_by INTEGER
-        )
-        """)
-
-        _safe_add_column(cur, "assignments", "file_path TEXT")
-        _safe_add_column(cur, "assignments", "original_filename TEXT")
-        _safe_add_column(cur, "assignments", "status TEXT DEFAULT 'submitted'")
-        _safe_add_column(cur, "assignments", "grade REAL")
-        _safe_add_column(cur, "assignments", "feedback TEXT")
-        _safe_add_column(cur, "assignments", "submitted_at TEXT")
-        _safe_add_column(cur, "assignments", "reviewed_at TEXT")
-        _safe_add_column(cur, "assignments", "reviewed_by INTEGER")
-
-
-        # ================= SUPPORT =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS support_tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            subject TEXT,
-            message TEXT,
-            admin_reply TEXT,
-            status TEXT DEFAULT 'open',
-            created_at TEXT,
-            replied_at TEXT
-        )
-        """)
-
-
-        # ================= BROADCAST =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS broadcasts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            subject TEXT,
-            message TEXT NOT NULL,
-            active INTEGER DEFAULT 1,
-            created_at TEXT
-        )
-        """)
-
-
-        # ================= CERTIFICATES =================
-
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS certificates (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            issued_at TEXT,
-            certificate_path TEXT
-        )
-        """)
-
-
-        # Ensure admin
-        _ensure_default_admin(cur)
-
-        print("✅ Database initialized successfully")
 
 def ensure_exam_tables():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("""
-    CREATE TABLE IF NOT EXISTS student_exam_status (
-        user_id INTEGER PRIMARY KEY,
-        exam_unlocked INTEGER DEFAULT 0,
-        exam_reviewed INTEGER DEFAULT 0,
-        attempts INTEGER DEFAULT 0,
-        last_score REAL DEFAULT 0,
-        last_attempt_at TEXT
-    )
-    """)
-
-    conn.commit()
-    conn.close()
+    init_db()
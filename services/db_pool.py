@@ -0,0 +1,236 @@
+# ==================================================
+# services/db_pool.py
+# ==================================================
+# Reusable SQLite connections for services.db.read_conn / write_txn.
+#
+# Every Streamlit rerun used to open 6–10 brand-new connections (each one
+# re-running the PRAGMAs, including journal_mode = WAL). The pool keeps idle
+# connections per thread, keyed by DB path, and hands them back out:
+#
+# - connections are configured ONCE when created
+# - idle connections are health-checked before reuse
+# - connections older than max_age are recycled
+# - at most `size` connections stay open; extras are closed on release
+# - idle connections left behind by finished threads (Streamlit runs every
+#   script in a fresh thread) are adopted by the next thread that needs one
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class _PoolEntry:
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn: sqlite3.Connection):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Thread-aware pool of SQLite connections for a single database file.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        connect: Callable[[str], sqlite3.Connection],
+        size: int = 8,
+        max_age: float = 300.0,
+        health_check_after: float = 30.0,
+    ):
+        self.db_path = db_path
+        self._connect = connect
+        self.size = max(0, int(size))
+        self.max_age = float(max_age)
+        self.health_check_after = float(health_check_after)
+
+        self._lock = threading.Lock()
+        self._idle: Dict[int, List[_PoolEntry]] = {}
+        self._in_use: Dict[int, _PoolEntry] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._recycled = 0
+        self._discarded = 0
+
+    # ----------------------------------------------
+    # CHECKOUT / CHECKIN
+    # ----------------------------------------------
+    def acquire(self) -> sqlite3.Connection:
+        ident = threading.get_ident()
+
+        while True:
+            with self._lock:
+                stack = self._idle.get(ident)
+                entry = stack.pop() if stack else None
+                if entry is None:
+                    entry = self._adopt_orphan_locked()
+
+            if entry is None:
+                break
+
+            if self._expired(entry):
+                with self._lock:
+                    self._recycled += 1
+                self._close(entry, count_discard=False)
+                continue
+
+            if self._healthy(entry):
+                entry.last_used = time.monotonic()
+                with self._lock:
+                    self._hits += 1
+                    self._in_use[id(entry.conn)] = entry
+                return entry.conn
+
+            self._close(entry)
+
+        conn = self._connect(self.db_path)
+        entry = _PoolEntry(conn)
+        with self._lock:
+            self._misses += 1
+            self._in_use[id(conn)] = entry
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+
+        if entry is None:
+            # Not ours (or already released) — just make sure it is closed.
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+
+        try:
+            # Never hand out a connection with a half-finished transaction.
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = sqlite3.Row
+        except sqlite3.Error:
+            self._close(entry)
+            return
+
+        if self._expired(entry):
+            with self._lock:
+                self._recycled += 1
+            self._close(entry, count_discard=False)
+            return
+
+        with self._lock:
+            if self._open_count_locked() >= self.size:
+                keep = False
+            else:
+                keep = True
+                entry.last_used = time.monotonic()
+                self._idle.setdefault(threading.get_ident(), []).append(entry)
+
+        if not keep:
+            self._close(entry, count_discard=False)
+
+    # ----------------------------------------------
+    # MAINTENANCE
+    # ----------------------------------------------
+    def close_all(self) -> None:
+        """Close every idle connection (in-use ones close on release)."""
+        with self._lock:
+            entries = [e for stack in self._idle.values() for e in stack]
+            self._idle.clear()
+        for entry in entries:
+            self._close(entry, count_discard=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            idle = sum(len(s) for s in self._idle.values())
+            in_use = len(self._in_use)
+            return {
+                "db_path": self.db_path,
+                "size": self.size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "recycled": self._recycled,
+                "discarded": self._discarded,
+                "idle": idle,
+                "in_use": in_use,
+                "open": idle + in_use,
+            }
+
+    # ----------------------------------------------
+    # INTERNALS
+    # ----------------------------------------------
+    def _open_count_locked(self) -> int:
+        return sum(len(s) for s in self._idle.values()) + len(self._in_use)
+
+    def _adopt_orphan_locked(self) -> Optional[_PoolEntry]:
+        if not self._idle:
+            return None
+
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in list(self._idle.keys()):
+            if ident in alive:
+                continue
+            stack = self._idle[ident]
+            entry = stack.pop() if stack else None
+            if not stack:
+                del self._idle[ident]
+            if entry is not None:
+                return entry
+        return None
+
+    def _expired(self, entry: _PoolEntry) -> bool:
+        return self.max_age > 0 and (time.monotonic() - entry.created_at) > self.max_age
+
+    def _healthy(self, entry: _PoolEntry) -> bool:
+        if (time.monotonic() - entry.last_used) < self.health_check_after:
+            return True
+
+        try:
+            entry.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _close(self, entry: _PoolEntry, count_discard: bool = True) -> None:
+        if count_discard:
+            with self._lock:
+                self._discarded += 1
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+
+# ==================================================
+# REGISTRY (one pool per DB path)
+# ==================================================
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(
+    db_path: str,
+    connect: Callable[[str], sqlite3.Connection],
+    size: int = 8,
+    max_age: float = 300.0,
+) -> ConnectionPool:
+    with _POOLS_LOCK:
+        pool = _POOLS.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path, connect, size=size, max_age=max_age)
+            _POOLS[db_path] = pool
+        return pool
+
+
+def close_all_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+    for pool in pools:
+        pool.close_all()
@@ -0,0 +1,216 @@
+# ==================================================
+# services/downloads.py
+# ==================================================
+# Serve uploaded assignments and certificates without reading whole files
+# into memory on every page render.
+#
+# Two paths:
+#
+# 1) Lazy byte providers (default)
+#    file_provider(path) returns a zero-argument callable. Streamlit's
+#    download_button only calls it when the user clicks, so a render
+#    allocates nothing per file.
+#
+# 2) Streaming endpoint (opt-in)
+#    When LMS_DOWNLOAD_BASE_URL is set, a small threaded HTTP server on
+#    LMS_DOWNLOAD_PORT streams files in fixed-size chunks. Links carry an
+#    HMAC-signed token that expires after LMS_DOWNLOAD_TOKEN_TTL seconds.
+#    Put it behind the same proxy/domain as the app.
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import mimetypes
+import os
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+from urllib.parse import quote
+
+# ==================================================
+# CONFIG
+# ==================================================
+DOWNLOAD_BASE_URL = os.getenv("LMS_DOWNLOAD_BASE_URL", "").strip().rstrip("/")
+DOWNLOAD_PORT = int(os.getenv("LMS_DOWNLOAD_PORT", "8600"))
+DOWNLOAD_TOKEN_TTL = int(os.getenv("LMS_DOWNLOAD_TOKEN_TTL", "300"))
+CHUNK_SIZE = 64 * 1024
+
+# Stable secret across restarts if provided; otherwise per-process
+_SECRET = os.getenv("LMS_DOWNLOAD_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Only files under the upload root, the blob store and the certificate
+# output dir can be served by token. Taken from the modules that own those
+# paths (not re-read from the env) and resolved with realpath, so a
+# symlinked data volume matches the realpath of the requested file.
+_ROOTS = None
+_ROOTS_LOCK = threading.Lock()
+
+
+def _allowed_roots() -> list:
+    global _ROOTS
+
+    if _ROOTS is None:
+        with _ROOTS_LOCK:
+            if _ROOTS is None:
+                from services.blob_store import BLOB_ROOT
+                from services.certificates import OUTPUT_DIR  # reportlab only when needed
+                from services.db import UPLOAD_ROOT
+
+                _ROOTS = sorted({os.path.realpath(p) for p in (UPLOAD_ROOT, BLOB_ROOT, OUTPUT_DIR) if p})
+    return _ROOTS
+
+
+# ==================================================
+# LAZY PROVIDERS
+# ==================================================
+def file_provider(path: str) -> Callable[[], bytes]:
+    """
+    Zero-arg callable returning the file's bytes (read only when called).
+    """
+    def _read() -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    return _read
+
+
+# ==================================================
+# SIGNED TOKENS
+# ==================================================
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _is_allowed(path: str) -> bool:
+    real = os.path.realpath(path)
+    return any(real == root or real.startswith(root + os.sep) for root in _allowed_roots())
+
+
+def make_download_token(path: str, file_name: Optional[str] = None, ttl: Optional[int] = None) -> str:
+    payload = {
+        "p": os.path.abspath(path),
+        "n": file_name or os.path.basename(path),
+        "e": int(time.time()) + int(ttl if ttl is not None else DOWNLOAD_TOKEN_TTL),
+    }
+    body = _b64(json.dumps(payload, separators=(",", ":")).encode())
+    sig = _b64(hmac.new(_SECRET, body.encode(), hashlib.sha256).digest())
+    return f"{body}.{sig}"
+
+
+def verify_download_token(token: str) -> Optional[Tuple[str, str]]:
+    """
+    Returns (path, file_name) for a valid, unexpired token, else None.
+    """
+    try:
+        body, sig = token.split(".", 1)
+        expected = _b64(hmac.new(_SECRET, body.encode(), hashlib.sha256).digest())
+        if not hmac.compare_digest(sig, expected):
+            return None
+        payload = json.loads(_unb64(body))
+    except Exception:
+        return None
+
+    if int(payload.get("e", 0)) < int(time.time()):
+        return None
+
+    path = payload.get("p") or ""
+    if not _is_allowed(path):
+        return None
+
+    return path, payload.get("n") or os.path.basename(path)
+
+
+# ==================================================
+# STREAMING ENDPOINT
+# ==================================================
+class _DownloadHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        prefix = "/download/"
+        if not self.path.startswith(prefix):
+            self.send_error(404)
+            return
+
+        resolved = verify_download_token(self.path[len(prefix):].split("?", 1)[0])
+        if resolved is None:
+            self.send_error(403, "Link expired or invalid")
+            return
+
+        path, file_name = resolved
+        try:
+            f = open(path, "rb")
+        except OSError:
+            self.send_error(404)
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            mime = mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+
+            self.send_response(200)
+            self.send_header("Content-Type", mime)
+            self.send_header("Content-Length", str(size))
+            self.send_header(
+                "Content-Disposition",
+                f"attachment; filename*=UTF-8''{quote(file_name)}",
+            )
+            self.send_header("Cache-Control", "private, no-store")
+            self.end_headers()
+
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+
+
+def streaming_enabled() -> bool:
+    return bool(DOWNLOAD_BASE_URL)
+
+
+def start_download_server() -> bool:
+    """Start the streaming endpoint once per process (no-op if disabled)."""
+    global _SERVER
+
+    if not streaming_enabled():
+        return False
+
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            return True
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", DOWNLOAD_PORT), _DownloadHandler)
+        except OSError as e:
+            print("⚠️ Download server not started:", e)
+            return False
+
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="lms-downloads", daemon=True).start()
+        _SERVER = server
+        print(f"📌 DOWNLOAD SERVER: port {DOWNLOAD_PORT}")
+        return True
+
+
+def download_url(path: str, file_name: Optional[str] = None) -> Optional[str]:
+    """Signed, expiring URL for `path`, or None if streaming is disabled."""
+    if not start_download_server():
+        return None
+    if not _is_allowed(path):
+        return None
+    return f"{DOWNLOAD_BASE_URL}/download/{make_download_token(path, file_name)}"
@@ -19,7 +19,7 @@ def list_active_broadcasts(limit: int = 5):
             SELECT id, subject, message, created_at
             FROM broadcasts
             WHERE active = 1
-            ORDER BY created_at DESC
+            ORDER BY created_ts DESC, id DESC
             LIMIT ?
             """,
             (int(limit),),
@@ -36,7 +36,7 @@ def list_student_tickets(user_id: int):
             SELECT id, subject, message, admin_reply, status, created_at
             FROM support_tickets
             WHERE user_id = ?
-            ORDER BY created_at DESC
+            ORDER BY created_ts DESC, id DESC
             """,
             (user_id,),
         )
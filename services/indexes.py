@@ -0,0 +1,115 @@
+# ==================================================
+# services/indexes.py
+# ==================================================
+# Declared indexes for the hot lookup paths.
+#
+# The tables were created with no secondary indexes, so per-student
+# lookups scanned whole tables. Worse, save_assignment() relies on
+# ON CONFLICT(user_id, week), which needs a UNIQUE index that was never
+# created.
+#
+# - INDEXES declares every required index (table, columns, unique)
+# - ensure_indexes() creates them idempotently (migration step)
+# - an index whose table/columns don't exist yet is skipped, not an error
+# - before UNIQUE(user_id, week) on assignments, duplicate rows are
+#   collapsed to the newest one
+#
+# Adding an index: append to INDEXES and add a migration step that calls
+# ensure_indexes(). Check with: python benchmarks/check_query_plans.py
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+@dataclass(frozen=True)
+class Index:
+    name: str
+    table: str
+    columns: Tuple[str, ...]
+    unique: bool = False
+
+    def create_sql(self) -> str:
+        unique = "UNIQUE " if self.unique else ""
+        return (
+            f"CREATE {unique}INDEX IF NOT EXISTS {self.name} "
+            f"ON {self.table}({', '.join(self.columns)})"
+        )
+
+
+INDEXES: List[Index] = [
+    # save_assignment upsert + per-week lookups
+    Index("ux_assignments_user_week", "assignments", ("user_id", "week"), unique=True),
+    # Admin review queue: keyset pages, newest first
+    Index("idx_assignments_submitted_ts", "assignments", ("submitted_ts", "id")),
+    # Blob references (ref counts, orphan GC)
+    Index("idx_assignments_sha256", "assignments", ("file_sha256",)),
+    # Student ticket list / admin ticket list (newest first)
+    Index("idx_support_tickets_user_created_ts", "support_tickets", ("user_id", "created_ts")),
+    Index("idx_support_tickets_created_ts", "support_tickets", ("created_ts",)),
+    # Latest certificate per student
+    Index("idx_certificates_user", "certificates", ("user_id", "id")),
+    # Active broadcast banner
+    Index("idx_broadcasts_active_created_ts", "broadcasts", ("active", "created_ts")),
+    # Student lists / cohort filters
+    Index("idx_users_role_cohort", "users", ("role", "cohort")),
+]
+
+
+def _columns(cur, table: str) -> set:
+    return {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def _dedupe_assignments(cur) -> int:
+    """Keep only the newest row per (user_id, week). Returns rows removed."""
+    cur.execute(
+        """
+        DELETE FROM assignments
+        WHERE id NOT IN (
+            SELECT MAX(id) FROM assignments GROUP BY user_id, week
+        )
+        """
+    )
+    removed = max(cur.rowcount, 0)
+    if removed:
+        print(f"⚠️ Removed {removed} duplicate assignment row(s) before UNIQUE(user_id, week)")
+    return removed
+
+
+def _index_exists(cur, name: str) -> bool:
+    return cur.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,)
+    ).fetchone() is not None
+
+
+def ensure_indexes(cur) -> List[str]:
+    """Create any missing declared index. Returns the names created."""
+    created = []
+
+    for idx in INDEXES:
+        if _index_exists(cur, idx.name):
+            continue
+
+        cols = _columns(cur, idx.table)
+        if not cols or not set(idx.columns) <= cols:
+            continue  # table/column not there (legacy schema) — skip
+
+        if idx.name == "ux_assignments_user_week":
+            _dedupe_assignments(cur)
+
+        cur.execute(idx.create_sql())
+        created.append(idx.name)
+
+    return created
+
+
+def missing_indexes(conn) -> List[str]:
+    """Declared indexes that are absent although their columns exist."""
+    cur = conn.cursor()
+    missing = []
+    for idx in INDEXES:
+        cols = _columns(cur, idx.table)
+        if cols and set(idx.columns) <= cols and not _index_exists(cur, idx.name):
+            missing.append(idx.name)
+    return missing
@@ -0,0 +1,287 @@
+# ==================================================
+# services/login_security.py
+# ==================================================
+# Keeps bcrypt from becoming a CPU denial-of-service on the single
+# Streamlit process.
+#
+# - Throttling: failed attempts go to login_attempts; a username or IP with
+#   too many failures inside a sliding window is refused BEFORE bcrypt runs.
+# - Bounded verification: bcrypt.checkpw runs on a small thread pool
+#   (LMS_BCRYPT_THREADS). When the pool's queue is full the attempt is
+#   refused as "busy" instead of piling up.
+# - Session tokens: a successful login yields an HMAC-signed token
+#   (user id + session nonce + expiry + password-hash fingerprint).
+#   Presenting it skips bcrypt entirely. The nonce is a user_sessions row:
+#   logout revokes it, and deactivating/blocking a user revokes all of
+#   theirs (trigger); changing the password invalidates it as well.
+#   The token travels in a cookie (services/auth), never in the URL.
+# - Client IP: X-Forwarded-For / X-Real-Ip are only honored behind
+#   LMS_TRUSTED_PROXY_HOPS reverse proxies; by default the socket peer
+#   address is used, so a client cannot pick its own throttle bucket.
+#
+# Set LMS_SESSION_SECRET so tokens survive restarts.
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Optional
+
+from services.db import read_conn, write_txn
+
+# ==================================================
+# CONFIG
+# ==================================================
+LOGIN_WINDOW_SECONDS = int(os.getenv("LMS_LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LMS_LOGIN_MAX_FAILURES_PER_USER", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.getenv("LMS_LOGIN_MAX_FAILURES_PER_IP", "20"))
+
+BCRYPT_THREADS = max(1, int(os.getenv("LMS_BCRYPT_THREADS", "2")))
+BCRYPT_QUEUE = BCRYPT_THREADS * 4  # in-flight + waiting verifications
+BCRYPT_TIMEOUT_SECONDS = 10
+
+SESSION_TTL_SECONDS = int(os.getenv("LMS_SESSION_TTL", str(12 * 3600)))
+# Reverse proxies in front of the app that append to X-Forwarded-For
+TRUSTED_PROXY_HOPS = max(0, int(os.getenv("LMS_TRUSTED_PROXY_HOPS", "0")))
+_SECRET = os.getenv("LMS_SESSION_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Rows older than this are deleted (at most once per PRUNE_EVERY seconds)
+RETAIN_SECONDS = max(LOGIN_WINDOW_SECONDS, 24 * 3600)
+PRUNE_EVERY = 600
+
+
+class LoginBusy(Exception):
+    """Too many password verifications already in flight."""
+
+
+# ==================================================
+# THROTTLING
+# ==================================================
+_LAST_PRUNE = 0.0
+_PRUNE_LOCK = threading.Lock()
+
+
+def _norm(username: str) -> str:
+    return (username or "").strip().lower()
+
+
+def throttle_wait(username: str, ip: Optional[str] = None) -> int:
+    """
+    Seconds until this username/IP may try again (0 = allowed).
+    Only failures inside the last LOGIN_WINDOW_SECONDS count.
+    """
+    now = time.time()
+    since = now - LOGIN_WINDOW_SECONDS
+
+    with read_conn() as conn:
+        checks = [("username", _norm(username), LOGIN_MAX_FAILURES_PER_USER)]
+        if ip:
+            checks.append(("ip", ip, LOGIN_MAX_FAILURES_PER_IP))
+
+        wait = 0
+        for col, value, limit in checks:
+            if limit <= 0:
+                continue
+            # The limit-th most recent failure decides when the window reopens
+            row = conn.execute(
+                f"""
+                SELECT attempted_at FROM login_attempts
+                WHERE {col} = ? AND success = 0 AND attempted_at >= ?
+                ORDER BY attempted_at DESC
+                LIMIT 1 OFFSET ?
+                """,
+                (value, since, limit - 1),
+            ).fetchone()
+            if row:
+                wait = max(wait, int(row["attempted_at"] + LOGIN_WINDOW_SECONDS - now) + 1)
+
+    return wait
+
+
+def record_attempt(username: str, ip: Optional[str], success: bool) -> None:
+    """Log an attempt; a success clears that username's failures."""
+    global _LAST_PRUNE
+
+    now = time.time()
+    uname = _norm(username)
+
+    with write_txn() as conn:
+        if success:
+            conn.execute(
+                "DELETE FROM login_attempts WHERE username = ? AND success = 0",
+                (uname,),
+            )
+        conn.execute(
+            "INSERT INTO login_attempts (username, ip, success, attempted_at) VALUES (?, ?, ?, ?)",
+            (uname, ip, 1 if success else 0, now),
+        )
+
+        with _PRUNE_LOCK:
+            prune = now - _LAST_PRUNE >= PRUNE_EVERY
+            if prune:
+                _LAST_PRUNE = now
+        if prune:
+            conn.execute(
+                "DELETE FROM login_attempts WHERE attempted_at < ?",
+                (now - RETAIN_SECONDS,),
+            )
+            conn.execute("DELETE FROM user_sessions WHERE expires_at < ?", (now,))
+
+
+def client_ip(headers: Any, peer: Optional[str], hops: Optional[int] = None) -> Optional[str]:
+    """
+    Address to throttle by. Forwarding headers are client-controlled, so
+    they only count behind `hops` trusted proxies: each proxy appends the
+    address it saw, so the hops-th entry from the right is the client.
+    """
+    hops = TRUSTED_PROXY_HOPS if hops is None else int(hops)
+    if hops <= 0 or headers is None:
+        return peer
+
+    forwarded = [p.strip() for p in (headers.get("X-Forwarded-For") or "").split(",") if p.strip()]
+    if forwarded:
+        return forwarded[-min(hops, len(forwarded))]
+    return (headers.get("X-Real-Ip") or "").strip() or peer
+
+
+# ==================================================
+# BOUNDED BCRYPT
+# ==================================================
+_POOL = ThreadPoolExecutor(max_workers=BCRYPT_THREADS, thread_name_prefix="lms-bcrypt")
+_SLOTS = threading.BoundedSemaphore(BCRYPT_QUEUE)
+
+
+def run_bounded(fn: Callable[..., Any], *args) -> Any:
+    """
+    Run a CPU-heavy password function on the bcrypt pool.
+    Raises LoginBusy if the queue is full.
+    """
+    if not _SLOTS.acquire(blocking=False):
+        raise LoginBusy("Too many logins in progress")
+
+    try:
+        future = _POOL.submit(fn, *args)
+    except Exception:
+        _SLOTS.release()
+        raise
+    future.add_done_callback(lambda _f: _SLOTS.release())
+
+    try:
+        return future.result(timeout=BCRYPT_TIMEOUT_SECONDS)
+    except FutureTimeout as e:
+        raise LoginBusy("Password check timed out") from e
+
+
+# ==================================================
+# SESSION TOKENS
+# ==================================================
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _fingerprint(password_hash: Any) -> str:
+    if isinstance(password_hash, memoryview):
+        password_hash = password_hash.tobytes()
+    if isinstance(password_hash, str):
+        password_hash = password_hash.encode("utf-8")
+    return hashlib.sha256(password_hash or b"").hexdigest()[:16]
+
+
+def _sign(body: str) -> str:
+    return _b64(hmac.new(_SECRET, body.encode(), hashlib.sha256).digest())
+
+
+def _decode(token: str) -> Optional[dict]:
+    """Payload of a correctly signed token (expiry not checked)."""
+    try:
+        body, sig = (token or "").split(".", 1)
+        if not hmac.compare_digest(sig, _sign(body)):
+            return None
+        return json.loads(_unb64(body))
+    except Exception:
+        return None
+
+
+def issue_session_token(user_id: int, password_hash: Any, ttl: Optional[int] = None) -> str:
+    now = int(time.time())
+    nonce = secrets.token_urlsafe(18)
+    expires = now + int(ttl if ttl is not None else SESSION_TTL_SECONDS)
+
+    with write_txn() as conn:
+        conn.execute(
+            "INSERT INTO user_sessions (nonce, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (nonce, int(user_id), now, expires),
+        )
+
+    payload = {"u": int(user_id), "n": nonce, "f": _fingerprint(password_hash), "e": expires}
+    body = _b64(json.dumps(payload, separators=(",", ":")).encode())
+    return f"{body}.{_sign(body)}"
+
+
+def resume_session(token: str) -> Optional[dict]:
+    """
+    User dict for a valid token, else None. One indexed lookup, no bcrypt.
+    Fails if expired, revoked, the account is inactive, or the password
+    changed.
+    """
+    payload = _decode(token)
+    if not payload or int(payload.get("e", 0)) < int(time.time()):
+        return None
+
+    with read_conn() as conn:
+        row = conn.execute(
+            """
+            SELECT u.id, u.username, u.role, COALESCE(u.cohort,'Cohort 1') AS cohort, u.password_hash, u.active
+            FROM user_sessions s
+            JOIN users u ON u.id = s.user_id
+            WHERE s.nonce = ? AND s.user_id = ? AND s.revoked_at IS NULL AND s.expires_at >= ?
+            """,
+            (str(payload.get("n", "")), int(payload.get("u", 0)), int(time.time())),
+        ).fetchone()
+
+    if not row or int(row["active"] or 0) != 1:
+        return None
+    if not hmac.compare_digest(_fingerprint(row["password_hash"]), str(payload.get("f", ""))):
+        return None
+
+    return {
+        "id": row["id"],
+        "username": row["username"],
+        "role": row["role"],
+        "cohort": row["cohort"],
+    }
+
+
+def revoke_session(token: str) -> bool:
+    """Invalidate one token server-side (logout). True if it was live."""
+    payload = _decode(token)
+    if not payload:
+        return False
+    with write_txn() as conn:
+        cur = conn.execute(
+            "UPDATE user_sessions SET revoked_at = ? WHERE nonce = ? AND revoked_at IS NULL",
+            (time.time(), str(payload.get("n", ""))),
+        )
+    return cur.rowcount > 0
+
+
+def revoke_user_sessions(user_id: int) -> int:
+    """Invalidate every live token of a user. Returns how many."""
+    with write_txn() as conn:
+        cur = conn.execute(
+            "UPDATE user_sessions SET revoked_at = ? WHERE user_id = ? AND revoked_at IS NULL",
+            (time.time(), int(user_id)),
+        )
+    return cur.rowcount
@@ -0,0 +1,570 @@
+# ==================================================
+# services/migrations.py
+# ==================================================
+# Versioned schema bootstrap.
+#
+# app.py used to run init_db() + ensure_exam_tables() on EVERY Streamlit
+# rerun: a BEGIN IMMEDIATE write transaction, ~20 PRAGMA table_info calls
+# and a default-admin lookup per click. Now:
+#
+# - each step is numbered and recorded in schema_version
+# - run_migrations() runs once per process (process-wide guard)
+# - if the stored version is already current, it only does ONE read
+#
+# Steps must stay idempotent (CREATE IF NOT EXISTS / _safe_add_column) so
+# they are safe on databases that were bootstrapped before versioning.
+# NEVER edit or reorder a released step — append a new one.
+
+import threading
+import time
+from datetime import datetime
+
+from services.db import (
+    _column_exists,
+    _ensure_default_admin,
+    _safe_add_column,
+    invalidate_schema,
+    read_conn,
+    write_txn,
+)
+from services.blob_store import backfill_sizes, import_legacy_files
+from services.cohort_stats import install_cohort_stats
+from services.indexes import ensure_indexes
+
+
+# ==================================================
+# STEPS
+# ==================================================
+
+def _m001_users(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        full_name TEXT,
+        email TEXT,
+        password_hash BLOB,
+        role TEXT DEFAULT 'student',
+        cohort TEXT DEFAULT 'Cohort 1',
+        active INTEGER DEFAULT 1,
+        created_at TEXT
+    )
+    """)
+
+    _safe_add_column(cur, "users", "full_name TEXT")
+    _safe_add_column(cur, "users", "email TEXT")
+    _safe_add_column(cur, "users", "password_hash BLOB")
+    _safe_add_column(cur, "users", "role TEXT DEFAULT 'student'")
+    _safe_add_column(cur, "users", "cohort TEXT DEFAULT 'Cohort 1'")
+    _safe_add_column(cur, "users", "active INTEGER DEFAULT 1")
+    _safe_add_column(cur, "users", "created_at TEXT")
+
+    # Used by Admin -> Block / Unblock Students
+    _safe_add_column(cur, "users", "is_blocked INTEGER NOT NULL DEFAULT 0")
+    _safe_add_column(cur, "users", "blocked_at TEXT")
+    _safe_add_column(cur, "users", "blocked_reason TEXT")
+
+
+def _m002_progress(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS progress (
+        user_id INTEGER,
+        week INTEGER,
+        status TEXT DEFAULT 'locked',
+        orientation_done INTEGER DEFAULT 0,
+        override_by_admin INTEGER DEFAULT 0,
+        updated_at TEXT,
+        UNIQUE(user_id, week)
+    )
+    """)
+
+    _safe_add_column(cur, "progress", "status TEXT DEFAULT 'locked'")
+    _safe_add_column(cur, "progress", "orientation_done INTEGER DEFAULT 0")
+    _safe_add_column(cur, "progress", "override_by_admin INTEGER DEFAULT 0")
+    _safe_add_column(cur, "progress", "updated_at TEXT")
+
+
+def _m003_assignments(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS assignments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        week INTEGER,
+        file_path TEXT,
+        original_filename TEXT,
+        status TEXT DEFAULT 'submitted',
+        grade REAL,
+        feedback TEXT,
+        submitted_at TEXT,
+        reviewed_at TEXT,
+        reviewed_by INTEGER
+    )
+    """)
+
+    _safe_add_column(cur, "assignments", "file_path TEXT")
+    _safe_add_column(cur, "assignments", "original_filename TEXT")
+    _safe_add_column(cur, "assignments", "status TEXT DEFAULT 'submitted'")
+    _safe_add_column(cur, "assignments", "grade REAL")
+    _safe_add_column(cur, "assignments", "feedback TEXT")
+    _safe_add_column(cur, "assignments", "submitted_at TEXT")
+    _safe_add_column(cur, "assignments", "reviewed_at TEXT")
+    _safe_add_column(cur, "assignments", "reviewed_by INTEGER")
+
+
+def _m004_support_tickets(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS support_tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        username TEXT,
+        subject TEXT,
+        message TEXT,
+        admin_reply TEXT,
+        status TEXT DEFAULT 'open',
+        created_at TEXT,
+        replied_at TEXT
+    )
+    """)
+
+
+def _m005_broadcasts(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS broadcasts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        subject TEXT,
+        title TEXT,
+        message TEXT NOT NULL,
+        active INTEGER DEFAULT 1,
+        created_by INTEGER,
+        created_at TEXT
+    )
+    """)
+
+    # services/broadcasts.create_broadcast writes these
+    _safe_add_column(cur, "broadcasts", "title TEXT")
+    _safe_add_column(cur, "broadcasts", "created_by INTEGER")
+
+
+def _m006_certificates(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS certificates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        issued_at TEXT,
+        certificate_path TEXT,
+        template_version TEXT
+    )
+    """)
+
+    _safe_add_column(cur, "certificates", "user_id INTEGER")
+    _safe_add_column(cur, "certificates", "issued_at TEXT")
+    _safe_add_column(cur, "certificates", "certificate_path TEXT")
+    _safe_add_column(cur, "certificates", "template_version TEXT")
+
+
+def _m007_student_exam_status(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS student_exam_status (
+        user_id INTEGER PRIMARY KEY,
+        exam_unlocked INTEGER DEFAULT 0,
+        exam_reviewed INTEGER DEFAULT 0,
+        attempts INTEGER DEFAULT 0,
+        last_score REAL DEFAULT 0,
+        last_attempt_at TEXT
+    )
+    """)
+
+
+def _m008_broadcast_reads(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS broadcast_reads (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        broadcast_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        read_at TEXT NOT NULL,
+        UNIQUE(broadcast_id, user_id)
+    )
+    """)
+
+
+def _m009_default_admin(cur):
+    _ensure_default_admin(cur)
+
+
+def _m010_certificate_jobs(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS certificate_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        full_name TEXT,
+        template_version TEXT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        error TEXT,
+        certificate_path TEXT,
+        created_at TEXT,
+        started_at TEXT,
+        finished_at TEXT
+    )
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_certificate_jobs_status ON certificate_jobs(status, id)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_certificate_jobs_user ON certificate_jobs(user_id, id)"
+    )
+
+
+def _m011_login_attempts(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS login_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        ip TEXT,
+        success INTEGER NOT NULL DEFAULT 0,
+        attempted_at REAL NOT NULL
+    )
+    """)
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_login_attempts_user ON login_attempts(username, attempted_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_login_attempts_ip ON login_attempts(ip, attempted_at)"
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_login_attempts_time ON login_attempts(attempted_at)"
+    )
+
+
+def _m012_blocklist_counter(cur):
+    # services/blocklist.py polls this counter instead of users
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS app_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO app_counters (name, value) VALUES ('blocked_users', 0)")
+
+    bump = "UPDATE app_counters SET value = value + 1 WHERE name = 'blocked_users';"
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_users_blocked_update
+    AFTER UPDATE OF is_blocked, blocked_reason ON users
+    WHEN OLD.is_blocked IS NOT NEW.is_blocked OR OLD.blocked_reason IS NOT NEW.blocked_reason
+    BEGIN {bump} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_users_blocked_insert
+    AFTER INSERT ON users WHEN NEW.is_blocked = 1
+    BEGIN {bump} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_users_blocked_delete
+    AFTER DELETE ON users WHEN OLD.is_blocked = 1
+    BEGIN {bump} END
+    """)
+
+
+def _m013_indexes(cur):
+    ensure_indexes(cur)
+
+
+def _add_epoch_column(cur, table, source="created_at", target="created_ts"):
+    """
+    target (created_ts) = source (created_at) as Unix seconds, kept in sync
+    by triggers. The text columns mix 'YYYY-MM-DD HH:MM:SS' and ISO 'T'
+    formats, which do not sort as text; the epoch does, and can be indexed.
+    """
+    if not _column_exists(cur, table, source):
+        return
+
+    _safe_add_column(cur, table, f"{target} INTEGER")
+
+    epoch = "CAST(strftime('%s', {0}) AS INTEGER)"
+    cur.execute(
+        f"UPDATE {table} SET {target} = {epoch.format(source)} "
+        f"WHERE {target} IS NULL AND {source} IS NOT NULL"
+    )
+
+    new_ts = epoch.format(f"NEW.{source}")
+    now_ts = epoch.format("'now'")
+    fill = f"UPDATE {table} SET {target} = COALESCE({new_ts}, {now_ts}) WHERE id = NEW.id;"
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{target}_insert
+    AFTER INSERT ON {table} WHEN NEW.{target} IS NULL
+    BEGIN {fill} END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS trg_{table}_{target}_update
+    AFTER UPDATE OF {source} ON {table}
+    BEGIN {fill} END
+    """)
+
+
+def _m014_created_ts(cur):
+    _add_epoch_column(cur, "broadcasts")
+    _add_epoch_column(cur, "support_tickets")
+
+    # Superseded by the created_ts indexes
+    cur.execute("DROP INDEX IF EXISTS idx_broadcasts_active_created")
+    cur.execute("DROP INDEX IF EXISTS idx_support_tickets_user_created")
+    ensure_indexes(cur)
+
+
+def _m015_assignment_blobs(cur):
+    # Existing files are imported by the "assignment_blobs" backfill
+    _safe_add_column(cur, "assignments", "file_sha256 TEXT")
+    ensure_indexes(cur)
+
+
+def _m016_assignment_file_size(cur):
+    # Filled by the "assignment_sizes" backfill
+    _safe_add_column(cur, "assignments", "file_size INTEGER")
+
+
+def _m017_storage_audit(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS storage_audit (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        source TEXT NOT NULL,
+        row_id INTEGER,
+        path TEXT,
+        detail TEXT,
+        resolved_path TEXT,
+        repaired INTEGER NOT NULL DEFAULT 0,
+        found_at REAL NOT NULL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_storage_audit_kind ON storage_audit(kind, source)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS storage_audit_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started_at REAL NOT NULL,
+        elapsed_seconds REAL,
+        files INTEGER,
+        dirs INTEGER,
+        rows_checked INTEGER,
+        missing INTEGER,
+        orphaned INTEGER,
+        mismatched INTEGER,
+        repaired INTEGER
+    )
+    """)
+
+
+def _m018_certificate_keys(cur):
+    # Filled by the "certificate_keys" backfill
+    _safe_add_column(cur, "certificates", "certificate_key TEXT")
+    _safe_add_column(cur, "certificates", "file_size INTEGER")
+    _safe_add_column(cur, "certificates", "file_sha256 TEXT")
+
+
+def _m019_cohort_progress_stats(cur):
+    install_cohort_stats(cur)
+
+
+def _m020_user_sessions(cur):
+    # Server-side half of a session token (services/login_security.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        nonce TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        revoked_at REAL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_user ON user_sessions(user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions(expires_at)")
+
+    # Deactivating or blocking a user ends their sessions, whoever writes it
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS trg_users_revoke_sessions
+    AFTER UPDATE OF active, is_blocked ON users
+    WHEN COALESCE(NEW.active, 0) != 1 OR NEW.is_blocked = 1
+    BEGIN
+        UPDATE user_sessions SET revoked_at = strftime('%s', 'now')
+        WHERE user_id = NEW.id AND revoked_at IS NULL;
+    END
+    """)
+
+
+def _m021_assignment_submitted_ts(cur):
+    # Review queue keyset (services/assignments.list_assignments_page)
+    _add_epoch_column(cur, "assignments", "submitted_at", "submitted_ts")
+    # Rows that never had a submitted_at sort oldest instead of as NULL
+    cur.execute("UPDATE assignments SET submitted_ts = 0 WHERE submitted_ts IS NULL")
+    ensure_indexes(cur)
+
+
+# (version, name, step) — append only
+MIGRATIONS = [
+    (1, "users", _m001_users),
+    (2, "progress", _m002_progress),
+    (3, "assignments", _m003_assignments),
+    (4, "support_tickets", _m004_support_tickets),
+    (5, "broadcasts", _m005_broadcasts),
+    (6, "certificates", _m006_certificates),
+    (7, "student_exam_status", _m007_student_exam_status),
+    (8, "broadcast_reads", _m008_broadcast_reads),
+    (9, "default_admin", _m009_default_admin),
+    (10, "certificate_jobs", _m010_certificate_jobs),
+    (11, "login_attempts", _m011_login_attempts),
+    (12, "blocklist_counter", _m012_blocklist_counter),
+    (13, "indexes", _m013_indexes),
+    (14, "created_ts", _m014_created_ts),
+    (15, "assignment_blobs", _m015_assignment_blobs),
+    (16, "assignment_file_size", _m016_assignment_file_size),
+    (17, "storage_audit", _m017_storage_audit),
+    (18, "certificate_keys", _m018_certificate_keys),
+    (19, "cohort_progress_stats", _m019_cohort_progress_stats),
+    (20, "user_sessions", _m020_user_sessions),
+    (21, "assignment_submitted_ts", _m021_assignment_submitted_ts),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# ==================================================
+# ENGINE
+# ==================================================
+
+_LOCK = threading.Lock()
+_DONE = False
+
+
+def _ensure_version_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name TEXT,
+        applied_at TEXT
+    )
+    """)
+
+
+def current_version(conn) -> int:
+    """Highest applied migration (0 if the DB was never versioned)."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return int(row[0] or 0)
+
+
+def run_migrations(force: bool = False) -> int:
+    """
+    Bring the schema up to SCHEMA_VERSION.
+    Runs at most once per process unless force=True.
+    Returns the number of steps applied.
+    """
+    global _DONE
+
+    if _DONE and not force:
+        return 0
+
+    with _LOCK:
+        if _DONE and not force:
+            return 0
+
+        # Cheap path: one read, no writer lock
+        with read_conn() as conn:
+            if current_version(conn) >= SCHEMA_VERSION:
+                _DONE = True
+                return 0
+
+        applied = 0
+
+        with write_txn() as conn:
+            cur = conn.cursor()
+            _ensure_version_table(cur)
+
+            # Re-check under the writer lock (another process may have won)
+            version = current_version(conn)
+
+            for step_version, name, step in MIGRATIONS:
+                if step_version <= version:
+                    continue
+
+                step(cur)
+                cur.execute(
+                    "INSERT INTO schema_version (version, name, applied_at) VALUES (?, ?, ?)",
+                    (step_version, name, datetime.utcnow().isoformat()),
+                )
+                applied += 1
+
+        _DONE = True
+
+        if applied:
+            invalidate_schema()
+            print(f"✅ Schema migrated to version {SCHEMA_VERSION} ({applied} step(s))")
+
+        return applied
+
+
+# ==================================================
+# FILE BACKFILLS
+# ==================================================
+# Data steps that touch every file (hashing, linking, stat) do NOT run in
+# the migration transaction: on a real volume that held the write lock for
+# minutes while the app booted, and a kill mid-way left copied blobs
+# behind a rolled-back DB. They run afterwards on a background thread, in
+# short batches, and only pick up rows that still need work, so they
+# resume after a restart. Rows not reached yet keep working as before.
+
+def _backfill_assignment_blobs():
+    return import_legacy_files()
+
+
+def _backfill_assignment_sizes():
+    return backfill_sizes()
+
+
+def _backfill_certificate_keys():
+    from services.certificates import backfill_certificate_keys  # reportlab only when needed
+
+    return backfill_certificate_keys()
+
+
+# (name, fn) — run in order
+BACKFILLS = [
+    ("assignment_blobs", _backfill_assignment_blobs),
+    ("assignment_sizes", _backfill_assignment_sizes),
+    ("certificate_keys", _backfill_certificate_keys),
+]
+
+_BACKFILL_LOCK = threading.Lock()
+_BACKFILL_THREAD = None
+
+
+def run_backfills() -> dict:
+    """Run every backfill on the calling thread. {name: result}."""
+    results = {}
+    with _BACKFILL_LOCK:
+        for name, fn in BACKFILLS:
+            t0 = time.perf_counter()
+            try:
+                results[name] = fn()
+            except Exception as e:
+                print(f"⚠️ BACKFILL {name} failed: {e}")
+                results[name] = None
+                continue
+            elapsed = time.perf_counter() - t0
+            if elapsed >= 1:
+                print(f"📌 BACKFILL {name}: {results[name]} in {elapsed:.1f}s")
+    return results
+
+
+def start_backfills() -> bool:
+    """run_backfills() once per process on a daemon thread."""
+    global _BACKFILL_THREAD
+
+    with _BACKFILL_LOCK:
+        if _BACKFILL_THREAD is not None:
+            return False
+        _BACKFILL_THREAD = threading.Thread(target=run_backfills, name="lms-backfill", daemon=True)
+        _BACKFILL_THREAD.start()
+        return True
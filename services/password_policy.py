@@ -0,0 +1,127 @@
+# ==================================================
+# services/password_policy.py
+# ==================================================
+# One place that decides the bcrypt work factor.
+#
+# bcrypt.gensalt() always used the library default (12) whatever the
+# hardware. Now:
+#
+# - LMS_BCRYPT_ROUNDS pins the cost explicitly, OR
+# - it is calibrated once per process so one hash takes about
+#   LMS_BCRYPT_TARGET_MS (clamped to MIN_ROUNDS..MAX_ROUNDS). MIN_ROUNDS
+#   is the old gensalt() default, so a new hash is never weaker than
+#   the ones it replaces
+# - needs_rehash() flags stored hashes below the current cost; login
+#   upgrades them transparently (services/auth.authenticate)
+# - hash_many() hashes in parallel threads (bcrypt releases the GIL)
+#
+# Benchmark: python benchmarks/bench_bcrypt.py
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+
+import bcrypt
+
+# ==================================================
+# CONFIG
+# ==================================================
+MIN_ROUNDS = 12  # bcrypt.gensalt() default, used before calibration existed
+MAX_ROUNDS = 14
+
+BCRYPT_ROUNDS = os.getenv("LMS_BCRYPT_ROUNDS", "").strip()
+BCRYPT_TARGET_MS = float(os.getenv("LMS_BCRYPT_TARGET_MS", "250"))
+
+_ROUNDS_RE = re.compile(rb"^\$2[abxy]?\$(\d{2})\$")
+
+_LOCK = threading.Lock()
+_ROUNDS: Optional[int] = None
+
+
+def _clamp(rounds: int) -> int:
+    return max(MIN_ROUNDS, min(MAX_ROUNDS, int(rounds)))
+
+
+def measure_ms(rounds: int, samples: int = 1) -> float:
+    """Average milliseconds for one hash at `rounds`."""
+    salt = bcrypt.gensalt(rounds=rounds)
+    t0 = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.hashpw(b"calibration-password", salt)
+    return (time.perf_counter() - t0) * 1000 / samples
+
+
+def calibrate(target_ms: Optional[float] = None) -> int:
+    """
+    Highest cost whose hash time stays within target_ms.
+    Each extra round doubles the time, so one measurement is enough.
+    """
+    target = float(target_ms if target_ms is not None else BCRYPT_TARGET_MS)
+    base_ms = max(measure_ms(MIN_ROUNDS, samples=2), 0.001)
+
+    rounds = MIN_ROUNDS
+    while rounds < MAX_ROUNDS and base_ms * (2 ** (rounds + 1 - MIN_ROUNDS)) <= target:
+        rounds += 1
+    return rounds
+
+
+def work_factor() -> int:
+    """The bcrypt cost in force for this process (pinned or calibrated once)."""
+    global _ROUNDS
+
+    if _ROUNDS is not None:
+        return _ROUNDS
+
+    with _LOCK:
+        if _ROUNDS is None:
+            if BCRYPT_ROUNDS:
+                _ROUNDS = _clamp(int(BCRYPT_ROUNDS))
+            else:
+                _ROUNDS = calibrate()
+            print(f"📌 BCRYPT COST: {_ROUNDS}")
+        return _ROUNDS
+
+
+# ==================================================
+# HASHING
+# ==================================================
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return value or b""
+
+
+def hash_password(password: str, rounds: Optional[int] = None) -> bytes:
+    """bcrypt hash at `rounds` (default: the current work factor)."""
+    rounds = _clamp(rounds) if rounds else work_factor()
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds))
+
+
+def hash_many(passwords: List[str], workers: Optional[int] = None) -> List[bytes]:
+    """Hash a batch in parallel threads; output order matches input."""
+    if not passwords:
+        return []
+    work_factor()
+    workers = max(1, min(int(workers or os.cpu_count() or 1), len(passwords)))
+    if workers == 1:
+        return [hash_password(p) for p in passwords]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lms-hash") as pool:
+        return list(pool.map(hash_password, passwords))
+
+
+def rounds_of(hashed: Any) -> Optional[int]:
+    m = _ROUNDS_RE.match(_to_bytes(hashed))
+    return int(m.group(1)) if m else None
+
+
+def needs_rehash(hashed: Any) -> bool:
+    """True if the stored hash is below the current work factor."""
+    rounds = rounds_of(hashed)
+    return rounds is not None and rounds < work_factor()
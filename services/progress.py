@@ -11,10 +11,12 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Iterable, Optional
 
+from services.dashboard import invalidate_snapshot
 from services.db import read_conn
 from services.db import write_txn
+from services.write_queue import run_write
 
 TOTAL_WEEKS = 6          # Weeks 1–6
 ORIENTATION_WEEK = 0     # Week 0
@@ -35,7 +37,7 @@ def seed_progress_for_user(user_id: int) -> None:
     """
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
 
         # Week 0 (Orientation)
@@ -57,6 +59,9 @@ def seed_progress_for_user(user_id: int) -> None:
                 (user_id, week, now),
             )
 
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
 
 # ==========================================================
 # READ PROGRESS
@@ -106,12 +111,12 @@ def mark_orientation_completed(user_id):
     from datetime import datetime
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
 
         # Check if record exists
         cur.execute(
-            "SELECT id FROM progress WHERE user_id=? AND week=0",
+            "SELECT 1 FROM progress WHERE user_id=? AND week=0",
             (user_id,)
         )
         row = cur.fetchone()
@@ -134,6 +139,9 @@ def mark_orientation_completed(user_id):
                 VALUES (?, 0, 'completed', 1, ?)
             """, (user_id, now))
 
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
 
 def is_orientation_completed(user_id: int) -> bool:
     """
@@ -163,12 +171,12 @@ def mark_week_completed(user_id, week):
 
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
 
         # Check if record exists
         cur.execute("""
-            SELECT id FROM progress
+            SELECT 1 FROM progress
             WHERE user_id=? AND week=?
         """, (user_id, week))
 
@@ -191,6 +199,9 @@ def mark_week_completed(user_id, week):
                 VALUES (?, ?, 'completed', ?)
             """, (user_id, week, now))
 
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
 # ==========================================================
 # ADMIN CONTROLS
 # ==========================================================
@@ -200,7 +211,7 @@ def admin_unlock_week(user_id: int, week: int) -> None:
     """
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
         cur.execute(
             """
@@ -211,6 +222,9 @@ def admin_unlock_week(user_id: int, week: int) -> None:
             (now, user_id, week),
         )
 
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
 
 def admin_lock_week(user_id: int, week: int) -> None:
     """
@@ -219,7 +233,7 @@ def admin_lock_week(user_id: int, week: int) -> None:
     """
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
 
         if week == ORIENTATION_WEEK:
@@ -231,16 +245,112 @@ def admin_lock_week(user_id: int, week: int) -> None:
                 """,
                 (now, user_id),
             )
-            return
+        else:
+            cur.execute(
+                """
+                UPDATE progress
+                SET status = 'locked', override_by_admin = 1, updated_at = ?
+                WHERE user_id = ? AND week = ?
+                """,
+                (now, user_id, week),
+            )
+
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
+
+# ==========================================================
+# BULK (COHORT-WIDE) CONTROLS
+# ==========================================================
+_BULK_CHUNK = 500  # stays under SQLite's bound-parameter limit
 
-        cur.execute(
-            """
-            UPDATE progress
-            SET status = 'locked', override_by_admin = 1, updated_at = ?
-            WHERE user_id = ? AND week = ?
-            """,
-            (now, user_id, week),
-        )
+
+def _bulk_set_week_status(
+    week: int,
+    status: str,
+    user_ids: Optional[Iterable[int]] = None,
+    cohort: Optional[str] = None,
+) -> int:
+    """
+    Set one week's status for many students in ONE write transaction.
+
+    - user_ids=None targets every student (optionally one cohort)
+    - missing progress rows are created (UPSERT on UNIQUE(user_id, week))
+    - unlocking never downgrades a week the student already completed
+
+    Returns the number of progress rows inserted/updated.
+    """
+    week = int(week)
+    now = datetime.utcnow().isoformat()
+
+    where = ["role = 'student'"]
+    params: list = []
+    if cohort:
+        # NULL cohort counts as 'Cohort 1' without wrapping the column,
+        # so the lookup stays on idx_users_role_cohort (role, cohort)
+        where.append("(cohort = ? OR (? = 'Cohort 1' AND cohort IS NULL))")
+        params.extend((cohort, cohort))
+
+    keep_completed = "WHERE progress.status != 'completed'" if status == "unlocked" else ""
+
+    def _sql(extra_where: str) -> str:
+        return f"""
+            INSERT INTO progress (user_id, week, status, override_by_admin, updated_at)
+            SELECT id, ?, ?, 1, ?
+            FROM users
+            WHERE {" AND ".join(where + ([extra_where] if extra_where else []))}
+            ON CONFLICT(user_id, week) DO UPDATE SET
+                status = excluded.status,
+                override_by_admin = 1,
+                updated_at = excluded.updated_at
+            {keep_completed}
+        """
+
+    changed = 0
+
+    with write_txn() as conn:
+        cur = conn.cursor()
+
+        if user_ids is None:
+            cur.execute(_sql(""), (week, status, now, *params))
+            changed += max(cur.rowcount, 0)
+        else:
+            ids = sorted({int(u) for u in user_ids})
+            for i in range(0, len(ids), _BULK_CHUNK):
+                chunk = ids[i:i + _BULK_CHUNK]
+                placeholders = ",".join(["?"] * len(chunk))
+                cur.execute(
+                    _sql(f"id IN ({placeholders})"),
+                    (week, status, now, *params, *chunk),
+                )
+                changed += max(cur.rowcount, 0)
+
+    invalidate_snapshot()
+    return changed
+
+
+def bulk_unlock_week(
+    week: int,
+    user_ids: Optional[Iterable[int]] = None,
+    cohort: Optional[str] = None,
+) -> int:
+    """
+    Admin unlocks a week for a set of students or a whole cohort.
+    """
+    return _bulk_set_week_status(week, "unlocked", user_ids=user_ids, cohort=cohort)
+
+
+def bulk_lock_week(
+    week: int,
+    user_ids: Optional[Iterable[int]] = None,
+    cohort: Optional[str] = None,
+) -> int:
+    """
+    Admin locks a week for a set of students or a whole cohort.
+    Week 0 is NEVER locked.
+    """
+    status = "unlocked" if int(week) == ORIENTATION_WEEK else "locked"
+    return _bulk_set_week_status(week, status, user_ids=user_ids, cohort=cohort)
 
 
 # ==========================================================
@@ -303,16 +413,18 @@ def sync_user_progress(user_id: int, total_weeks: int = 6):
                     (user_id, week, status),
                 )
 
+    invalidate_snapshot(user_id)
+
 def mark_week_completed(user_id, week):
     from datetime import datetime
     now = datetime.utcnow().isoformat()
 
-    with write_txn() as conn:
+    def _write(conn):
         cur = conn.cursor()
 
         # Check if record exists
         cur.execute(
-            "SELECT id FROM progress WHERE user_id=? AND week=?",
+            "SELECT 1 FROM progress WHERE user_id=? AND week=?",
             (user_id, week)
         )
         row = cur.fetchone()
@@ -334,3 +446,6 @@ def mark_week_completed(user_id, week):
                 VALUES (?, ?, 'completed', 0, ?)
             """, (user_id, week, now))
 
+    run_write(_write)
+    invalidate_snapshot(user_id)
+
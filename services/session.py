@@ -1,6 +1,9 @@
 import streamlit as st
 
+from services.auth import forget_session
+
 def logout():
+    forget_session()
     for key in list(st.session_state.keys()):
         del st.session_state[key]
     st.rerun()
@@ -0,0 +1,396 @@
+# ==================================================
+# services/storage_audit.py
+# ==================================================
+# Reconcile upload/certificate files on disk with the DB.
+#
+# A missing file used to surface only when an admin happened to render
+# that submission ("file path saved, but file not found on server").
+# This job checks everything at once:
+#
+# - walks UPLOAD_ROOT and the certificate output dir with os.scandir in a
+#   thread pool (one task per directory; scandir releases the GIL)
+# - cross-references assignments.file_path and certificates.certificate_path
+# - records findings in storage_audit (replaced on every run) and a
+#   summary row in storage_audit_runs:
+#     missing    — a row points at a file that is not there
+#     orphaned   — a file no row points at (old resubmissions, GC leftovers)
+#     mismatched — file exists but its size / content address disagrees
+#                  with the row
+# - repair=True repoints missing rows whose file can be found elsewhere
+#   in ONE transaction: the row's own blob (file_sha256), or the single
+#   file with the same name under the same user directory that no other
+#   row references. Everything else stays "not found"
+#
+# Admin page: Admin -> Storage Audit.  CLI:
+#   python -m services.storage_audit [--repair] [--workers N]
+# Benchmark (100k files): python benchmarks/bench_storage_audit.py
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.blob_store import BLOB_ROOT, _TMP_DIR, blob_path, is_blob_path
+from services.certificates import OUTPUT_DIR as CERT_OUTPUT_DIR, certificate_key, invalidate_certificate_cache
+from services.dashboard import invalidate_snapshot
+from services.db import UPLOAD_ROOT, columns, init_db, read_conn, write_txn
+
+AUDIT_WORKERS = int(os.getenv("LMS_AUDIT_WORKERS", "8"))
+
+KINDS = ("missing", "orphaned", "mismatched")
+
+
+def _norm(path: str) -> str:
+    return os.path.normpath(os.path.abspath(path))
+
+
+# ==================================================
+# SCAN
+# ==================================================
+def _scan_dir(path: str, skip: frozenset) -> Tuple[List[Tuple[str, int]], List[str]]:
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.path not in skip:
+                            dirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+                except OSError:
+                    continue  # vanished while scanning
+    except OSError:
+        pass
+    return files, dirs
+
+
+def scan_files(roots: Iterable[str], workers: Optional[int] = None) -> Tuple[Dict[str, int], int]:
+    """
+    Every regular file under `roots` -> size. Returns (files, dirs_scanned).
+    Directories are scanned in parallel as they are discovered.
+    """
+    workers = max(1, int(workers or AUDIT_WORKERS))
+    skip = frozenset({_norm(_TMP_DIR)})
+    files: Dict[str, int] = {}
+    dirs = 0
+
+    roots = sorted({_norm(r) for r in roots if r and os.path.isdir(r)})
+    # A root nested in another root would be scanned twice
+    roots = [r for r in roots if not any(r.startswith(o + os.sep) for o in roots)]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lms-audit") as pool:
+        pending = {pool.submit(_scan_dir, r, skip) for r in roots}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                found, subdirs = fut.result()
+                dirs += 1
+                files.update(found)
+                pending.update(pool.submit(_scan_dir, d, skip) for d in subdirs)
+
+    return files, dirs
+
+
+# ==================================================
+# CROSS-REFERENCE
+# ==================================================
+def _load_rows() -> List[dict]:
+    a_cols = columns("assignments")
+    c_cols = columns("certificates")
+    rows = []
+
+    with read_conn() as conn:
+        if "file_path" in a_cols:
+            sha = "file_sha256" if "file_sha256" in a_cols else "NULL"
+            size = "file_size" if "file_size" in a_cols else "NULL"
+            for r in conn.execute(
+                f"SELECT id, user_id, file_path AS path, {sha} AS sha256, {size} AS size "
+                "FROM assignments WHERE file_path IS NOT NULL AND file_path <> ''"
+            ).fetchall():
+                rows.append({"source": "assignments", **dict(r)})
+
+        if "certificate_path" in c_cols:
+            size = "file_size" if "file_size" in c_cols else "NULL"
+            for r in conn.execute(
+                f"SELECT id, user_id, certificate_path AS path, NULL AS sha256, {size} AS size "
+                "FROM certificates WHERE certificate_path IS NOT NULL AND certificate_path <> ''"
+            ).fetchall():
+                rows.append({"source": "certificates", **dict(r)})
+
+    return rows
+
+
+def _parts(path: str) -> List[str]:
+    return path.replace("\\", "/").rstrip("/").split("/")
+
+
+def _owner_tail(row: dict) -> Optional[str]:
+    """
+    The part of a row's path that names its owner: from the user's
+    directory down (assignments/<uid>/week3/x.pdf -> "<uid>/week3/x.pdf",
+    assignments/<uid>/week_3.pdf -> "<uid>/week_3.pdf"), or the file name
+    when it carries the user id (certificate_<name>_<uid>_<ts>.pdf).
+    None when the path says nothing about the owner.
+    """
+    if row.get("user_id") is None:
+        return None
+    uid = str(row["user_id"])
+    parts = _parts(row["path"])
+    for i in range(len(parts) - 2, -1, -1):
+        if parts[i] == uid:
+            return "/".join(parts[i:])
+    if f"_{uid}_" in parts[-1]:
+        return parts[-1]
+    return None
+
+
+def _by_name(files: Dict[str, int]) -> Dict[str, List[str]]:
+    index: Dict[str, List[str]] = {}
+    for path in files:
+        if not is_blob_path(path):
+            index.setdefault(os.path.basename(path), []).append(path)
+    return index
+
+
+def _candidate(row: dict, by_name: Dict[str, List[str]], referenced: set) -> Optional[str]:
+    """
+    The one file a missing row's file could have moved to: same owner
+    directory (or owner-stamped name) and not another row's file.
+    """
+    tail = _owner_tail(row)
+    if not tail:
+        return None
+    depth = tail.count("/") + 1
+    matches = [
+        p for p in by_name.get(os.path.basename(_norm(row["path"])), [])
+        if "/".join(_parts(p)[-depth:]) == tail
+    ]
+    if len(matches) != 1 or matches[0] in referenced:
+        return None
+    return matches[0]
+
+
+def _under(path: str, roots: List[str]) -> bool:
+    return any(path == r or path.startswith(r + os.sep) for r in roots)
+
+
+def reconcile(files: Dict[str, int], rows: List[dict], roots: List[str]) -> List[dict]:
+    """
+    Findings for rows vs files (pure; no I/O except for paths outside roots).
+
+    A missing row is only marked resolvable when the file is its own blob
+    (file_sha256) or the single file with the same name under the same
+    owner directory that no other row references or claims. Anything
+    else is reported "not found" and never rewritten by repair.
+    """
+    roots = [_norm(r) for r in roots]
+    referenced = set()
+    findings = []
+    missing = []
+
+    for row in rows:
+        path = _norm(row["path"])
+
+        if path in files:
+            size = files[path]
+        elif not _under(path, roots) and os.path.isfile(path):
+            size = os.path.getsize(path)  # stored outside the audited roots
+        else:
+            finding = {
+                "kind": "missing",
+                "source": row["source"],
+                "row_id": row["id"],
+                "path": row["path"],
+                "detail": "not found",
+                "resolved_path": None,
+            }
+            findings.append(finding)
+            missing.append((row, finding))
+            continue
+
+        referenced.add(path)
+        problems = []
+        if row["size"] is not None and int(row["size"]) != size:
+            problems.append(f"size {size} on disk, {row['size']} recorded")
+        if row["sha256"] and is_blob_path(path) and os.path.basename(path) != row["sha256"]:
+            problems.append("blob address does not match file_sha256")
+        if problems:
+            findings.append({
+                "kind": "mismatched",
+                "source": row["source"],
+                "row_id": row["id"],
+                "path": row["path"],
+                "detail": "; ".join(problems),
+                "resolved_path": None,
+            })
+
+    # Resolve only after every present row is known, so a missing row can
+    # never be pointed at a file another row already owns
+    by_name = _by_name(files) if missing else {}
+    claims: Dict[str, List[dict]] = {}
+    for row, finding in missing:
+        if row["sha256"]:
+            blob = _norm(blob_path(row["sha256"]))
+            if blob in files:  # content address: shared by design
+                finding.update(detail="resolvable", resolved_path=blob)
+                continue
+        candidate = _candidate(row, by_name, referenced)
+        if candidate:
+            claims.setdefault(candidate, []).append(finding)
+
+    for candidate, claimed in claims.items():
+        if len(claimed) == 1:  # two rows resolving to one file: neither is
+            claimed[0].update(detail="resolvable", resolved_path=candidate)
+
+    referenced.update(f["resolved_path"] for _, f in missing if f["resolved_path"])
+
+    for path in files:
+        if path not in referenced:
+            findings.append({
+                "kind": "orphaned",
+                "source": "disk",
+                "row_id": None,
+                "path": path,
+                "detail": "blob" if is_blob_path(path) else f"{files[path]} bytes",
+                "resolved_path": None,
+            })
+
+    return findings
+
+
+# ==================================================
+# REPAIR + RECORD
+# ==================================================
+def _repair(conn, findings: List[dict]) -> int:
+    repaired = 0
+    cert_cols = columns("certificates")
+    for f in findings:
+        if f["kind"] != "missing" or not f["resolved_path"]:
+            continue
+        # compare-and-set: skip rows changed since the scan
+        if f["source"] == "assignments":
+            cur = conn.execute(
+                "UPDATE assignments SET file_path = ? WHERE id = ? AND file_path = ?",
+                (f["resolved_path"], f["row_id"], f["path"]),
+            )
+        elif "certificate_key" in cert_cols:
+            cur = conn.execute(
+                "UPDATE certificates SET certificate_path = ?, certificate_key = ? "
+                "WHERE id = ? AND certificate_path = ?",
+                (f["resolved_path"], certificate_key(f["resolved_path"]), f["row_id"], f["path"]),
+            )
+        else:
+            cur = conn.execute(
+                "UPDATE certificates SET certificate_path = ? WHERE id = ? AND certificate_path = ?",
+                (f["resolved_path"], f["row_id"], f["path"]),
+            )
+        f["repaired"] = cur.rowcount > 0
+        repaired += f["repaired"]
+    return repaired
+
+
+def run_audit(repair: bool = False, workers: Optional[int] = None, roots: Optional[List[str]] = None) -> dict:
+    """Scan, reconcile, optionally repair, and record the findings."""
+    t0 = time.perf_counter()
+    roots = roots or [UPLOAD_ROOT, BLOB_ROOT, CERT_OUTPUT_DIR]
+
+    files, dirs = scan_files(roots, workers=workers)
+    t_scan = time.perf_counter()
+
+    rows = _load_rows()
+    findings = reconcile(files, rows, roots)
+    t_reconcile = time.perf_counter()
+
+    now = time.time()
+    with write_txn() as conn:
+        repaired = _repair(conn, findings) if repair else 0
+        conn.execute("DELETE FROM storage_audit")
+        conn.executemany(
+            """
+            INSERT INTO storage_audit (kind, source, row_id, path, detail, resolved_path, repaired, found_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (f["kind"], f["source"], f["row_id"], f["path"], f["detail"],
+                 f["resolved_path"], int(f.get("repaired", False)), now)
+                for f in findings
+            ],
+        )
+
+        report = {kind: sum(1 for f in findings if f["kind"] == kind) for kind in KINDS}
+        report.update(
+            files=len(files),
+            dirs=dirs,
+            rows=len(rows),
+            repaired=repaired,
+            workers=max(1, int(workers or AUDIT_WORKERS)),
+            scan_seconds=t_scan - t0,
+            reconcile_seconds=t_reconcile - t_scan,
+        )
+        report["elapsed_seconds"] = time.perf_counter() - t0
+
+        conn.execute(
+            """
+            INSERT INTO storage_audit_runs
+            (started_at, elapsed_seconds, files, dirs, rows_checked, missing, orphaned, mismatched, repaired)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (now, report["elapsed_seconds"], report["files"], dirs, len(rows),
+             report["missing"], report["orphaned"], report["mismatched"], repaired),
+        )
+
+    if repaired:
+        invalidate_certificate_cache()
+        invalidate_snapshot()
+    return report
+
+
+# ==================================================
+# READ (admin page)
+# ==================================================
+def latest_run() -> Optional[dict]:
+    with read_conn() as conn:
+        row = conn.execute("SELECT * FROM storage_audit_runs ORDER BY id DESC LIMIT 1").fetchone()
+    return dict(row) if row else None
+
+
+def list_findings(kind: Optional[str] = None, limit: int = 500) -> List[dict]:
+    sql = "SELECT kind, source, row_id, path, detail, resolved_path, repaired FROM storage_audit"
+    params: list = []
+    if kind:
+        sql += " WHERE kind = ?"
+        params.append(kind)
+    sql += " ORDER BY kind, source, id LIMIT ?"
+    params.append(int(limit))
+    with read_conn() as conn:
+        return [dict(r) for r in conn.execute(sql, params).fetchall()]
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reconcile upload/certificate files with the DB.")
+    parser.add_argument("--repair", action="store_true", help="repoint rows whose file was found elsewhere")
+    parser.add_argument("--workers", type=int, default=None, help=f"scan threads (default {AUDIT_WORKERS})")
+    args = parser.parse_args(argv)
+
+    init_db()
+    r = run_audit(repair=args.repair, workers=args.workers)
+    print(
+        f"✅ {r['files']} file(s) in {r['dirs']} dir(s), {r['rows']} row(s): "
+        f"{r['missing']} missing, {r['orphaned']} orphaned, {r['mismatched']} mismatched, "
+        f"{r['repaired']} repaired"
+    )
+    print(
+        f"⏱ {r['elapsed_seconds']:.2f}s total, scan {r['scan_seconds']:.2f}s "
+        f"({r['workers']} thread(s)), reconcile {r['reconcile_seconds']:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
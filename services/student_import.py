@@ -0,0 +1,341 @@
+# ==================================================
+# services/student_import.py
+# ==================================================
+# Onboard a whole cohort from a CSV/XLSX file.
+#
+# "Create Student" is one form submit, one bcrypt hash and one write_txn
+# per person. This pipeline:
+#
+# - streams rows from CSV (csv module) or XLSX (openpyxl, optional)
+# - validates them (required fields, duplicates in the file / in the DB)
+# - hashes passwords across CPU cores (process pool, fixed cost)
+# - inserts users + Week 0..6 progress rows with executemany in ONE
+#   transaction (all or nothing)
+# - dry_run=True stops after validation and returns the same report
+#
+# Columns: username, password (required); full_name, email, cohort.
+#
+# Admin page: Admin -> Import Students.  CLI:
+#   python -m services.student_import students.csv [--dry-run] [--cohort C] [--workers N]
+
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from services.db import init_db, read_conn, write_txn
+from services.password_policy import hash_many, hash_password, work_factor
+from services.progress import ORIENTATION_WEEK, TOTAL_WEEKS
+
+try:
+    import openpyxl
+except ImportError:  # XLSX import disabled; CSV still works
+    openpyxl = None
+
+REQUIRED_COLUMNS = ("username", "password")
+OPTIONAL_COLUMNS = ("full_name", "email", "cohort")
+
+# Header spellings seen in exported spreadsheets
+_ALIASES = {
+    "user": "username",
+    "user_name": "username",
+    "login": "username",
+    "pass": "password",
+    "name": "full_name",
+    "fullname": "full_name",
+    "email_address": "email",
+    "e-mail": "email",
+    "group": "cohort",
+}
+
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+# SQLite's default max host parameters is 999 on older builds
+_IN_CHUNK = 500
+
+
+# ==================================================
+# PARSING
+# ==================================================
+def _norm_header(name) -> str:
+    key = re.sub(r"\s+", "_", str(name or "").strip().lower())
+    return _ALIASES.get(key, key)
+
+
+def _iter_csv(fh) -> Iterator[dict]:
+    if isinstance(fh, (bytes, bytearray)):
+        fh = io.BytesIO(fh)
+    if not isinstance(fh, io.TextIOBase):
+        fh = io.TextIOWrapper(fh, encoding="utf-8-sig", newline="")
+
+    reader = csv.reader(fh)
+    header = next(reader, None)
+    if header is None:
+        return
+    keys = [_norm_header(h) for h in header]
+    for values in reader:
+        yield dict(zip(keys, values))
+
+
+def _iter_xlsx(fh) -> Iterator[dict]:
+    if openpyxl is None:
+        raise ValueError("XLSX import needs openpyxl (pip install openpyxl). Upload a CSV instead.")
+    if isinstance(fh, (bytes, bytearray)):
+        fh = io.BytesIO(fh)
+
+    wb = openpyxl.load_workbook(fh, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        keys = [_norm_header(h) for h in header]
+        for values in rows:
+            yield dict(zip(keys, ("" if v is None else str(v) for v in values)))
+    finally:
+        wb.close()
+
+
+def iter_rows(source, filename: Optional[str] = None) -> Iterator[dict]:
+    """
+    Yield one dict per data row. `source` is a path or a binary file-like
+    object (e.g. a Streamlit UploadedFile); `filename` picks the format.
+    """
+    name = (filename or (source if isinstance(source, str) else getattr(source, "name", "")) or "").lower()
+    is_xlsx = name.endswith((".xlsx", ".xlsm"))
+
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            yield from (_iter_xlsx(fh) if is_xlsx else _iter_csv(fh))
+    else:
+        yield from (_iter_xlsx(source) if is_xlsx else _iter_csv(source))
+
+
+# ==================================================
+# VALIDATION
+# ==================================================
+def _existing_usernames(usernames: List[str]) -> set:
+    found = set()
+    with read_conn() as conn:
+        for i in range(0, len(usernames), _IN_CHUNK):
+            chunk = usernames[i:i + _IN_CHUNK]
+            rows = conn.execute(
+                f"SELECT username FROM users WHERE username IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found.update(r["username"] for r in rows)
+    return found
+
+
+def validate_rows(rows, default_cohort: str = "Cohort 1") -> Tuple[List[dict], List[dict]]:
+    """
+    Returns (valid, errors). Each error is {"line", "username", "error"}.
+    Line numbers count the header as line 1.
+    """
+    valid: List[dict] = []
+    errors: List[dict] = []
+    seen = {}
+
+    for line, raw in enumerate(rows, start=2):
+        if not any((v or "").strip() for v in raw.values()):
+            continue  # blank line
+
+        rec = {k: (raw.get(k) or "").strip() for k in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+        rec["cohort"] = rec["cohort"] or (default_cohort or "Cohort 1").strip()
+        rec["line"] = line
+
+        problem = None
+        if not rec["username"]:
+            problem = "username is required"
+        elif not rec["password"]:
+            problem = "password is required"
+        elif rec["email"] and not _EMAIL_RE.match(rec["email"]):
+            problem = f"invalid email: {rec['email']}"
+        elif rec["username"] in seen:
+            problem = f"duplicate of line {seen[rec['username']]}"
+
+        if problem:
+            errors.append({"line": line, "username": rec["username"], "error": problem})
+            continue
+
+        seen[rec["username"]] = line
+        valid.append(rec)
+
+    existing = _existing_usernames([r["username"] for r in valid])
+    if existing:
+        for r in valid:
+            if r["username"] in existing:
+                errors.append({"line": r["line"], "username": r["username"], "error": "username already exists"})
+        valid = [r for r in valid if r["username"] not in existing]
+
+    errors.sort(key=lambda e: e["line"])
+    return valid, errors
+
+
+# ==================================================
+# HASHING (runs in worker processes)
+# ==================================================
+def _hash_chunk(args: Tuple[List[str], int]) -> List[bytes]:
+    passwords, rounds = args
+    return [hash_password(p, rounds=rounds) for p in passwords]
+
+
+def hash_passwords_parallel(passwords: List[str], workers: Optional[int] = None) -> List[bytes]:
+    """
+    Hash across processes at this process's work factor (children never
+    re-calibrate). Falls back to threads if the pool cannot start.
+    """
+    if not passwords:
+        return []
+
+    rounds = work_factor()
+    workers = max(1, min(int(workers or os.cpu_count() or 1), len(passwords)))
+    if workers == 1:
+        return [hash_password(p, rounds=rounds) for p in passwords]
+
+    size = max(1, len(passwords) // (workers * 4))
+    chunks = [(passwords[i:i + size], rounds) for i in range(0, len(passwords), size)]
+
+    try:
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            return [h for part in pool.map(_hash_chunk, chunks) for h in part]
+    except BrokenProcessPool as e:
+        print("⚠️ Hashing process pool failed, using threads:", e)
+        return hash_many(passwords, workers=workers)
+
+
+# ==================================================
+# IMPORT
+# ==================================================
+def _insert_students(valid: List[dict], hashes: List[bytes]) -> int:
+    now = datetime.utcnow().isoformat()
+
+    with write_txn() as conn:
+        conn.executemany(
+            """
+            INSERT INTO users (username, full_name, email, cohort, role, password_hash, active, created_at)
+            VALUES (?, ?, ?, ?, 'student', ?, 1, ?)
+            """,
+            [
+                (r["username"], r["full_name"] or None, r["email"] or None, r["cohort"], h, now)
+                for r, h in zip(valid, hashes)
+            ],
+        )
+
+        user_ids = []
+        usernames = [r["username"] for r in valid]
+        for i in range(0, len(usernames), _IN_CHUNK):
+            chunk = usernames[i:i + _IN_CHUNK]
+            user_ids.extend(
+                r["id"]
+                for r in conn.execute(
+                    f"SELECT id FROM users WHERE username IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+            )
+
+        # Same rows as seed_progress_for_user: Week 0 unlocked, 1..6 locked
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO progress (user_id, week, status, override_by_admin, updated_at)
+            VALUES (?, ?, ?, 0, ?)
+            """,
+            [
+                (uid, week, "unlocked" if week == ORIENTATION_WEEK else "locked", now)
+                for uid in user_ids
+                for week in range(ORIENTATION_WEEK, TOTAL_WEEKS + 1)
+            ],
+        )
+
+    return len(user_ids)
+
+
+def import_students(
+    source,
+    filename: Optional[str] = None,
+    default_cohort: str = "Cohort 1",
+    dry_run: bool = False,
+    workers: Optional[int] = None,
+) -> dict:
+    """
+    Validate (and unless dry_run, create) students from a CSV/XLSX file.
+    Raises ValueError if the file is unreadable or the insert conflicts.
+    """
+    t0 = time.perf_counter()
+
+    try:
+        valid, errors = validate_rows(iter_rows(source, filename), default_cohort)
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Could not read file: {e}") from e
+
+    report = {
+        "dry_run": bool(dry_run),
+        "rows": len(valid) + len(errors),
+        "valid": len(valid),
+        "errors": errors,
+        "created": 0,
+        "hash_seconds": 0.0,
+        "elapsed_seconds": 0.0,
+    }
+
+    if dry_run or not valid:
+        report["elapsed_seconds"] = time.perf_counter() - t0
+        return report
+
+    t_hash = time.perf_counter()
+    hashes = hash_passwords_parallel([r["password"] for r in valid], workers=workers)
+    report["hash_seconds"] = time.perf_counter() - t_hash
+
+    try:
+        report["created"] = _insert_students(valid, hashes)
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"Import aborted, nothing was created: {e}") from e
+
+    report["elapsed_seconds"] = time.perf_counter() - t0
+    return report
+
+
+# ==================================================
+# CLI
+# ==================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import students from a CSV/XLSX file.")
+    parser.add_argument("path", help="CSV or XLSX file")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--cohort", default="Cohort 1", help="cohort for rows without one")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    init_db()
+
+    report = import_students(
+        args.path,
+        default_cohort=args.cohort,
+        dry_run=args.dry_run,
+        workers=args.workers,
+    )
+
+    for e in report["errors"]:
+        print(f"❌ line {e['line']} {e['username'] or '-'}: {e['error']}")
+    mode = "DRY RUN — " if report["dry_run"] else ""
+    print(
+        f"✅ {mode}{report['rows']} row(s): {report['valid']} valid, "
+        f"{len(report['errors'])} rejected, {report['created']} created"
+    )
+    if not report["dry_run"]:
+        print(f"⏱ {report['elapsed_seconds']:.2f}s total, {report['hash_seconds']:.2f}s hashing")
+
+
+if __name__ == "__main__":
+    main()
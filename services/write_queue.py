@@ -0,0 +1,251 @@
+# ==================================================
+# services/write_queue.py
+# ==================================================
+# One writer thread for the hot write paths.
+#
+# write_txn() runs BEGIN IMMEDIATE on whichever Streamlit script thread
+# calls it; around submission deadlines many threads queue on SQLite's
+# lock and some give up with "database is locked". Instead:
+#
+# - callers hand a write operation fn(conn) to submit() and get a Future
+# - ONE background thread owns ONE connection and drains the queue
+# - queued operations are group-committed: up to WRITE_BATCH ops share a
+#   transaction (one fsync), each inside its own SAVEPOINT so a failing
+#   op only rolls back itself
+# - futures resolve only after the COMMIT succeeds
+# - write_queue_stats() reports queue depth, batch sizes and commit latency
+#
+# LMS_WRITE_QUEUE=0 disables the thread: run_write() then uses write_txn()
+# on the caller's thread (same semantics, no batching).
+
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from services.db import DB_PATH, _connect, write_txn
+
+# ==================================================
+# CONFIG
+# ==================================================
+WRITE_QUEUE_ENABLED = os.getenv("LMS_WRITE_QUEUE", "1").strip() != "0"
+WRITE_BATCH = max(1, int(os.getenv("LMS_WRITE_BATCH", "64")))
+# How long the writer waits for more ops to join a batch
+WRITE_BATCH_WAIT_MS = float(os.getenv("LMS_WRITE_BATCH_WAIT_MS", "2"))
+WRITE_TIMEOUT_SECONDS = float(os.getenv("LMS_WRITE_TIMEOUT", "30"))
+
+_STOP = object()
+
+
+class _Op:
+    __slots__ = ("fn", "args", "future", "enqueued_at")
+
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+# ==================================================
+# METRICS
+# ==================================================
+_STATS_LOCK = threading.Lock()
+_STATS = {
+    "submitted": 0,
+    "committed": 0,
+    "failed": 0,
+    "batches": 0,
+    "max_depth": 0,
+}
+_COMMIT_MS = deque(maxlen=1000)
+_WAIT_MS = deque(maxlen=1000)
+
+
+def _pct(values, p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def write_queue_stats() -> dict:
+    """Queue depth, throughput counters and latency percentiles (ms)."""
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+        commit_ms = list(_COMMIT_MS)
+        wait_ms = list(_WAIT_MS)
+
+    stats.update(
+        enabled=WRITE_QUEUE_ENABLED,
+        running=_THREAD is not None and _THREAD.is_alive(),
+        depth=_QUEUE.qsize(),
+        avg_batch=(stats["committed"] + stats["failed"]) / stats["batches"] if stats["batches"] else 0.0,
+        commit_p50_ms=_pct(commit_ms, 50),
+        commit_p95_ms=_pct(commit_ms, 95),
+        wait_p50_ms=_pct(wait_ms, 50),
+        wait_p95_ms=_pct(wait_ms, 95),
+    )
+    return stats
+
+
+# ==================================================
+# WRITER THREAD
+# ==================================================
+_QUEUE: "queue.Queue" = queue.Queue()
+_THREAD = None
+_THREAD_LOCK = threading.Lock()
+
+
+def _next_batch() -> list:
+    first = _QUEUE.get()
+    if first is _STOP:
+        return [first]
+
+    batch = [first]
+    deadline = time.monotonic() + WRITE_BATCH_WAIT_MS / 1000
+    while len(batch) < WRITE_BATCH:
+        timeout = deadline - time.monotonic()
+        try:
+            op = _QUEUE.get(timeout=timeout) if timeout > 0 else _QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        batch.append(op)
+        if op is _STOP:
+            break
+    return batch
+
+
+def _run_batch(conn, ops: list) -> None:
+    results = []
+    t0 = time.perf_counter()
+
+    try:
+        conn.execute("BEGIN IMMEDIATE;")
+        for op in ops:
+            conn.execute("SAVEPOINT op;")
+            try:
+                value = op.fn(conn, *op.args)
+            except BaseException as e:
+                conn.execute("ROLLBACK TO op;")
+                conn.execute("RELEASE op;")
+                results.append((op, None, e))
+            else:
+                conn.execute("RELEASE op;")
+                results.append((op, value, None))
+        conn.commit()
+    except BaseException as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        results = [(op, None, e) for op in ops]
+
+    commit_ms = (time.perf_counter() - t0) * 1000
+    failed = sum(1 for _, _, err in results if err is not None)
+
+    with _STATS_LOCK:
+        _STATS["batches"] += 1
+        _STATS["committed"] += len(results) - failed
+        _STATS["failed"] += failed
+        _COMMIT_MS.append(commit_ms)
+        for op in ops:
+            _WAIT_MS.append((t0 - op.enqueued_at) * 1000)
+
+    for op, value, err in results:
+        if err is not None:
+            op.future.set_exception(err)
+        else:
+            op.future.set_result(value)
+
+
+def _writer_loop() -> None:
+    conn = _connect(DB_PATH)
+
+    try:
+        while True:
+            batch = _next_batch()
+            stop = batch[-1] is _STOP
+            ops = [op for op in batch if op is not _STOP]
+            if ops:
+                _run_batch(conn, ops)
+            if stop:
+                break
+    finally:
+        conn.close()
+
+
+def start_write_queue() -> bool:
+    """Start the writer thread once per process (no-op if disabled)."""
+    global _THREAD
+
+    if not WRITE_QUEUE_ENABLED:
+        return False
+
+    if _THREAD is not None and _THREAD.is_alive():
+        return True
+
+    with _THREAD_LOCK:
+        if _THREAD is None or not _THREAD.is_alive():
+            _THREAD = threading.Thread(target=_writer_loop, name="lms-db-writer", daemon=True)
+            _THREAD.start()
+        return True
+
+
+def stop_write_queue(timeout: float = 10) -> None:
+    """Drain queued writes and stop the writer thread."""
+    global _THREAD
+
+    with _THREAD_LOCK:
+        thread = _THREAD
+        if thread is None or not thread.is_alive():
+            return
+        _QUEUE.put(_STOP)
+    thread.join(timeout)
+    _THREAD = None
+
+
+atexit.register(stop_write_queue)
+
+
+# ==================================================
+# PUBLIC API
+# ==================================================
+def submit(fn: Callable[..., Any], *args) -> Future:
+    """
+    Queue fn(conn, *args) for the writer thread. The Future resolves to
+    fn's return value after COMMIT, or to its exception.
+    fn must not commit/rollback itself — the batch owns the transaction.
+    """
+    if threading.current_thread() is _THREAD:
+        raise RuntimeError("write ops must not submit further writes; use the conn they are given")
+
+    if not start_write_queue():
+        future = Future()
+        try:
+            with write_txn() as conn:
+                future.set_result(fn(conn, *args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+    op = _Op(fn, args)
+    _QUEUE.put(op)
+
+    depth = _QUEUE.qsize()
+    with _STATS_LOCK:
+        _STATS["submitted"] += 1
+        if depth > _STATS["max_depth"]:
+            _STATS["max_depth"] = depth
+    return op.future
+
+
+def run_write(fn: Callable[..., Any], *args, timeout: float = None) -> Any:
+    """submit() and wait; raises whatever fn raised."""
+    return submit(fn, *args).result(timeout if timeout is not None else WRITE_TIMEOUT_SECONDS)
@@ -0,0 +1,48 @@
+# tests/conftest.py
+#
+# One throwaway database + upload/certificate tree per test session.
+# services.db reads LMS_* at import time, so the environment is set
+# before anything under services/ is imported.
+
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+TMP = tempfile.mkdtemp(prefix="lms_tests_")
+os.environ["LMS_DB_PATH"] = os.path.join(TMP, "test.db")
+os.environ["LMS_UPLOAD_PATH"] = os.path.join(TMP, "uploads")
+os.environ["CERT_OUTPUT_DIR"] = os.path.join(TMP, "certificates")
+os.environ["LMS_BCRYPT_ROUNDS"] = "12"
+os.environ.setdefault("LMS_WRITE_QUEUE", "1")
+
+from services import password_policy  # noqa: E402
+
+# Keep hashing cheap in tests; the clamp floor is exercised explicitly
+password_policy._ROUNDS = 4
+
+from services.db import init_db, write_txn  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def make_user():
+    """Insert a student (or other role) and return its id."""
+
+    def _make(role="student", cohort="Cohort 1", username=None):
+        username = username or f"u_{uuid.uuid4().hex[:10]}"
+        with write_txn() as conn:
+            cur = conn.execute(
+                "INSERT INTO users (username, full_name, role, cohort, active, password_hash) "
+                "VALUES (?, ?, ?, ?, 1, ?)",
+                (username, username.title(), role, cohort, password_policy.hash_password("pw-123456")),
+            )
+            return cur.lastrowid
+
+    return _make
@@ -0,0 +1,60 @@
+from services.assignments import list_assignments_page
+from services.db import read_conn, write_txn
+
+
+def _add(uid, week, submitted_at, status="submitted"):
+    with write_txn() as conn:
+        return conn.execute(
+            "INSERT INTO assignments (user_id, week, file_path, submitted_at, status) VALUES (?, ?, 'x', ?, ?)",
+            (uid, week, submitted_at, status),
+        ).lastrowid
+
+
+def _all_pages(**filters):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = list_assignments_page(after=cursor, limit=2, **filters)
+        seen.extend(rows)
+        if cursor is None:
+            return seen
+
+
+def test_keyset_pages_are_newest_first_across_timestamp_formats(make_user):
+    cohort = "Keyset Cohort"
+    uid = make_user(cohort=cohort)
+    other = make_user(cohort=cohort)
+    # UI writes "YYYY-MM-DD HH:MM:SS", save_assignment writes isoformat ("T")
+    ids = [
+        _add(uid, 1, "2025-03-01 09:00:00"),
+        _add(uid, 2, "2025-03-01T10:00:00.123456"),
+        _add(uid, 3, "2025-03-01 11:00:00"),
+        _add(other, 1, "2025-03-01T11:00:00"),  # same second as week 3: id breaks the tie
+        _add(other, 2, None),  # no timestamp: stamped with the insert time
+    ]
+
+    rows = _all_pages(cohort=cohort)
+
+    assert [r["id"] for r in rows] == [ids[4], ids[3], ids[2], ids[1], ids[0]]
+    assert len({r["id"] for r in rows}) == len(rows)
+
+
+def test_keyset_pages_respect_filters(make_user):
+    cohort = "Keyset Filter Cohort"
+    uid = make_user(cohort=cohort)
+    for week in range(1, 6):
+        _add(uid, week, f"2025-04-0{week} 08:00:00", status="graded" if week % 2 else "submitted")
+
+    rows = _all_pages(cohort=cohort, status="graded")
+
+    assert [r["week"] for r in rows] == [5, 3, 1]
+
+
+def test_submitted_ts_follows_resubmission(make_user):
+    uid = make_user()
+    row_id = _add(uid, 1, "2025-01-01 00:00:00")
+    with write_txn() as conn:
+        conn.execute("UPDATE assignments SET submitted_at = '2025-01-02T00:00:00' WHERE id = ?", (row_id,))
+    with read_conn() as conn:
+        ts = conn.execute("SELECT submitted_ts FROM assignments WHERE id = ?", (row_id,)).fetchone()[0]
+
+    assert ts == 1735776000
@@ -0,0 +1,23 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_small_load_run_commits_every_write_without_lock_errors():
+    # bench_load.py points services.* at its own temp DB, so run it apart
+    env = {k: v for k, v in os.environ.items() if not k.startswith("LMS_") and k != "CERT_OUTPUT_DIR"}
+    out = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_load.py"),
+         "--users", "4", "--rounds", "1", "--students", "8", "--json"],
+        env=env, capture_output=True, text=True, timeout=300, check=True,
+    ).stdout
+    report = json.loads(out[out.index("\n{") + 1:])
+
+    assert report["operations"] > 0
+    assert (report["lock_errors"], report["timeouts"], report["other_errors"]) == (0, 0, 0)
+    assert {"login", "upload", "ticket"} <= set(report["by_operation"])
+    for queue in report["write_queue"]:
+        assert queue["failed"] == 0 and queue["committed"] == queue["submitted"]
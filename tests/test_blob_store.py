@@ -0,0 +1,174 @@
+import hashlib
+import io
+import os
+import time
+
+import pytest
+
+from services.blob_store import (
+    CHUNK_SIZE,
+    UploadTooLarge,
+    backfill_sizes,
+    blob_path,
+    gc_orphans,
+    import_legacy_files,
+    put_stream,
+    ref_count,
+)
+from services.db import UPLOAD_ROOT, read_conn, write_txn
+
+
+def _legacy_file(name, data):
+    path = os.path.join(UPLOAD_ROOT, "assignments", "legacy", name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return path
+
+
+def _row(uid, week, path):
+    with write_txn() as conn:
+        return conn.execute(
+            "INSERT INTO assignments (user_id, week, file_path, status) VALUES (?, ?, ?, 'submitted')",
+            (uid, week, path),
+        ).lastrowid
+
+
+def _fetch(row_id):
+    with read_conn() as conn:
+        return dict(conn.execute(
+            "SELECT file_path, file_sha256, file_size FROM assignments WHERE id = ?", (row_id,)
+        ).fetchone())
+
+
+def _tmp_parts():
+    tmp = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(blob_path("00" * 32)))), "tmp")
+    return [f for f in os.listdir(tmp) if f.endswith(".part")]
+
+
+def test_identical_uploads_are_stored_once():
+    a = put_stream(io.BytesIO(b"same bytes"))
+    b = put_stream(io.BytesIO(b"same bytes"))
+
+    assert a == b and a.path == blob_path(a.sha256) and a.size == 10
+
+
+def test_size_cap_rejects_without_leaving_temp_files():
+    with pytest.raises(UploadTooLarge):
+        put_stream(io.BytesIO(b"x" * 2048), max_bytes=1024)
+
+    assert not _tmp_parts()
+
+
+def test_multi_chunk_stream_is_hashed_and_sized_exactly():
+    data = os.urandom(CHUNK_SIZE * 2 + 123)
+    blob = put_stream(io.BytesIO(data), max_bytes=0)
+
+    assert blob.sha256 == hashlib.sha256(data).hexdigest()
+    assert blob.size == len(data) == os.path.getsize(blob.path)
+
+
+def test_declared_size_is_rejected_before_reading():
+    class Upload(io.BytesIO):
+        size = 10 * 1024
+
+        def read(self, *args):
+            raise AssertionError("read a file that was already too large")
+
+    with pytest.raises(UploadTooLarge, match="upload limit"):
+        put_stream(Upload(), max_bytes=1024)
+
+
+def test_failed_read_leaves_no_blob_or_temp_file():
+    class Broken(io.BytesIO):
+        def read(self, *args):
+            chunk = super().read(*args)
+            if not chunk:
+                raise OSError("connection reset")
+            return chunk
+
+    data = b"partial upload " + os.urandom(16)
+    with pytest.raises(OSError):
+        put_stream(Broken(data))
+
+    assert not os.path.exists(blob_path(hashlib.sha256(data).hexdigest()))
+    assert not _tmp_parts()
+
+
+def test_legacy_import_repoints_rows_in_batches_and_is_resumable(make_user):
+    uid = make_user()
+    rows = [_row(uid, w, _legacy_file(f"{uid}_w{w}.pdf", f"legacy {w}".encode())) for w in (1, 2, 3)]
+    missing = _row(uid, 4, "/nonexistent/file.pdf")
+
+    report = import_legacy_files(batch_size=2)
+
+    assert report["imported"] >= 3
+    for row_id in rows:
+        got = _fetch(row_id)
+        assert got["file_path"] == blob_path(got["file_sha256"]) and got["file_size"] == 8
+    assert _fetch(missing)["file_sha256"] is None
+
+    # Nothing left to do on a re-run
+    assert import_legacy_files()["imported"] == 0
+
+
+def test_legacy_import_skips_rows_changed_meanwhile(make_user, monkeypatch):
+    import services.blob_store as blob_store
+
+    uid = make_user()
+    row_id = _row(uid, 1, _legacy_file(f"{uid}_race.pdf", b"old"))
+    real_put_file = blob_store.put_file
+
+    def racing_put_file(path):
+        blob = real_put_file(path)
+        with write_txn() as conn:  # student resubmits while the file is hashed
+            conn.execute("UPDATE assignments SET file_path = '/new/upload.pdf' WHERE id = ?", (row_id,))
+        return blob
+
+    monkeypatch.setattr(blob_store, "put_file", racing_put_file)
+    import_legacy_files()
+
+    assert _fetch(row_id) == {"file_path": "/new/upload.pdf", "file_sha256": None, "file_size": None}
+
+
+def test_backfill_sizes_fills_only_missing(make_user):
+    uid = make_user()
+    blob = put_stream(io.BytesIO(b"twelve bytes"))
+    with write_txn() as conn:
+        row_id = conn.execute(
+            "INSERT INTO assignments (user_id, week, file_path, file_sha256) VALUES (?, 1, ?, ?)",
+            (uid, blob.path, blob.sha256),
+        ).lastrowid
+
+    assert backfill_sizes() >= 1
+    assert _fetch(row_id)["file_size"] == 12
+
+
+def test_gc_keeps_referenced_and_recent_blobs(make_user):
+    uid = make_user()
+    kept = put_stream(io.BytesIO(b"referenced %d" % time.time_ns()))
+    orphan = put_stream(io.BytesIO(b"orphan %d" % time.time_ns()))
+    with write_txn() as conn:
+        conn.execute(
+            "INSERT INTO assignments (user_id, week, file_path, file_sha256) VALUES (?, 1, ?, ?)",
+            (uid, kept.path, kept.sha256),
+        )
+
+    gc_orphans(grace_seconds=3600)
+    assert os.path.exists(orphan.path)  # inside the grace window
+
+    gc_orphans(grace_seconds=-1)
+    assert os.path.exists(kept.path) and ref_count(kept.sha256) == 1
+    assert not os.path.exists(orphan.path)
+
+
+def test_backfills_run_outside_the_migration(make_user):
+    from services.migrations import run_backfills
+
+    uid = make_user()
+    row_id = _row(uid, 1, _legacy_file(f"{uid}_bg.pdf", b"background"))
+
+    results = run_backfills()
+
+    assert results["assignment_blobs"]["imported"] >= 1
+    assert _fetch(row_id)["file_size"] == 10
@@ -0,0 +1,39 @@
+from services import blocklist
+from services.blocklist import block_reason, block_users, is_blocked, unblock_users
+from services.db import write_txn
+
+
+def test_block_and_unblock_apply_immediately(make_user):
+    uid = make_user()
+    assert not is_blocked(uid)
+
+    assert block_users([uid], reason="unpaid") == 1
+    assert block_reason(uid) == "unpaid"
+
+    assert unblock_users([uid]) == 1
+    assert not is_blocked(uid)
+
+
+def test_only_students_can_be_blocked(make_user):
+    admin = make_user(role="admin")
+    assert block_users([admin]) == 0
+    assert not is_blocked(admin)
+
+
+def test_direct_db_edits_show_up_after_recheck(make_user, monkeypatch):
+    uid = make_user()
+    assert not is_blocked(uid)  # loads and caches the set
+
+    # Another process blocks the student; the trigger bumps the counter
+    with write_txn() as conn:
+        conn.execute("UPDATE users SET is_blocked=1, blocked_reason='script' WHERE id=?", (uid,))
+
+    monkeypatch.setattr(blocklist, "RECHECK_SECONDS", 3600)
+    assert not is_blocked(uid)  # still served from memory
+
+    monkeypatch.setattr(blocklist, "RECHECK_SECONDS", 0)
+    assert block_reason(uid) == "script"
+
+    with write_txn() as conn:
+        conn.execute("UPDATE users SET is_blocked=0 WHERE id=?", (uid,))
+    assert not is_blocked(uid)
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from services.broadcasts import (
+    create_broadcast,
+    get_active_broadcasts,
+    get_broadcasts_for_user,
+    mark_many_as_read,
+    unread_count,
+)
+from services.db import write_txn
+
+
+def _broadcast(title, created_at=None, active=1):
+    created_at = created_at or datetime.utcnow().isoformat()
+    with write_txn() as conn:
+        return conn.execute(
+            "INSERT INTO broadcasts (title, message, created_at, active) VALUES (?, 'm', ?, ?)",
+            (title, created_at, active),
+        ).lastrowid
+
+
+def test_active_window_uses_created_ts():
+    old = (datetime.utcnow() - timedelta(days=4)).strftime("%Y-%m-%d %H:%M:%S")
+    recent = (datetime.utcnow() - timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    ids = [_broadcast("old", old), _broadcast("recent", recent), _broadcast("off", active=0)]
+
+    active = {r["id"] for r in get_active_broadcasts()}
+    assert ids[1] in active
+    assert ids[0] not in active and ids[2] not in active
+
+
+def test_read_state_and_unread_badge(make_user):
+    uid = make_user()
+    admin = make_user(role="admin")
+    before = unread_count(uid)
+
+    create_broadcast("hello", "world", admin)
+    create_broadcast("again", "world", admin)
+    assert unread_count(uid) == before + 2
+
+    items = get_broadcasts_for_user(uid)
+    new = [i["id"] for i in items if i["title"] in ("hello", "again")]
+    assert len(new) == 2 and not any(i["is_read"] for i in items if i["id"] in new)
+
+    mark_many_as_read(new + new, uid)  # duplicates are ignored
+    assert unread_count(uid) == before
+    assert all(i["is_read"] and i["read_at"] for i in get_broadcasts_for_user(uid) if i["id"] in new)
@@ -0,0 +1,60 @@
+from services import certificate_batch
+from services.certificate_batch import eligible_students, issue_certificates_bulk
+from services.certificates import CERT_TEMPLATE_VERSION
+from services.db import read_conn, write_txn
+
+
+def _graduate(uid):
+    with write_txn() as conn:
+        conn.executemany(
+            "INSERT INTO assignments (user_id, week, status, grade) VALUES (?, ?, 'approved', 90)",
+            [(uid, week) for week in range(1, 7)],
+        )
+
+
+def _fake_pdf(full_name, out_path):
+    with open(out_path, "wb") as fh:
+        fh.write(b"%PDF-1.4 " + full_name.encode())
+    return out_path
+
+
+def _rows(uid):
+    with read_conn() as conn:
+        return conn.execute(
+            "SELECT template_version FROM certificates WHERE user_id = ?", (uid,)
+        ).fetchall()
+
+
+def test_bulk_issue_records_one_current_row(make_user, monkeypatch):
+    monkeypatch.setattr(certificate_batch, "_build_certificate_pdf", _fake_pdf)
+    uid = make_user()
+    _graduate(uid)
+
+    assert uid in {s["user_id"] for s in eligible_students()}
+    report = issue_certificates_bulk(workers=1)
+    assert report["failed"] == []
+
+    rows = _rows(uid)
+    assert [r["template_version"] for r in rows] == [CERT_TEMPLATE_VERSION]
+    assert uid not in {s["user_id"] for s in eligible_students()}
+
+
+def test_bulk_issue_updates_row_inserted_while_rendering(make_user, monkeypatch):
+    uid = make_user()
+    _graduate(uid)
+
+    def render_while_worker_issues(full_name, out_path):
+        # The background worker issues this student's certificate mid-run
+        if _rows(uid):
+            return _fake_pdf(full_name, out_path)
+        with write_txn() as conn:
+            conn.execute(
+                "INSERT INTO certificates (user_id, certificate_path, template_version) VALUES (?, 'x.pdf', 'old')",
+                (uid,),
+            )
+        return _fake_pdf(full_name, out_path)
+
+    monkeypatch.setattr(certificate_batch, "_build_certificate_pdf", render_while_worker_issues)
+    issue_certificates_bulk(workers=1)
+
+    assert [r["template_version"] for r in _rows(uid)] == [CERT_TEMPLATE_VERSION]
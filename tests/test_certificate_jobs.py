@@ -0,0 +1,81 @@
+from services import certificate_jobs
+from services.certificate_jobs import enqueue_certificate, enqueue_regeneration, get_latest_job, run_pending_jobs
+from services.certificates import CERT_TEMPLATE_VERSION
+from services.db import read_conn, write_txn
+
+
+def _certificate(uid, version):
+    with write_txn() as conn:
+        conn.execute(
+            "INSERT INTO certificates (user_id, issued_at, certificate_path, template_version) "
+            "VALUES (?, datetime('now'), '/nowhere.pdf', ?)",
+            (uid, version),
+        )
+
+
+def _queued_users():
+    with read_conn() as conn:
+        return {r[0] for r in conn.execute("SELECT user_id FROM certificate_jobs WHERE status = 'queued'")}
+
+
+def _clear_jobs():
+    with write_txn() as conn:
+        conn.execute("DELETE FROM certificate_jobs")
+
+
+def test_regeneration_targets_only_certificates_off_the_current_template(make_user):
+    _clear_jobs()
+    old, current, busy = make_user(), make_user(), make_user()
+    _certificate(old, "v0-old")
+    _certificate(current, CERT_TEMPLATE_VERSION)
+    _certificate(busy, "v0-old")
+    enqueue_certificate(busy, "Busy")
+
+    assert enqueue_regeneration() == 1
+    assert old in _queued_users() and current not in _queued_users()
+    # The student who already had a job is not queued twice
+    with read_conn() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM certificate_jobs WHERE user_id = ?", (busy,)).fetchone()[0] == 1
+
+
+def test_enqueue_reuses_an_active_job(make_user):
+    uid = make_user()
+
+    assert enqueue_certificate(uid, "A") == enqueue_certificate(uid, "A")
+
+
+def test_worker_records_done_and_failed(make_user, monkeypatch):
+    _clear_jobs()
+    ok, bad = make_user(), make_user()
+
+    def fake_issue(user_id, full_name):
+        if user_id == bad:
+            raise RuntimeError("render failed")
+        return f"/certs/{user_id}.pdf"
+
+    monkeypatch.setattr(certificate_jobs, "issue_certificate", fake_issue)
+    enqueue_certificate(ok, "Ok")
+    enqueue_certificate(bad, "Bad")
+
+    assert run_pending_jobs() == 2
+    assert get_latest_job(ok)["status"] == "done"
+    assert get_latest_job(ok)["certificate_path"] == f"/certs/{ok}.pdf"
+    assert get_latest_job(bad)["status"] == "failed"
+
+
+def test_jobs_left_running_by_a_restart_are_requeued(make_user, monkeypatch):
+    _clear_jobs()
+    uid = make_user()
+    job_id = enqueue_certificate(uid, "Restarted")
+    assert certificate_jobs._claim_next_job()["id"] == job_id  # claimed seconds ago, then the process died
+
+    # Still blocks the student: enqueue hands back the dead job
+    assert enqueue_certificate(uid, "Restarted") == job_id
+    assert certificate_jobs._requeue_running_jobs(certificate_jobs.STALE_RUNNING_MINUTES) == 0
+
+    # Worker startup requeues it regardless of age
+    monkeypatch.setattr(certificate_jobs, "issue_certificate", lambda user_id, full_name: "/certs/x.pdf")
+    assert certificate_jobs._requeue_running_jobs() == 1
+    assert get_latest_job(uid)["status"] == "queued"
+    assert run_pending_jobs() == 1
+    assert get_latest_job(uid)["status"] == "done"
@@ -0,0 +1,62 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+from pypdf import PdfReader
+
+from services import certificates
+from services.certificates import (
+    CERT_TEMPLATE_VERSION,
+    _build_certificate_pdf,
+    get_certificate_record,
+    issue_certificate,
+)
+
+
+def _png(path, color):
+    Image.new("RGB", (40, 30), color).save(path)
+
+
+@pytest.fixture
+def background(tmp_path, monkeypatch):
+    path = str(tmp_path / "bg.png")
+    _png(path, "white")
+    monkeypatch.setattr(certificates, "_resolve_bg_path", lambda: path)
+    certificates._BG_CACHE.clear()
+    yield path
+    certificates._BG_CACHE.clear()
+
+
+def test_background_and_template_are_cached_until_the_png_changes(background):
+    bg = certificates._background()
+    template = certificates._template_pdf_bytes(bg)
+
+    assert certificates._background()["reader"] is bg["reader"]
+    assert certificates._template_pdf_bytes(bg) is template
+
+    _png(background, "black")
+    os.utime(background, (bg["mtime"] + 10, bg["mtime"] + 10))
+    fresh = certificates._background()
+    assert fresh["reader"] is not bg["reader"]
+    assert certificates._template_pdf_bytes(fresh) is not template
+
+
+def test_rendered_certificate_carries_name_and_version(background, tmp_path):
+    path = _build_certificate_pdf("Ada Lovelace", str(tmp_path / "out" / "cert.pdf"))
+
+    with open(path, "rb") as fh:
+        reader = PdfReader(io.BytesIO(fh.read()))
+    text = reader.pages[0].extract_text()
+    assert len(reader.pages) == 1
+    assert "Ada Lovelace" in text
+    assert f"CERT_VER={CERT_TEMPLATE_VERSION}" in text
+
+
+def test_issue_reuses_a_current_certificate(background, make_user):
+    uid = make_user()
+    first = issue_certificate(uid, "Grace Hopper")
+
+    assert os.path.exists(first)
+    assert issue_certificate(uid, "Grace Hopper") == first
+    assert get_certificate_record(uid)["template_version"] == CERT_TEMPLATE_VERSION
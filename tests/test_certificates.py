@@ -0,0 +1,56 @@
+import os
+
+from services.certificates import (
+    OUTPUT_DIR,
+    backfill_certificate_keys,
+    certificate_key,
+    invalidate_certificate_cache,
+    resolve_certificate,
+)
+from services.db import read_conn, write_txn
+
+
+def _pdf(name, data=b"%PDF-1.4 test"):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(OUTPUT_DIR, name)
+    with open(path, "wb") as fh:
+        fh.write(data)
+    return path
+
+
+def test_certificate_key_is_relative_to_output_dir():
+    assert certificate_key(os.path.join(OUTPUT_DIR, "sub", "a.pdf")) == "sub/a.pdf"
+    assert certificate_key("/somewhere/else/a.pdf") is None
+
+
+def test_backfill_records_key_size_and_checksum(make_user):
+    uid = make_user()
+    path = _pdf(f"certificate_x_{uid}_1.pdf")
+    with write_txn() as conn:
+        row_id = conn.execute(
+            "INSERT INTO certificates (user_id, certificate_path) VALUES (?, ?)",
+            (uid, os.path.basename(path)),  # legacy relative path
+        ).lastrowid
+
+    assert backfill_certificate_keys() >= 1
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT certificate_path, certificate_key, file_size, file_sha256 FROM certificates WHERE id = ?",
+            (row_id,),
+        ).fetchone()
+    assert row["certificate_path"] == os.path.abspath(path)
+    assert row["certificate_key"] == os.path.basename(path)
+    assert row["file_size"] == 13 and len(row["file_sha256"]) == 64
+    assert backfill_certificate_keys() == 0
+
+
+def test_resolver_caches_hits_until_invalidated():
+    path = _pdf("cached.pdf")
+    rec = {"certificate_key": "cached.pdf"}
+
+    assert resolve_certificate(rec) == os.path.abspath(path)
+    os.remove(path)
+    assert resolve_certificate(rec) == os.path.abspath(path)  # served from cache
+
+    invalidate_certificate_cache(rec)
+    assert resolve_certificate(rec) is None
@@ -0,0 +1,54 @@
+from services.cohort_stats import check_cohort_stats, get_cohort_progress
+from services.db import write_txn
+
+
+def _row(cohort, week):
+    return next((r for r in get_cohort_progress(cohort) if r["week"] == week), None)
+
+
+def test_triggers_track_progress_and_grades(make_user):
+    cohort = "Stats A"
+    uid = make_user(cohort=cohort)
+    with write_txn() as conn:
+        conn.execute("INSERT INTO progress (user_id, week, status) VALUES (?, 1, 'unlocked')", (uid,))
+        conn.execute(
+            "INSERT INTO assignments (user_id, week, status, grade) VALUES (?, 1, 'approved', 80)", (uid,)
+        )
+        conn.execute("UPDATE progress SET status='completed' WHERE user_id=? AND week=1", (uid,))
+
+    row = _row(cohort, 1)
+    assert (row["students"], row["unlocked"], row["completed"]) == (1, 0, 1)
+    assert (row["submitted"], row["graded"], row["avg_grade"]) == (1, 1, 80.0)
+    assert check_cohort_stats() == []
+
+
+def test_cohort_move_and_delete_stay_consistent(make_user):
+    uid = make_user(cohort="Stats B")
+    with write_txn() as conn:
+        conn.execute("INSERT INTO progress (user_id, week, status) VALUES (?, 2, 'unlocked')", (uid,))
+        conn.execute("INSERT INTO assignments (user_id, week, status) VALUES (?, 2, 'submitted')", (uid,))
+        conn.execute("UPDATE users SET cohort='Stats C' WHERE id=?", (uid,))
+
+    assert _row("Stats B", 2)["students"] == 0
+    assert (_row("Stats C", 2)["students"], _row("Stats C", 2)["submitted"]) == (1, 1)
+
+    with write_txn() as conn:
+        conn.execute("DELETE FROM assignments WHERE user_id=?", (uid,))
+        conn.execute("DELETE FROM progress WHERE user_id=?", (uid,))
+        conn.execute("DELETE FROM users WHERE id=?", (uid,))
+
+    assert _row("Stats C", 2)["students"] == 0
+    assert check_cohort_stats() == []
+
+
+def test_check_reports_drift():
+    with write_txn() as conn:
+        conn.execute(
+            "INSERT INTO cohort_progress_stats (cohort, week, students) VALUES ('Stats D', 9, 5)"
+        )
+    try:
+        drift = check_cohort_stats()
+        assert [(d["cohort"], d["week"]) for d in drift] == [("Stats D", 9)]
+    finally:
+        with write_txn() as conn:
+            conn.execute("DELETE FROM cohort_progress_stats WHERE cohort='Stats D'")
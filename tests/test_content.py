@@ -0,0 +1,42 @@
+import os
+
+from services.content import ContentStore, split_sections
+
+
+def _write(path, text, mtime=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+def test_split_sections_ignores_headings_in_code_fences():
+    text = "intro\n# One\nbody\n```\n# not a heading\n```\n## Two\nmore"
+    assert split_sections(text) == [
+        ("", "intro"),
+        ("One", "body\n```\n# not a heading\n```"),
+        ("Two", "more"),
+    ]
+
+
+def test_store_serves_from_memory_until_recheck(tmp_path):
+    page = tmp_path / "week1.md"
+    _write(page, "# Week 1\nold", mtime=1_000_000)
+    store = ContentStore(str(tmp_path), recheck_seconds=3600)
+
+    assert store.week(1).sections == [("Week 1", "old")]
+    _write(page, "# Week 1\nnew text", mtime=2_000_000)
+    assert store.week(1).text == "# Week 1\nold"
+
+    store.recheck_seconds = 0
+    assert store.week(1).text == "# Week 1\nnew text"
+
+
+def test_missing_file_appears_after_recheck(tmp_path):
+    store = ContentStore(str(tmp_path), recheck_seconds=0)
+    assert store.week(2) is None
+
+    _write(tmp_path / "week2.md", "hello")
+    assert store.week(2).sections == [("", "hello")]
+
+    os.remove(tmp_path / "week2.md")
+    assert store.week(2) is None
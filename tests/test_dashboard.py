@@ -0,0 +1,43 @@
+from services.dashboard import get_dashboard_snapshot, invalidate_snapshot
+from services.db import write_txn
+
+
+def test_snapshot_defaults_for_a_new_student(make_user):
+    snap = get_dashboard_snapshot(make_user(), use_cache=False)
+
+    assert snap.progress[0] == "unlocked"
+    assert all(snap.progress[w] == "locked" for w in range(1, 7))
+    assert snap.assignments == {} and snap.certificate is None
+    assert not snap.certificate_eligible and not snap.exam_unlocked
+
+
+def test_snapshot_reads_submissions_and_latest_certificate(make_user):
+    uid = make_user()
+    with write_txn() as conn:
+        conn.execute("INSERT INTO progress (user_id, week, status) VALUES (?, 1, 'completed')", (uid,))
+        conn.executemany(
+            "INSERT INTO assignments (user_id, week, status, grade) VALUES (?, ?, ?, ?)",
+            [(uid, 1, "approved", 70), (uid, 2, "submitted", None)],
+        )
+        conn.executemany(
+            "INSERT INTO certificates (user_id, issued_at, certificate_path) VALUES (?, ?, ?)",
+            [(uid, "2025-01-01", "old.pdf"), (uid, "2025-02-01", "new.pdf")],
+        )
+
+    snap = get_dashboard_snapshot(uid, use_cache=False)
+    assert snap.progress[1] == "completed" and snap.completed_weeks == 1
+    assert {w: a["status"] for w, a in snap.assignments.items()} == {1: "approved", 2: "submitted"}
+    assert snap.graded_count == 1
+    assert snap.certificate["certificate_path"] == "new.pdf"
+
+
+def test_cached_snapshot_until_invalidated(make_user):
+    uid = make_user()
+    first = get_dashboard_snapshot(uid)
+
+    with write_txn() as conn:
+        conn.execute("INSERT INTO progress (user_id, week, status) VALUES (?, 2, 'unlocked')", (uid,))
+
+    assert get_dashboard_snapshot(uid) is first
+    invalidate_snapshot(uid)
+    assert get_dashboard_snapshot(uid).progress[2] == "unlocked"
@@ -0,0 +1,16 @@
+from services.db import columns, has_column, ordered_columns, read_conn, table_exists
+
+
+def test_ordered_columns_follow_table_info():
+    with read_conn() as conn:
+        declared = tuple(r[1] for r in conn.execute("PRAGMA table_info(support_tickets)").fetchall())
+
+    assert ordered_columns("support_tickets") == declared
+    assert columns("support_tickets") == frozenset(declared)
+    assert has_column("support_tickets", declared[0])
+
+
+def test_missing_table_has_no_columns():
+    assert not table_exists("no_such_table")
+    assert ordered_columns("no_such_table") == ()
+    assert columns("no_such_table") == frozenset()
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from services.db import DB_PATH, _connect, read_conn, write_txn
+from services.db_pool import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), _connect, size=2, max_age=300)
+    yield pool
+    pool.close_all()
+
+
+def test_released_connection_is_reused_on_the_same_thread(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert pool.acquire() is conn
+    assert pool.stats()["hits"] == 1 and pool.stats()["misses"] == 1
+
+
+def test_release_rolls_back_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x)")
+    conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_extras_beyond_size_are_closed(pool):
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+
+    # The first release still counts the two in use, so that one is closed
+    assert pool.stats()["idle"] == 2
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[0].execute("SELECT 1")
+
+
+def test_expired_connections_are_recycled(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "old.db"), _connect, size=2, max_age=0.000001)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert pool.acquire() is not conn
+    assert pool.stats()["recycled"] >= 1
+
+
+def test_idle_connections_of_finished_threads_are_adopted(pool):
+    seen = []
+
+    def worker():
+        conn = pool.acquire()
+        seen.append(conn)
+        pool.release(conn)
+
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+
+    assert pool.acquire() is seen[0]
+
+
+def test_write_txn_rolls_back_on_error():
+    with pytest.raises(RuntimeError):
+        with write_txn() as conn:
+            conn.execute("INSERT INTO users (username, role) VALUES ('pool_rollback', 'student')")
+            raise RuntimeError("boom")
+
+    with read_conn() as conn:
+        assert conn.execute("SELECT 1 FROM users WHERE username='pool_rollback'").fetchone() is None
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert os.path.exists(DB_PATH)
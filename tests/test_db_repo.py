@@ -0,0 +1,39 @@
+import sqlite3
+
+import pytest
+
+import db_repo
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_repo, "DB_PATH", str(tmp_path / "help.db"))
+    monkeypatch.setattr(db_repo, "_INIT_DONE", False)
+    return db_repo
+
+
+def _edit_created_at(ticket_id, created_at):
+    with db_repo.connect() as conn:
+        conn.execute("UPDATE help_support_tickets SET created_at = ? WHERE id = ?", (created_at, ticket_id))
+        conn.commit()
+
+
+def test_edited_created_at_reorders_the_listing(repo):
+    first = repo.create_ticket("s1", "One", 1, "general", "a", "m")
+    second = repo.create_ticket("s2", "Two", 1, "general", "b", "m")
+
+    _edit_created_at(first, "2099-01-01 00:00:00")
+
+    tickets = repo.list_tickets()
+    assert [t["id"] for t in tickets] == [first, second]
+    assert tickets[0]["created_ts"] == 4070908800
+
+
+def test_init_heals_created_ts_left_stale_by_older_schema(repo):
+    ticket = repo.create_ticket("s1", "One", 1, "general", "a", "m")
+    with sqlite3.connect(repo.DB_PATH) as conn:
+        conn.execute("DROP TRIGGER trg_help_support_tickets_created_ts_update")
+        conn.execute("UPDATE help_support_tickets SET created_at = '2000-01-01 00:00:00' WHERE id = ?", (ticket,))
+
+    repo._INIT_DONE = False
+    assert repo.list_tickets()[0]["created_ts"] == 946684800
@@ -0,0 +1,82 @@
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from services import db, downloads
+from services.db import UPLOAD_ROOT
+from services.downloads import (
+    _DownloadHandler,
+    file_provider,
+    make_download_token,
+    verify_download_token,
+)
+
+
+@pytest.fixture
+def upload(tmp_path):
+    os.makedirs(UPLOAD_ROOT, exist_ok=True)
+    path = os.path.join(UPLOAD_ROOT, "download_test.pdf")
+    with open(path, "wb") as fh:
+        fh.write(b"x" * 200_000)
+    yield path
+    os.remove(path)
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _DownloadHandler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_file_provider_reads_only_when_called(upload):
+    provider = file_provider(upload)
+    os.replace(upload, upload + ".tmp")
+    try:
+        with pytest.raises(FileNotFoundError):
+            provider()
+    finally:
+        os.replace(upload + ".tmp", upload)
+    assert len(provider()) == 200_000
+
+
+def test_tokens_are_signed_expiring_and_rooted(upload, tmp_path):
+    token = make_download_token(upload, "report.pdf")
+    assert verify_download_token(token) == (os.path.abspath(upload), "report.pdf")
+
+    body, sig = token.split(".")
+    assert verify_download_token(body + "." + sig[::-1]) is None
+    assert verify_download_token(make_download_token(upload, ttl=-1)) is None
+    assert verify_download_token(make_download_token(str(tmp_path / "elsewhere.pdf"))) is None
+
+
+def test_symlinked_data_root_is_allowed(tmp_path, monkeypatch):
+    real = tmp_path / "volume"
+    real.mkdir()
+    link = tmp_path / "data"
+    link.symlink_to(real, target_is_directory=True)
+    path = link / "report.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    monkeypatch.setattr(db, "UPLOAD_ROOT", str(link))
+    monkeypatch.setattr(downloads, "_ROOTS", None)
+
+    assert verify_download_token(make_download_token(str(path))) == (str(path), "report.pdf")
+
+
+def test_endpoint_streams_the_whole_file(upload, server):
+    token = make_download_token(upload, "report.pdf")
+    with urllib.request.urlopen(f"{server}/download/{token}") as resp:
+        assert resp.headers["Content-Length"] == "200000"
+        assert "report.pdf" in resp.headers["Content-Disposition"]
+        assert resp.read() == b"x" * 200_000
+
+    with pytest.raises(urllib.error.HTTPError) as err:
+        urllib.request.urlopen(f"{server}/download/bogus.token")
+    assert err.value.code == 403
@@ -0,0 +1,34 @@
+import sqlite3
+
+from services.db import read_conn
+from services.indexes import INDEXES, ensure_indexes, missing_indexes
+
+
+def test_every_declared_index_exists():
+    with read_conn() as conn:
+        assert missing_indexes(conn) == []
+
+
+def test_ensure_indexes_dedupes_before_the_unique_index():
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE assignments (id INTEGER PRIMARY KEY, user_id, week, status)")
+        conn.executemany(
+            "INSERT INTO assignments (user_id, week, status) VALUES (?, ?, ?)",
+            [(1, 1, "old"), (1, 1, "new"), (1, 2, "only")],
+        )
+
+        created = ensure_indexes(conn.cursor())
+
+        # Only indexes whose table and columns exist are created
+        assert created == ["ux_assignments_user_week"]
+        assert missing_indexes(conn) == []
+        rows = conn.execute("SELECT week, status FROM assignments ORDER BY week").fetchall()
+        assert rows == [(1, "new"), (2, "only")]
+        assert ensure_indexes(conn.cursor()) == []
+    finally:
+        conn.close()
+
+
+def test_index_names_are_unique():
+    assert len({i.name for i in INDEXES}) == len(INDEXES)
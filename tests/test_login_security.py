@@ -0,0 +1,116 @@
+import time
+
+from services import login_security
+from services.db import read_conn, write_txn
+from services.login_security import (
+    client_ip,
+    issue_session_token,
+    record_attempt,
+    resume_session,
+    revoke_session,
+    throttle_wait,
+)
+
+
+def _hash_of(uid):
+    with read_conn() as conn:
+        return conn.execute("SELECT password_hash FROM users WHERE id = ?", (uid,)).fetchone()[0]
+
+
+def test_token_resumes_until_revoked(make_user):
+    uid = make_user()
+    token = issue_session_token(uid, _hash_of(uid))
+
+    assert resume_session(token)["id"] == uid
+    assert revoke_session(token) is True
+    assert resume_session(token) is None
+
+
+def test_tampered_or_expired_token_is_rejected(make_user):
+    uid = make_user()
+    token = issue_session_token(uid, _hash_of(uid))
+    body, sig = token.split(".", 1)
+
+    assert resume_session(body + "." + sig[::-1]) is None
+    assert resume_session(issue_session_token(uid, _hash_of(uid), ttl=-1)) is None
+
+
+def test_password_change_invalidates_token(make_user):
+    uid = make_user()
+    token = issue_session_token(uid, _hash_of(uid))
+    with write_txn() as conn:
+        conn.execute("UPDATE users SET password_hash = ? WHERE id = ?", (b"$2b$04$other", uid))
+
+    assert resume_session(token) is None
+
+
+def test_deactivating_or_blocking_revokes_every_session(make_user):
+    uid = make_user()
+    first = issue_session_token(uid, _hash_of(uid))
+    second = issue_session_token(uid, _hash_of(uid))
+    with write_txn() as conn:
+        conn.execute("UPDATE users SET is_blocked = 1 WHERE id = ?", (uid,))
+        conn.execute("UPDATE users SET is_blocked = 0 WHERE id = ?", (uid,))
+
+    # Unblocking does not bring old tokens back
+    assert resume_session(first) is None and resume_session(second) is None
+
+    other = make_user()
+    token = issue_session_token(other, _hash_of(other))
+    with write_txn() as conn:
+        conn.execute("UPDATE users SET active = 0 WHERE id = ?", (other,))
+        conn.execute("UPDATE users SET active = 1 WHERE id = ?", (other,))
+    assert resume_session(token) is None
+
+
+class _Headers(dict):
+    def get(self, key, default=None):
+        return super().get(key, default)
+
+
+def test_forwarding_headers_ignored_without_trusted_proxy():
+    headers = _Headers({"X-Forwarded-For": "1.2.3.4", "X-Real-Ip": "5.6.7.8"})
+
+    assert client_ip(headers, "9.9.9.9", hops=0) == "9.9.9.9"
+
+
+def test_forwarding_header_uses_the_address_the_proxy_saw():
+    # Client spoofs the first entry; the one trusted proxy appended the real one
+    headers = _Headers({"X-Forwarded-For": "6.6.6.6, 203.0.113.7"})
+
+    assert client_ip(headers, "10.0.0.1", hops=1) == "203.0.113.7"
+    assert client_ip(_Headers({"X-Real-Ip": "203.0.113.8"}), "10.0.0.1", hops=1) == "203.0.113.8"
+
+
+def test_throttle_blocks_after_limit_and_reopens_after_window(monkeypatch):
+    name = f"throttle_{time.time_ns()}"
+    for _ in range(login_security.LOGIN_MAX_FAILURES_PER_USER):
+        assert throttle_wait(name) == 0
+        record_attempt(name, None, success=False)
+
+    wait = throttle_wait(name)
+    assert 0 < wait <= login_security.LOGIN_WINDOW_SECONDS + 1
+
+    # Failures older than the window no longer count
+    real_time = time.time
+    monkeypatch.setattr(login_security.time, "time", lambda: real_time() + login_security.LOGIN_WINDOW_SECONDS + 2)
+    assert throttle_wait(name) == 0
+
+
+def test_success_clears_failures():
+    name = f"throttle_ok_{time.time_ns()}"
+    for _ in range(login_security.LOGIN_MAX_FAILURES_PER_USER):
+        record_attempt(name, None, success=False)
+    record_attempt(name, None, success=True)
+
+    assert throttle_wait(name) == 0
+
+
+def test_per_ip_limit_is_independent_of_username():
+    ip = f"198.51.100.{time.time_ns() % 250}"
+    with write_txn() as conn:
+        conn.execute("DELETE FROM login_attempts WHERE ip = ?", (ip,))
+    for i in range(login_security.LOGIN_MAX_FAILURES_PER_IP):
+        record_attempt(f"spray_{i}_{time.time_ns()}", ip, success=False)
+
+    assert throttle_wait("someone_else", ip) > 0
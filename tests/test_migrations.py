@@ -0,0 +1,64 @@
+from services import migrations
+from services.db import _connect, read_conn, write_txn
+from services.migrations import MIGRATIONS, SCHEMA_VERSION, current_version, run_migrations
+
+
+def test_steps_are_numbered_contiguously():
+    assert [v for v, _, _ in MIGRATIONS] == list(range(1, SCHEMA_VERSION + 1))
+    assert len({name for _, name, _ in MIGRATIONS}) == len(MIGRATIONS)
+
+
+def test_database_is_at_the_latest_version():
+    with read_conn() as conn:
+        assert current_version(conn) == SCHEMA_VERSION
+        applied = conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+    assert applied == SCHEMA_VERSION
+
+
+def test_run_migrations_is_a_no_op_once_done(monkeypatch):
+    assert run_migrations() == 0
+
+    def boom(cur):
+        raise AssertionError("applied step re-ran")
+
+    # Even a forced run only re-reads the version table
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(v, n, boom) for v, n, _ in MIGRATIONS])
+    assert run_migrations(force=True) == 0
+
+
+def test_steps_are_idempotent_on_an_unversioned_database(tmp_path):
+    # Pre-versioning databases replay every step over an existing schema
+    conn = _connect(str(tmp_path / "legacy.db"))
+    try:
+        cur = conn.cursor()
+        for _, _, step in MIGRATIONS:
+            step(cur)
+        for _, _, step in MIGRATIONS:
+            step(cur)
+        conn.commit()
+        assert current_version(conn) == 0
+    finally:
+        conn.close()
+
+
+def test_created_ts_tracks_mixed_created_at_formats(make_user):
+    uid = make_user()
+    with write_txn() as conn:
+        ids = [
+            conn.execute(
+                "INSERT INTO support_tickets (user_id, subject, created_at) VALUES (?, 's', ?)",
+                (uid, created_at),
+            ).lastrowid
+            for created_at in ("2025-01-02 10:00:00", "2025-01-02T09:00:00.123456", None)
+        ]
+        conn.execute("UPDATE support_tickets SET created_at='2024-12-31 00:00:00' WHERE id=?", (ids[0],))
+
+    with read_conn() as conn:
+        ts = [
+            conn.execute("SELECT created_ts FROM support_tickets WHERE id=?", (i,)).fetchone()[0]
+            for i in ids
+        ]
+
+    assert ts[0] == 1735603200  # follows the UPDATE
+    assert ts[1] == 1735808400  # ISO 'T' with microseconds
+    assert ts[2] > ts[1]        # no created_at: stamped with the insert time
@@ -0,0 +1,31 @@
+from services import password_policy
+from services.password_policy import MIN_ROUNDS, calibrate, needs_rehash, rounds_of
+
+
+def test_calibration_never_goes_below_the_old_default(monkeypatch):
+    # Even on hardware far too slow for the target, the cost stays at 12
+    monkeypatch.setattr(password_policy, "measure_ms", lambda rounds, samples=1: 10_000.0)
+
+    assert MIN_ROUNDS >= 12
+    assert calibrate(target_ms=1) == MIN_ROUNDS
+
+
+def test_calibration_raises_cost_on_fast_hardware(monkeypatch):
+    monkeypatch.setattr(password_policy, "measure_ms", lambda rounds, samples=1: 50.0)
+
+    # 50 ms at the floor -> 100 ms at +1 -> 200 ms at +2 (fits 250 ms)
+    assert calibrate(target_ms=250) == MIN_ROUNDS + 2
+
+
+def test_pinned_cost_is_clamped_to_the_floor():
+    assert password_policy._clamp(4) == MIN_ROUNDS
+    assert password_policy._clamp(99) == password_policy.MAX_ROUNDS
+
+
+def test_needs_rehash_flags_weaker_hashes(monkeypatch):
+    monkeypatch.setattr(password_policy, "_ROUNDS", 12)
+
+    assert rounds_of(b"$2b$10$" + b"x" * 53) == 10
+    assert needs_rehash(b"$2b$10$" + b"x" * 53)
+    assert not needs_rehash("$2b$12$" + "x" * 53)
+    assert not needs_rehash(b"not-a-bcrypt-hash")
@@ -0,0 +1,30 @@
+from services.db import read_conn, write_txn
+from services.progress import bulk_unlock_week
+
+
+def _status(uid, week):
+    with read_conn() as conn:
+        row = conn.execute("SELECT status FROM progress WHERE user_id=? AND week=?", (uid, week)).fetchone()
+    return row["status"] if row else None
+
+
+def test_bulk_unlock_treats_null_cohort_as_cohort_1(make_user):
+    legacy = make_user(cohort=None)
+    first = make_user(cohort="Cohort 1")
+    second = make_user(cohort="Cohort 2")
+    ids = [legacy, first, second]
+
+    assert bulk_unlock_week(3, user_ids=ids, cohort="Cohort 1") == 2
+    assert [_status(u, 3) for u in ids] == ["unlocked", "unlocked", None]
+
+    assert bulk_unlock_week(4, user_ids=ids, cohort="Cohort 2") == 1
+    assert [_status(u, 4) for u in ids] == [None, None, "unlocked"]
+
+
+def test_bulk_unlock_keeps_completed_weeks(make_user):
+    uid = make_user()
+    with write_txn() as conn:
+        conn.execute("INSERT INTO progress (user_id, week, status) VALUES (?, 5, 'completed')", (uid,))
+
+    bulk_unlock_week(5, user_ids=[uid])
+    assert _status(uid, 5) == "completed"
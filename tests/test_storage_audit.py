@@ -0,0 +1,120 @@
+import os
+
+from services.blob_store import blob_path
+from services.storage_audit import reconcile, scan_files
+
+ROOTS = ["/srv/up", "/srv/blobs"]
+
+
+def _row(row_id, user_id, path, sha256=None, size=None, source="assignments"):
+    return {"source": source, "id": row_id, "user_id": user_id, "path": path, "sha256": sha256, "size": size}
+
+
+def _missing(findings):
+    return {f["row_id"]: f for f in findings if f["kind"] == "missing"}
+
+
+def test_present_row_is_clean_and_unreferenced_file_is_orphaned():
+    files = {"/srv/up/1/week_1.pdf": 10, "/srv/up/1/old.pdf": 5}
+    findings = reconcile(files, [_row(1, 1, "/srv/up/1/week_1.pdf", size=10)], ROOTS)
+
+    assert [(f["kind"], f["path"]) for f in findings] == [("orphaned", "/srv/up/1/old.pdf")]
+
+
+def test_size_mismatch_is_reported():
+    files = {"/srv/up/1/week_1.pdf": 10}
+    findings = reconcile(files, [_row(1, 1, "/srv/up/1/week_1.pdf", size=11)], ROOTS)
+
+    assert findings[0]["kind"] == "mismatched"
+
+
+def test_missing_rows_never_resolve_to_another_students_file():
+    # The only week_1.pdf on disk belongs to user 3
+    files = {"/srv/up/3/week_1.pdf": 10}
+    rows = [_row(1, 1, "/srv/up/1/week_1.pdf"), _row(2, 2, "/srv/up/2/week_1.pdf")]
+
+    missing = _missing(reconcile(files, rows, ROOTS))
+
+    assert missing[1]["resolved_path"] is None and missing[1]["detail"] == "not found"
+    assert missing[2]["resolved_path"] is None and missing[2]["detail"] == "not found"
+
+
+def test_missing_row_resolves_to_same_user_and_week_elsewhere():
+    files = {"/srv/up/restored/1/week2/a.pdf": 10, "/srv/up/restored/1/week3/a.pdf": 10}
+    rows = [_row(1, 1, "/srv/up/assignments/1/week2/a.pdf")]
+
+    missing = _missing(reconcile(files, rows, ROOTS))
+
+    assert missing[1]["detail"] == "resolvable"
+    assert missing[1]["resolved_path"] == os.path.normpath("/srv/up/restored/1/week2/a.pdf")
+
+
+def test_candidate_referenced_by_another_row_is_not_taken():
+    files = {"/srv/up/restored/1/week_1.pdf": 10}
+    rows = [
+        _row(1, 1, "/srv/up/restored/1/week_1.pdf"),  # present, owns the file
+        _row(2, 1, "/srv/up/assignments/1/week_1.pdf"),  # missing duplicate
+    ]
+
+    missing = _missing(reconcile(files, rows, ROOTS))
+
+    assert missing[2]["resolved_path"] is None
+
+
+def test_candidate_claimed_by_two_missing_rows_resolves_neither():
+    files = {"/srv/up/restored/1/week_1.pdf": 10}
+    rows = [_row(1, 1, "/srv/up/a/1/week_1.pdf"), _row(2, 1, "/srv/up/b/1/week_1.pdf")]
+
+    findings = reconcile(files, rows, ROOTS)
+    missing = _missing(findings)
+
+    assert missing[1]["resolved_path"] is None and missing[2]["resolved_path"] is None
+    assert [f["path"] for f in findings if f["kind"] == "orphaned"] == ["/srv/up/restored/1/week_1.pdf"]
+
+
+def test_ambiguous_same_owner_candidates_are_not_resolved():
+    files = {"/srv/up/x/1/week_1.pdf": 10, "/srv/up/y/1/week_1.pdf": 10}
+    missing = _missing(reconcile(files, [_row(1, 1, "/srv/up/a/1/week_1.pdf")], ROOTS))
+
+    assert missing[1]["resolved_path"] is None
+
+
+def test_content_address_resolves_even_when_shared():
+    sha = "ab" * 32
+    blob = os.path.normpath(os.path.abspath(blob_path(sha)))
+    files = {blob: 10}
+    rows = [
+        _row(1, 1, blob, sha256=sha),  # present
+        _row(2, 2, "/srv/up/2/week_1.pdf", sha256=sha),  # same content, old path
+    ]
+
+    missing = _missing(reconcile(files, rows, ROOTS + [os.path.dirname(os.path.dirname(os.path.dirname(blob)))]))
+
+    assert missing[2]["resolved_path"] == blob
+
+
+def test_certificate_resolves_by_owner_stamped_name_only():
+    files = {
+        "/srv/certs/old/certificate_ada_7_20250101_120000.pdf": 10,
+        "/srv/certs/old/certificate_bob_8_20250101_120000.pdf": 10,
+    }
+    rows = [
+        _row(1, 7, "/srv/certs/certificate_ada_7_20250101_120000.pdf", source="certificates"),
+        _row(2, 9, "/srv/certs/certificate_bob_8_20250101_120000.pdf", source="certificates"),
+    ]
+
+    missing = _missing(reconcile(files, rows, ["/srv/certs"]))
+
+    assert missing[1]["resolved_path"] == "/srv/certs/old/certificate_ada_7_20250101_120000.pdf"
+    assert missing[2]["resolved_path"] is None
+
+
+def test_scan_files_walks_nested_dirs(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    (tmp_path / "a" / "b" / "f.txt").write_bytes(b"123")
+    (tmp_path / "g.txt").write_bytes(b"1")
+
+    files, dirs = scan_files([str(tmp_path)], workers=2)
+
+    assert files == {str(tmp_path / "a" / "b" / "f.txt"): 3, str(tmp_path / "g.txt"): 1}
+    assert dirs == 3
@@ -0,0 +1,70 @@
+import uuid
+
+import bcrypt
+
+from services.db import read_conn
+from services.student_import import import_students, iter_rows, validate_rows
+
+
+def _csv(*lines):
+    return ("\n".join(lines) + "\n").encode("utf-8-sig")
+
+
+def test_headers_are_normalised_through_aliases():
+    rows = list(iter_rows(_csv("User Name,Pass,Name,Group", "amy,pw,Amy A,C2"), "s.csv"))
+    assert rows == [{"username": "amy", "password": "pw", "full_name": "Amy A", "cohort": "C2"}]
+
+
+def test_validation_reports_each_bad_line(make_user):
+    taken = f"taken_{uuid.uuid4().hex[:6]}"
+    make_user(username=taken)
+    rows = iter_rows(_csv(
+        "username,password,email",
+        "ok_one,pw,ok@example.com",
+        ",pw,",
+        "no_pw,,",
+        "bad_mail,pw,not-an-email",
+        "ok_one,pw,",
+        ",,",
+        f"{taken},pw,",
+    ), "s.csv")
+
+    valid, errors = validate_rows(rows, default_cohort="Cohort 9")
+
+    assert [(r["username"], r["cohort"]) for r in valid] == [("ok_one", "Cohort 9")]
+    assert [(e["line"], e["error"]) for e in errors] == [
+        (3, "username is required"),
+        (4, "password is required"),
+        (5, "invalid email: not-an-email"),
+        (6, "duplicate of line 2"),
+        (8, "username already exists"),
+    ]
+
+
+def test_dry_run_creates_nothing():
+    name = f"dry_{uuid.uuid4().hex[:6]}"
+    report = import_students(_csv("username,password", f"{name},pw"), "s.csv", dry_run=True)
+
+    assert (report["valid"], report["created"]) == (1, 0)
+    with read_conn() as conn:
+        assert conn.execute("SELECT 1 FROM users WHERE username=?", (name,)).fetchone() is None
+
+
+def test_import_creates_students_with_progress_rows():
+    names = [f"imp_{uuid.uuid4().hex[:6]}" for _ in range(3)]
+    source = _csv("username,password,cohort", *(f"{n},secret-{n}," for n in names))
+
+    report = import_students(source, "s.csv", default_cohort="Import C", workers=1)
+    assert report["created"] == 3 and report["errors"] == []
+
+    with read_conn() as conn:
+        user = conn.execute(
+            "SELECT id, cohort, role, password_hash FROM users WHERE username=?", (names[0],)
+        ).fetchone()
+        weeks = conn.execute(
+            "SELECT week, status FROM progress WHERE user_id=? ORDER BY week", (user["id"],)
+        ).fetchall()
+
+    assert (user["cohort"], user["role"]) == ("Import C", "student")
+    assert bcrypt.checkpw(f"secret-{names[0]}".encode(), user["password_hash"])
+    assert [tuple(w) for w in weeks] == [(0, "unlocked")] + [(w, "locked") for w in range(1, 7)]
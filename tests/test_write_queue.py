@@ -0,0 +1,80 @@
+import io
+import sqlite3
+
+import pytest
+
+from services.assignments import submit_assignment
+from services.db import DB_PATH, _connect, read_conn, write_txn
+from services.write_queue import _Op, _run_batch, run_write, submit
+
+
+def _ticket_count(subject):
+    with read_conn() as conn:
+        return conn.execute("SELECT COUNT(*) FROM support_tickets WHERE subject = ?", (subject,)).fetchone()[0]
+
+
+def _insert(conn, subject):
+    conn.execute("INSERT INTO support_tickets (user_id, subject, message, status) VALUES (1, ?, 'm', 'open')", (subject,))
+    return subject
+
+
+def _insert_then_fail(conn, subject):
+    _insert(conn, subject)
+    raise ValueError("boom")
+
+
+def test_run_write_returns_value_after_commit():
+    assert run_write(_insert, "wq-commit") == "wq-commit"
+    assert _ticket_count("wq-commit") == 1
+
+
+def test_failing_op_rolls_back_only_itself():
+    conn = _connect(DB_PATH)
+    try:
+        ops = [_Op(_insert, ("wq-a",)), _Op(_insert_then_fail, ("wq-b",)), _Op(_insert, ("wq-c",))]
+        _run_batch(conn, ops)
+    finally:
+        conn.close()
+
+    assert ops[0].future.result() == "wq-a"
+    with pytest.raises(ValueError):
+        ops[1].future.result()
+    assert ops[2].future.result() == "wq-c"
+    assert (_ticket_count("wq-a"), _ticket_count("wq-b"), _ticket_count("wq-c")) == (1, 0, 1)
+
+
+def test_exception_propagates_to_caller():
+    with pytest.raises(sqlite3.OperationalError):
+        run_write(lambda conn: conn.execute("SELECT * FROM no_such_table"))
+
+
+def test_ops_cannot_submit_from_the_writer_thread():
+    def nested(conn):
+        return submit(_insert, "wq-nested").result()
+
+    with pytest.raises(RuntimeError):
+        run_write(nested)
+
+
+class _Upload(io.BytesIO):
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+def test_student_submission_goes_through_the_writer_and_keeps_grade(make_user):
+    uid = make_user()
+    submit_assignment(uid, "stu", 1, _Upload(b"first", "My Work.pdf"))
+    with write_txn() as conn:
+        conn.execute("UPDATE assignments SET grade = 80, status = 'graded' WHERE user_id = ? AND week = 1", (uid,))
+
+    blob = submit_assignment(uid, "stu", 1, _Upload(b"second", "My Work.pdf"))
+
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT file_path, file_sha256, file_size, original_filename, status, grade "
+            "FROM assignments WHERE user_id = ?",
+            (uid,),
+        ).fetchall()
+    assert [tuple(r) for r in rows] == [(blob.path, blob.sha256, 6, "My_Work.pdf", "submitted", 80)]
@@ -1,13 +1,24 @@
 import os
+import time
+
 import streamlit as st
 
-from services.db import read_conn, write_txn
-from services.auth import create_user, get_all_students, reset_user_password
+from services.content import get_week_content, week_content_path
+from services.dashboard import invalidate_snapshot
+from services.db import columns, invalidate_schema, read_conn, write_txn
+from services.auth import create_user, forget_session, get_all_cohorts, get_all_students, reset_user_password
+from services.blocklist import block_users, unblock_users
 from services.broadcasts import create_broadcast, get_active_broadcasts, delete_broadcast
-from services.progress import unlock_week_for_user, lock_week_for_user, mark_week_completed
-from services.assignments import list_all_assignments, review_assignment
+from services.student_import import import_students
+from services.progress import bulk_lock_week, bulk_unlock_week, mark_week_completed
+from services.assignments import list_assignments_page, review_assignment
+from services.certificate_batch import eligible_students, issue_certificates_bulk
+from services.certificate_jobs import enqueue_regeneration, job_counts
+from services.certificates import CERT_TEMPLATE_VERSION
+from services.cohort_stats import get_cohort_progress, rebuild_cohort_stats
+from services.storage_audit import KINDS as AUDIT_KINDS, latest_run, list_findings, run_audit
+from ui.shared import render_file_download
 
-CONTENT_DIR = "content"
 TOTAL_WEEKS = 6
 
 
@@ -26,6 +37,7 @@ def admin_router(user):
             [
                 "Dashboard",
                 "Create Student",
+                "Import Students",
                 "All Students",
                 "Individual Week Unlock",
                 "Group Week Unlock",
@@ -33,6 +45,9 @@ def admin_router(user):
                 "Assignment Review",
                 "Broadcast Announcement",
                 "Unlock Exam",
+                "Certificates",
+                "Storage Audit",
+                "Cohort Progress",
                 "Student Reports",
                 "Exam Analytics",
                 "Help & Support",
@@ -42,6 +57,7 @@ def admin_router(user):
         )
 
         if st.button("🚪 Logout"):
+            forget_session()
             st.session_state.clear()
             st.rerun()
 
@@ -67,13 +83,12 @@ def admin_router(user):
         st.subheader("📚 Weekly Content (Weeks 1–6)")
 
         for wk in range(1, TOTAL_WEEKS + 1):
-            md_path = os.path.join(CONTENT_DIR, f"week{wk}.md")
+            content = get_week_content(wk)
             with st.expander(f"Week {wk} Content", expanded=False):
-                if os.path.exists(md_path):
-                    with open(md_path, "r", encoding="utf-8") as f:
-                        st.markdown(f.read())
+                if content is not None:
+                    st.markdown(content.text)
                 else:
-                    st.warning(f"Content file not found: {md_path}")
+                    st.warning(f"Content file not found: {week_content_path(wk)}")
 
     # =========================================================
     # CREATE STUDENT
@@ -90,6 +105,53 @@ def admin_router(user):
             create_user(username, password, "student", cohort)
             st.success("Student created successfully.")
 
+    # =========================================================
+    # IMPORT STUDENTS (CSV / XLSX)
+    # =========================================================
+    elif menu == "Import Students":
+
+        st.subheader("📥 Import Students")
+        st.caption(
+            "Columns: username, password (required); full_name, email, cohort. "
+            "Run a dry run first — the import is all or nothing."
+        )
+
+        upload = st.file_uploader("Student file", type=["csv", "xlsx"], key="import_file")
+        default_cohort = st.text_input("Cohort for rows without one", value="Cohort 1", key="import_cohort")
+
+        c1, c2 = st.columns(2)
+        do_dry = c1.button("Dry Run", key="import_dry", disabled=upload is None)
+        do_import = c2.button("Import", key="import_go", disabled=upload is None)
+
+        if upload is not None and (do_dry or do_import):
+            upload.seek(0)
+            try:
+                with st.spinner("Importing students..." if do_import else "Validating..."):
+                    report = import_students(
+                        upload,
+                        filename=upload.name,
+                        default_cohort=default_cohort,
+                        dry_run=do_dry,
+                    )
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                m1, m2, m3 = st.columns(3)
+                m1.metric("Rows", report["rows"])
+                m2.metric("Valid", report["valid"])
+                m3.metric("Rejected", len(report["errors"]))
+
+                if report["dry_run"]:
+                    st.info("Dry run — nothing was created.")
+                else:
+                    st.success(
+                        f"Created {report['created']} student(s) in {report['elapsed_seconds']:.1f}s "
+                        f"({report['hash_seconds']:.1f}s hashing)."
+                    )
+
+                if report["errors"]:
+                    st.dataframe(report["errors"], use_container_width=True)
+
     # =========================================================
     # ALL STUDENTS
     # =========================================================
@@ -140,7 +202,12 @@ def admin_router(user):
 
         st.subheader("🔓 Group Week Unlock")
 
-        students = get_all_students()
+        cohorts = get_all_cohorts()
+
+        cohort = st.selectbox(
+            "Cohort",
+            ["All cohorts"] + cohorts,
+        )
 
         week = st.selectbox(
             "Week",
@@ -154,16 +221,18 @@ def admin_router(user):
 
         if st.button("Apply"):
 
-            for s in students:
-
-                sid = s["id"] if isinstance(s, dict) else s[0]
+            cohort_filter = None if cohort == "All cohorts" else cohort
 
-                if action == "Unlock Week":
-                    unlock_week_for_user(sid, week)
-                else:
-                    lock_week_for_user(sid, week)
+            # One set-based UPSERT in one transaction (not one txn per student)
+            t0 = time.perf_counter()
+            if action == "Unlock Week":
+                changed = bulk_unlock_week(week, cohort=cohort_filter)
+            else:
+                changed = bulk_lock_week(week, cohort=cohort_filter)
+            elapsed_ms = (time.perf_counter() - t0) * 1000
 
-            st.success("Update completed.")
+            st.success(f"Update completed: {changed} student(s) updated.")
+            st.caption(f"⏱ {elapsed_ms:.1f} ms")
 
     # =========================================================
     # RESET PASSWORD
@@ -194,20 +263,45 @@ def admin_router(user):
 
         st.subheader("📤 Assignment Review")
 
-        assignments = list_all_assignments()
+        # ---------- Filters ----------
+        f1, f2, f3, f4, f5 = st.columns([1, 1.2, 1.4, 1.2, 1])
+        with f1:
+            week_f = st.selectbox("Week", ["All"] + list(range(1, TOTAL_WEEKS + 1)), key="ar_week")
+        with f2:
+            status_f = st.selectbox("Status", ["All", "submitted", "approved", "graded"], key="ar_status")
+        with f3:
+            cohort_f = st.selectbox("Cohort", ["All"] + get_all_cohorts(), key="ar_cohort")
+        with f4:
+            ungraded_f = st.checkbox("Ungraded only", value=False, key="ar_ungraded")
+        with f5:
+            page_size = st.selectbox("Per page", [10, 25, 50], index=1, key="ar_page_size")
+
+        # Reset paging whenever the filters change
+        filters = (week_f, status_f, cohort_f, ungraded_f, page_size)
+        if st.session_state.get("ar_filters") != filters:
+            st.session_state["ar_filters"] = filters
+            st.session_state["ar_cursors"] = [None]
+
+        cursors = st.session_state["ar_cursors"]
+
+        assignments, next_cursor = list_assignments_page(
+            week=None if week_f == "All" else week_f,
+            status=None if status_f == "All" else status_f,
+            cohort=None if cohort_f == "All" else cohort_f,
+            ungraded_only=ungraded_f,
+            after=cursors[-1],
+            limit=page_size,
+        )
 
         if not assignments:
-            st.info("No submissions yet.")
-            return
+            st.info("No submissions yet." if len(cursors) == 1 else "No more submissions.")
 
         for a in assignments:
 
-            a = dict(a)
-
             st.markdown(f"**Student:** {a.get('username','—')}  ")
             st.markdown(f"**Week:** {a.get('week','—')}")
 
-            # ✅ show the uploaded assignment file to admin (download/open)
+            # ✅ show the uploaded assignment file to admin (bytes read only on click)
             file_path = a.get("file_path") or a.get("path")
             file_name = (
                 a.get("original_filename")
@@ -218,41 +312,54 @@ def admin_router(user):
 
             if file_path:
                 if os.path.exists(file_path):
-                    with open(file_path, "rb") as f:
-                        st.download_button(
-                            "⬇️ Download Assignment File",
-                            data=f.read(),
-                            file_name=file_name,
-                            mime="application/octet-stream",
-                            key=f"dl_{a.get('id')}_{a.get('week')}",
-                        )
+                    render_file_download(
+                        "⬇️ Download Assignment File",
+                        file_path,
+                        file_name,
+                        key=f"dl_{a.get('id')}_{a.get('week')}",
+                    )
                 else:
                     st.warning("⚠️ Assignment file path saved, but file not found on server.")
                     st.code(str(file_path))
             else:
                 st.warning("⚠️ No file path found in this submission record (file_path/path is empty).")
 
-            grade = st.number_input(
-                "Grade",
-                min_value=0.0,
-                max_value=100.0,
-                value=float(a.get("grade") or 0),
-                key=f"grade_{a['id']}",
-            )
+            # Form: typing a grade/feedback does not rerun the whole page
+            with st.form(key=f"review_form_{a['id']}"):
+                grade = st.number_input(
+                    "Grade",
+                    min_value=0.0,
+                    max_value=100.0,
+                    value=float(a.get("grade") or 0),
+                    key=f"grade_{a['id']}",
+                )
 
-            feedback = st.text_area(
-                "Feedback",
-                value=a.get("feedback") or "",
-                key=f"fb_{a['id']}",
-            )
+                feedback = st.text_area(
+                    "Feedback",
+                    value=a.get("feedback") or "",
+                    key=f"fb_{a['id']}",
+                )
 
-            if st.button("Submit Review", key=f"review_{a['id']}"):
-                review_assignment(a["id"], grade, feedback)
-                st.success("Assignment graded.")
-                st.rerun()
+                if st.form_submit_button("Submit Review"):
+                    review_assignment(a["id"], grade, feedback, user.get("id"))
+                    st.success("Assignment graded.")
+                    st.rerun()
 
             st.divider()
 
+        # ---------- Paging ----------
+        p1, p2, p3 = st.columns([1, 1, 3])
+        with p1:
+            if len(cursors) > 1 and st.button("⬅️ Previous", key="ar_prev"):
+                cursors.pop()
+                st.rerun()
+        with p2:
+            if next_cursor is not None and st.button("Next ➡️", key="ar_next"):
+                cursors.append(next_cursor)
+                st.rerun()
+        with p3:
+            st.caption(f"Page {len(cursors)}")
+
     # =========================================================
     # BROADCAST
     # =========================================================
@@ -316,8 +423,159 @@ def admin_router(user):
                     (student_id,)
                 )
 
+            invalidate_snapshot(student_id)
             st.success(f"Exam unlocked for {selected}")
 
+    # =========================================================
+    # CERTIFICATES (BACKGROUND JOBS)
+    # =========================================================
+    elif menu == "Certificates":
+
+        st.subheader("🎖 Certificates")
+
+        counts = job_counts()
+        c1, c2, c3, c4 = st.columns(4)
+        c1.metric("Queued", counts.get("queued", 0))
+        c2.metric("Running", counts.get("running", 0))
+        c3.metric("Done", counts.get("done", 0))
+        c4.metric("Failed", counts.get("failed", 0))
+
+        if st.button("🔄 Refresh", key="cert_jobs_refresh"):
+            st.rerun()
+
+        st.divider()
+        st.markdown("### Regenerate all certificates")
+        st.caption(
+            "Queues a background job for every student whose certificate is not on "
+            f"the current template ({CERT_TEMPLATE_VERSION})."
+        )
+
+        if st.button("Queue Regeneration", key="cert_regen_all"):
+            queued = enqueue_regeneration()
+            st.success(f"Queued {queued} certificate job(s).")
+
+        st.divider()
+        st.markdown("### Bulk issue for graduates")
+        st.caption(
+            "Renders certificates for every student with 6+ graded weeks in parallel "
+            "processes and records them in one transaction. Runs now, on this request."
+        )
+
+        b1, b2 = st.columns(2)
+        bulk_cohort = b1.selectbox("Cohort", ["All"] + get_all_cohorts(), key="cert_bulk_cohort")
+        bulk_workers = b2.number_input(
+            "Processes", min_value=1, max_value=32, value=os.cpu_count() or 1, key="cert_bulk_workers"
+        )
+        bulk_all = st.checkbox("Also re-issue students already on the current template", key="cert_bulk_all")
+
+        cohort_arg = None if bulk_cohort == "All" else bulk_cohort
+        pending = len(eligible_students(cohort=cohort_arg, include_current=bulk_all))
+        st.caption(f"{pending} student(s) selected.")
+
+        if st.button("Issue Certificates", key="cert_bulk_issue", disabled=pending == 0):
+            with st.spinner("Rendering certificates..."):
+                report = issue_certificates_bulk(
+                    workers=int(bulk_workers),
+                    cohort=cohort_arg,
+                    include_current=bulk_all,
+                )
+
+            st.success(
+                f"Issued {report['issued']} of {report['selected']} in "
+                f"{report['elapsed_seconds']:.1f}s ({report['per_second']:.1f} certs/s, "
+                f"{report['workers']} process(es))."
+            )
+            if report["failed"]:
+                st.error(f"{len(report['failed'])} failed")
+                st.dataframe(
+                    [{"user_id": uid, "error": err} for uid, err in report["failed"]],
+                    use_container_width=True,
+                )
+
+    # =========================================================
+    # STORAGE AUDIT
+    # =========================================================
+    elif menu == "Storage Audit":
+
+        st.subheader("🗄 Storage Audit")
+        st.caption(
+            "Checks every uploaded assignment and certificate file against the database: "
+            "rows whose file is missing, files no row points at, and size/content mismatches."
+        )
+
+        repair = st.checkbox(
+            "Repair missing paths when the file is found elsewhere", key="audit_repair"
+        )
+        if st.button("Run Audit", key="audit_run"):
+            with st.spinner("Scanning storage..."):
+                report = run_audit(repair=repair)
+            st.success(
+                f"Scanned {report['files']} file(s) in {report['elapsed_seconds']:.1f}s; "
+                f"{report['repaired']} row(s) repaired."
+            )
+
+        last = latest_run()
+        if not last:
+            st.info("No audit has been run yet.")
+        else:
+            st.caption(
+                f"Last run: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last['started_at']))} "
+                f"({last['elapsed_seconds']:.1f}s, {last['files']} files, {last['rows_checked']} rows)"
+            )
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric("Missing", last["missing"])
+            m2.metric("Orphaned", last["orphaned"])
+            m3.metric("Mismatched", last["mismatched"])
+            m4.metric("Repaired", last["repaired"])
+
+            kind = st.selectbox("Show", AUDIT_KINDS, key="audit_kind")
+            findings = list_findings(kind)
+            if findings:
+                st.dataframe(findings, use_container_width=True)
+            else:
+                st.info(f"No {kind} entries.")
+
+    # =========================================================
+    # COHORT PROGRESS (aggregate table, no per-student scan)
+    # =========================================================
+    elif menu == "Cohort Progress":
+
+        st.subheader("📈 Cohort Progress")
+
+        stats = get_cohort_progress()
+        if not stats:
+            st.info("No student progress recorded yet.")
+        else:
+            cohorts = sorted({r["cohort"] for r in stats})
+            pick = st.selectbox("Cohort", ["All"] + cohorts, key="cohort_progress_pick")
+            view = [r for r in stats if pick == "All" or r["cohort"] == pick]
+
+            st.dataframe(
+                [
+                    {
+                        "Cohort": r["cohort"],
+                        "Week": r["week"],
+                        "Students": r["students"],
+                        "Unlocked": r["unlocked"],
+                        "Completed": r["completed"],
+                        "Completed %": round(100 * r["completed"] / r["students"], 1) if r["students"] else 0.0,
+                        "Submitted": r["submitted"],
+                        "Graded": r["graded"],
+                        "Avg grade": r["avg_grade"],
+                    }
+                    for r in view
+                ],
+                use_container_width=True,
+                hide_index=True,
+            )
+
+        st.caption("Maintained automatically on every progress/assignment change.")
+        if st.button("Rebuild from scratch", key="cohort_progress_rebuild"):
+            with write_txn() as conn:
+                rows = rebuild_cohort_stats(conn.cursor())
+            st.success(f"Rebuilt {rows} cohort/week row(s).")
+            st.rerun()
+
     # =========================================================
     # STUDENT REPORTS
     # =========================================================
@@ -405,20 +663,20 @@ def admin_router(user):
     # BLOCK / UNBLOCK STUDENTS (ADDED - DOES NOT ALTER OTHER SECTIONS)
     # =========================================================
     elif menu == "Block / Unblock Students":
-        from datetime import datetime
 
         st.subheader("⛔ Block / Unblock Students")
 
-        # Ensure required columns exist (safe to run repeatedly)
-        with write_txn() as conn:
-            cols = [r[1] for r in conn.execute("PRAGMA table_info(users)").fetchall()]
-            if "is_blocked" not in cols:
-                conn.execute("ALTER TABLE users ADD COLUMN is_blocked INTEGER NOT NULL DEFAULT 0")
-            if "blocked_at" not in cols:
-                conn.execute("ALTER TABLE users ADD COLUMN blocked_at TEXT")
-            if "blocked_reason" not in cols:
-                conn.execute("ALTER TABLE users ADD COLUMN blocked_reason TEXT")
-            conn.commit()
+        # Ensure required columns exist (migrations add them; this is a fallback)
+        cols = columns("users")
+        if not {"is_blocked", "blocked_at", "blocked_reason"} <= cols:
+            with write_txn() as conn:
+                if "is_blocked" not in cols:
+                    conn.execute("ALTER TABLE users ADD COLUMN is_blocked INTEGER NOT NULL DEFAULT 0")
+                if "blocked_at" not in cols:
+                    conn.execute("ALTER TABLE users ADD COLUMN blocked_at TEXT")
+                if "blocked_reason" not in cols:
+                    conn.execute("ALTER TABLE users ADD COLUMN blocked_reason TEXT")
+            invalidate_schema()
 
         # Load students
         with read_conn() as conn:
@@ -456,31 +714,13 @@ def admin_router(user):
         col1, col2 = st.columns(2)
         with col1:
             if st.button("⛔ Block", key="block_one"):
-                with write_txn() as conn:
-                    conn.execute(
-                        """
-                        UPDATE users
-                        SET is_blocked=1, blocked_at=?, blocked_reason=?
-                        WHERE id=? AND role='student'
-                        """,
-                        (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reason, selected["id"]),
-                    )
-                    conn.commit()
+                block_users([selected["id"]], reason)
                 st.success(f"Blocked: {selected_username}")
                 st.rerun()
 
         with col2:
             if st.button("✅ Unblock", key="unblock_one"):
-                with write_txn() as conn:
-                    conn.execute(
-                        """
-                        UPDATE users
-                        SET is_blocked=0, blocked_at=NULL, blocked_reason=NULL
-                        WHERE id=? AND role='student'
-                        """,
-                        (selected["id"],),
-                    )
-                    conn.commit()
+                unblock_users([selected["id"]])
                 st.success(f"Unblocked: {selected_username}")
                 st.rerun()
 
@@ -496,17 +736,7 @@ def admin_router(user):
                 if not ids_many:
                     st.warning("Select at least one student.")
                 else:
-                    placeholders = ",".join(["?"] * len(ids_many))
-                    with write_txn() as conn:
-                        conn.execute(
-                            f"""
-                            UPDATE users
-                            SET is_blocked=1, blocked_at=?, blocked_reason=?
-                            WHERE role='student' AND id IN ({placeholders})
-                            """,
-                            (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), reason, *ids_many),
-                        )
-                        conn.commit()
+                    block_users(ids_many, reason)
                     st.success(f"Blocked {len(ids_many)} student(s).")
                     st.rerun()
 
@@ -515,16 +745,6 @@ def admin_router(user):
                 if not ids_many:
                     st.warning("Select at least one student.")
                 else:
-                    placeholders = ",".join(["?"] * len(ids_many))
-                    with write_txn() as conn:
-                        conn.execute(
-                            f"""
-                            UPDATE users
-                            SET is_blocked=0, blocked_at=NULL, blocked_reason=NULL
-                            WHERE role='student' AND id IN ({placeholders})
-                            """,
-                            (*ids_many,),
-                        )
-                        conn.commit()
+                    unblock_users(ids_many)
                     st.success(f"Unblocked {len(ids_many)} student(s).")
                     st.rerun()
\ No newline at end of file
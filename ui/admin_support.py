@@ -16,7 +16,8 @@ from __future__ import annotations
 import streamlit as st
 import pandas as pd
 
-from services.db import read_conn
+from services.db import ordered_columns, read_conn
+from services.write_queue import run_write
 
 
 def _table_exists(conn, table: str) -> bool:
@@ -27,8 +28,8 @@ def _table_exists(conn, table: str) -> bool:
     return r is not None
 
 
-def _cols(conn, table: str) -> list[str]:
-    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+def _cols(table: str) -> list[str]:
+    return list(ordered_columns(table))
 
 
 def _fetch(status: str, q: str) -> tuple[list[dict], list[str]]:
@@ -36,7 +37,7 @@ def _fetch(status: str, q: str) -> tuple[list[dict], list[str]]:
         if not _table_exists(conn, "support_tickets"):
             return [], []
 
-        cols = _cols(conn, "support_tickets")
+        cols = _cols("support_tickets")
         where = []
         params: list[object] = []
 
@@ -52,7 +53,7 @@ def _fetch(status: str, q: str) -> tuple[list[dict], list[str]]:
                 params.extend([like] * len(search_cols))
 
         where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-        order_sql = "ORDER BY datetime(created_at) DESC" if "created_at" in cols else "ORDER BY id DESC"
+        order_sql = "ORDER BY created_ts DESC, id DESC" if "created_ts" in cols else "ORDER BY id DESC"
 
         cur = conn.execute(f"SELECT * FROM support_tickets {where_sql} {order_sql} LIMIT 500", params)
         rows = cur.fetchall()
@@ -62,37 +63,40 @@ def _fetch(status: str, q: str) -> tuple[list[dict], list[str]]:
         return tickets, cols
 
 
-def _update(ticket_id: int, id_key: str, new_status: str | None, reply: str | None, admin_user: dict | None) -> tuple[bool, str]:
-    with read_conn() as conn:
-        if not _table_exists(conn, "support_tickets"):
-            return False, "support_tickets not found."
+def _update_ticket(conn, ticket_id: int, id_key: str, new_status: str | None, reply: str | None, admin_user: dict | None) -> tuple[bool, str]:
+    """Write-queue op: the batch owns the transaction (no commit here)."""
+    if not _table_exists(conn, "support_tickets"):
+        return False, "support_tickets not found."
 
-        cols = _cols(conn, "support_tickets")
-        sets = []
-        params: list[object] = []
+    cols = _cols("support_tickets")
+    sets = []
+    params: list[object] = []
 
-        if new_status is not None and "status" in cols:
-            sets.append("status = ?")
-            params.append(new_status)
+    if new_status is not None and "status" in cols:
+        sets.append("status = ?")
+        params.append(new_status)
 
-        if reply is not None and "admin_reply" in cols:
-            sets.append("admin_reply = ?")
-            params.append(reply)
+    if reply is not None and "admin_reply" in cols:
+        sets.append("admin_reply = ?")
+        params.append(reply)
 
-        if "replied_at" in cols:
-            sets.append("replied_at = datetime('now')")
+    if "replied_at" in cols:
+        sets.append("replied_at = datetime('now')")
 
-        if "replied_by" in cols and admin_user and "id" in admin_user:
-            sets.append("replied_by = ?")
-            params.append(admin_user["id"])
+    if "replied_by" in cols and admin_user and "id" in admin_user:
+        sets.append("replied_by = ?")
+        params.append(admin_user["id"])
 
-        if not sets:
-            return False, "No updatable columns (need status/admin_reply)."
+    if not sets:
+        return False, "No updatable columns (need status/admin_reply)."
 
-        params.append(ticket_id)
-        conn.execute(f"UPDATE support_tickets SET {', '.join(sets)} WHERE {id_key} = ?", params)
-        conn.commit()
-        return True, "Saved."
+    params.append(ticket_id)
+    conn.execute(f"UPDATE support_tickets SET {', '.join(sets)} WHERE {id_key} = ?", params)
+    return True, "Saved."
+
+
+def _update(ticket_id: int, id_key: str, new_status: str | None, reply: str | None, admin_user: dict | None) -> tuple[bool, str]:
+    return run_write(_update_ticket, ticket_id, id_key, new_status, reply, admin_user)
 
 
 def admin_support_page(user: dict | None = None):
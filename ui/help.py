@@ -3,6 +3,7 @@
 import streamlit as st
 from datetime import datetime
 from services.db import read_conn, write_txn
+from services.write_queue import run_write
 
 
 
@@ -25,7 +26,7 @@ def list_active_broadcasts():
 
 
 def create_ticket(user, subject, message):
-    with write_txn() as conn:
+    def _write(conn):
         conn.execute(
             """
             INSERT INTO support_tickets
@@ -41,6 +42,8 @@ def create_ticket(user, subject, message):
             ),
         )
 
+    run_write(_write)
+
 
 
 
@@ -51,7 +54,7 @@ def list_student_tickets(user_id):
             """
             SELECT * FROM support_tickets
             WHERE user_id = ?
-            ORDER BY created_at DESC
+            ORDER BY created_ts DESC, id DESC
             """,
             (user_id,),
         ).fetchall()
@@ -63,7 +66,7 @@ def list_all_tickets():
         rows = conn.execute(
             """
             SELECT * FROM support_tickets
-            ORDER BY created_at DESC
+            ORDER BY created_ts DESC, id DESC
             """
         ).fetchall()
     return rows
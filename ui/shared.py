@@ -1,19 +1,37 @@
 import streamlit as st
-import os
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-CONTENT_DIR = os.path.join(BASE_DIR, "content")
+from services.content import get_week_content
+from services.downloads import download_url, file_provider
 
 
 def load_week_markdown(week_number):
     """
-    Loads markdown content for a given week.
+    Loads markdown content for a given week (cached, hot-reloaded on change).
     """
-    file_path = os.path.join(CONTENT_DIR, f"week{week_number}.md")
+    content = get_week_content(week_number)
 
-    if not os.path.exists(file_path):
+    if content is None:
         st.error("⚠️ Content file not found for this week.")
         return
 
-    with open(file_path, "r", encoding="utf-8") as f:
-        st.markdown(f.read(), unsafe_allow_html=True)
+    st.markdown(content.text, unsafe_allow_html=True)
+
+
+def render_file_download(label, path, file_name, mime="application/octet-stream", key=None):
+    """
+    Download control that never reads the file during a render:
+    a signed streaming link when the download server is enabled,
+    otherwise a download button whose bytes are read on click.
+    """
+    url = download_url(path, file_name)
+    if url:
+        st.link_button(label, url)
+        return
+
+    st.download_button(
+        label,
+        data=file_provider(path),
+        file_name=file_name,
+        mime=mime,
+        key=key,
+    )
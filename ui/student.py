@@ -1,97 +1,21 @@
-import os
-import re
-from datetime import datetime
-
 import pandas as pd
 import streamlit as st
 
-from services.db import read_conn
-from services.progress import get_progress, mark_week_completed
-from services.assignments import can_issue_certificate
-from services.certificates import has_certificate, issue_certificate
+from services.auth import forget_session
+from services.assignments import submit_assignment
+from services.blob_store import MAX_UPLOAD_BYTES
+from services.broadcasts import get_broadcasts_for_user, mark_many_as_read, unread_count
+from services.content import get_week_content
+from services.dashboard import get_dashboard_snapshot
+from services.progress import mark_week_completed
+from services.certificate_jobs import ACTIVE_STATUSES, enqueue_certificate, get_latest_job
+from services.certificates import CERT_TEMPLATE_VERSION, resolve_certificate
+from ui.shared import render_file_download
 from ui.support import support_page  # student help & support page
 
 
-CONTENT_DIR = "content"
 TOTAL_WEEKS = 6
 
-# Where uploaded assignment files are stored (server)
-ASSIGNMENTS_UPLOAD_ROOT = "/app/data/uploads/assignments"
-
-
-def _safe_filename(name: str) -> str:
-    name = (name or "").strip()
-    name = re.sub(r"[^\w\-. ]+", "", name)
-    name = name.replace(" ", "_")
-    return name or "assignment_file"
-
-
-def _table_columns(conn, table_name: str) -> set[str]:
-    try:
-        rows = conn.execute(f"PRAGMA table_info({table_name})").fetchall()
-        return {r[1] if isinstance(r, (tuple, list)) else r["name"] for r in rows}
-    except Exception:
-        return set()
-
-
-def _upsert_assignment_row(conn, cols: set[str], payload: dict) -> None:
-    usable = {k: v for k, v in payload.items() if k in cols}
-    if not usable:
-        raise RuntimeError("Assignments table schema did not match expected fields.")
-
-    has_user_id = "user_id" in usable and "user_id" in cols
-    has_week = "week" in usable and "week" in cols
-
-    if has_user_id and has_week:
-        keys = list(usable.keys())
-        placeholders = ", ".join(["?"] * len(keys))
-
-        update_keys = [k for k in keys if k not in {"user_id", "week"}]
-        if update_keys:
-            update_clause = ", ".join([f"{k}=excluded.{k}" for k in update_keys])
-            sql = f"""
-                INSERT INTO assignments ({', '.join(keys)})
-                VALUES ({placeholders})
-                ON CONFLICT(user_id, week)
-                DO UPDATE SET {update_clause}
-            """
-        else:
-            sql = f"""
-                INSERT INTO assignments ({', '.join(keys)})
-                VALUES ({placeholders})
-                ON CONFLICT(user_id, week)
-                DO NOTHING
-            """
-
-        conn.execute(sql, tuple(usable[k] for k in keys))
-        conn.commit()
-        return
-
-    # fallback delete+insert
-    where = []
-    params = []
-
-    if "user_id" in usable and "user_id" in cols:
-        where.append("user_id = ?")
-        params.append(usable["user_id"])
-    elif "student_id" in usable and "student_id" in cols:
-        where.append("student_id = ?")
-        params.append(usable["student_id"])
-
-    if "week" in usable and "week" in cols:
-        where.append("week = ?")
-        params.append(usable["week"])
-
-    if where:
-        conn.execute(f"DELETE FROM assignments WHERE {' AND '.join(where)}", tuple(params))
-
-    keys = list(usable.keys())
-    placeholders = ", ".join(["?"] * len(keys))
-    sql = f"INSERT INTO assignments ({', '.join(keys)}) VALUES ({placeholders})"
-    conn.execute(sql, tuple(usable[k] for k in keys))
-    conn.commit()
-
-
 def _extract_grade(row: dict):
     g = row.get("grade")
     if g is None:
@@ -106,36 +30,6 @@ def _extract_feedback(row: dict):
     return fb
 
 
-def _fetch_all_assignments_for_student(conn, user_id: str):
-    cols = _table_columns(conn, "assignments")
-    if not cols:
-        return [], cols
-
-    where = []
-    params = []
-
-    if "user_id" in cols:
-        where.append("user_id = ?")
-        params.append(user_id)
-    elif "student_id" in cols:
-        where.append("student_id = ?")
-        params.append(user_id)
-
-    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
-    order_col = "week" if "week" in cols else ("submitted_at" if "submitted_at" in cols else "id")
-
-    sql = f"SELECT * FROM assignments{where_sql} ORDER BY {order_col} ASC"
-    rows = conn.execute(sql, tuple(params)).fetchall()
-
-    out = []
-    for r in rows:
-        try:
-            out.append(dict(r))
-        except Exception:
-            out.append({f"col_{i}": r[i] for i in range(len(r))})
-    return out, cols
-
-
 def student_router(user):
     st.title("🎓 AI Essentials — Student Dashboard")
 
@@ -153,32 +47,45 @@ def student_router(user):
         support_page(user)
         return
 
-    progress = get_progress(user_id)
+    # ------------------------------
+    # Announcements page
+    # ------------------------------
+    if st.session_state.get("page") == "announcements":
+        st.markdown("### 📢 Announcements")
+        if st.button("⬅️ Return to Dashboard", key="student_announcements_back_btn"):
+            st.session_state["page"] = None
+            st.rerun()
+
+        items = get_broadcasts_for_user(user_id)
+        if not items:
+            st.info("No announcements right now.")
+        for b in items:
+            new_tag = "" if b["is_read"] else " 🆕"
+            st.markdown(f"**{b.get('title') or b.get('subject') or 'Announcement'}**{new_tag}")
+            st.write(b.get("message") or "")
+            st.caption(b.get("created_at") or "")
+            st.divider()
+
+        # Seen now -> one batched write
+        mark_many_as_read([b["id"] for b in items if not b["is_read"]], user_id)
+        return
+
+    # One batched read (progress, submissions, exam, certificate)
+    snapshot = get_dashboard_snapshot(user_id)
+    progress = snapshot.progress
+
+    unread = unread_count(user_id)
+    if unread:
+        st.info(f"📢 You have {unread} new announcement(s). Open **Announcements** in the sidebar.")
 
     # =================================================
     # RESTORED: GRADES OVERVIEW (SCORES PER WEEK)
     # =================================================
     st.subheader("📊 My Grades (All Weeks)")
-    with read_conn() as conn:
-        all_rows, _cols = _fetch_all_assignments_for_student(conn, user_id)
-
-    rows_by_week = {}
-    for r in all_rows:
-        wk = r.get("week")
-        if wk is None:
-            continue
-        rows_by_week.setdefault(int(wk), []).append(r)
 
     week_summary = []
     for wk in range(1, TOTAL_WEEKS + 1):
-        submissions = rows_by_week.get(wk, [])
-        latest = None
-        if submissions:
-
-            def _sort_key(x):
-                return (x.get("submitted_at") or x.get("created_at") or "", x.get("id") or 0)
-
-            latest = sorted(submissions, key=_sort_key, reverse=True)[0]
+        latest = snapshot.assignments.get(wk)
 
         grade = _extract_grade(latest) if latest else None
         status = (latest.get("status") if latest else None) or ("submitted" if latest else "not submitted")
@@ -247,14 +154,10 @@ def student_router(user):
         st.divider()
         st.subheader(f"📖 Week {week} Content")
 
-        if week == 0:
-            file_path = os.path.join(CONTENT_DIR, "week0.md")
-        else:
-            file_path = os.path.join(CONTENT_DIR, f"week{week}.md")
+        content = get_week_content(week)
 
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                st.markdown(f.read())
+        if content is not None:
+            st.markdown(content.text)
         else:
             st.warning("Content not yet uploaded for this week.")
 
@@ -265,7 +168,10 @@ def student_router(user):
             # ---------- ASSIGNMENT UPLOAD ----------
             st.divider()
             st.subheader(f"📤 Assignment Submission (Week {week})")
-            st.caption("Upload your assignment file and click **Submit Assignment**.")
+            st.caption(
+                f"Upload your assignment file (max {MAX_UPLOAD_BYTES // (1024 * 1024)} MB) "
+                "and click **Submit Assignment**."
+            )
 
             uploaded = st.file_uploader(
                 "Choose file (PDF/DOCX/PNG/JPG)",
@@ -287,37 +193,8 @@ def student_router(user):
                 if uploaded is None:
                     st.error("Please upload a file before submitting.")
                 else:
-                    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    safe_name = _safe_filename(uploaded.name)
-                    save_dir = os.path.join(ASSIGNMENTS_UPLOAD_ROOT, str(user_id), f"week{week}")
-                    os.makedirs(save_dir, exist_ok=True)
-                    save_path = os.path.join(save_dir, f"{ts}_{safe_name}")
-
                     try:
-                        with open(save_path, "wb") as out:
-                            out.write(uploaded.getbuffer())
-
-                        with read_conn() as conn:
-                            assignment_cols = _table_columns(conn, "assignments")
-                            now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-                            payload = {
-                                "user_id": user_id,
-                                "student_id": user_id,
-                                "username": username,
-                                "student_username": username,
-                                "week": week,
-                                "file_path": save_path,
-                                "path": save_path,
-                                "filename": safe_name,
-                                "file_name": safe_name,
-                                "original_filename": safe_name,
-                                "submitted_at": now_str,
-                                "created_at": now_str,
-                                "status": "submitted",
-                            }
-
-                            _upsert_assignment_row(conn, assignment_cols, payload)
+                        submit_assignment(user_id, username, week, uploaded)
 
                         st.success("✅ Assignment submitted successfully.")
                         st.rerun()
@@ -329,14 +206,7 @@ def student_router(user):
             st.divider()
             st.subheader(f"✅ Week {week} Grade & Feedback")
 
-            latest = None
-            submissions = rows_by_week.get(week, [])
-            if submissions:
-
-                def _sort_key(x):
-                    return (x.get("submitted_at") or x.get("created_at") or "", x.get("id") or 0)
-
-                latest = sorted(submissions, key=_sort_key, reverse=True)[0]
+            latest = snapshot.assignments.get(week)
 
             if not latest:
                 st.info("No submission yet for this week.")
@@ -371,20 +241,10 @@ def student_router(user):
     if "show_final_exam" not in st.session_state:
         st.session_state["show_final_exam"] = False
 
-    with read_conn() as conn:
-        row = conn.execute(
-            """
-            SELECT exam_unlocked, exam_reviewed
-            FROM student_exam_status
-            WHERE user_id = ?
-            """,
-            (user_id,),
-        ).fetchone()
-
-    if not row or not row["exam_unlocked"]:
+    if not snapshot.exam_unlocked:
         st.warning("Final exam will be unlocked by the administrator after Week 6 completion.")
     else:
-        if row["exam_reviewed"]:
+        if snapshot.exam_reviewed:
             st.error("You have already reviewed the exam answers. Exam locked.")
         else:
             st.success("Final exam unlocked. You can start the exam.")
@@ -403,50 +263,8 @@ def student_router(user):
     st.divider()
     st.subheader("🎖 Certificate")
 
-    # Must match the version in services/certificates.py
-    EXPECTED_TEMPLATE_VERSION = "blank_v2_layout_v1"
-
-    def _get_certificate_row(conn, uid):
-        cols = [r[1] for r in conn.execute("PRAGMA table_info(certificates)").fetchall()]
-        if not cols:
-            return None
-
-        user_col = "user_id" if "user_id" in cols else ("student_id" if "student_id" in cols else None)
-        if not user_col:
-            return None
-
-        order_col = "issued_at" if "issued_at" in cols else ("created_at" if "created_at" in cols else ("id" if "id" in cols else None))
-        order_sql = f" ORDER BY {order_col} DESC" if order_col else ""
-
-        row = conn.execute(
-            f"SELECT * FROM certificates WHERE {user_col}=?{order_sql} LIMIT 1",
-            (uid,),
-        ).fetchone()
-
-        return dict(row) if row else None
-
-    def _resolve_certificate_path(raw_path: str):
-        if not raw_path:
-            return None
-
-        raw_path = str(raw_path).strip()
-        base = os.path.basename(raw_path)
-
-        candidates = [
-            raw_path,
-            os.path.join("/app/data", raw_path),
-            os.path.join("/app/data/generated_certificates", base),
-            os.path.join("/app/data/certificates", base),
-            os.path.join(os.getcwd(), raw_path),
-            os.path.join(os.getcwd(), "generated_certificates", base),
-        ]
-
-        for p in candidates:
-            p_abs = os.path.abspath(p)
-            if os.path.exists(p_abs):
-                return p_abs
-
-        return None
+    # Same version the renderer stamps (services/certificates.py)
+    EXPECTED_TEMPLATE_VERSION = CERT_TEMPLATE_VERSION
 
     def _get_full_name():
         return (
@@ -456,61 +274,57 @@ def student_router(user):
             or "Student"
         )
 
-    # --- Load cert row ---
-    cert_row = None
-    try:
-        with read_conn() as conn:
-            cert_row = _get_certificate_row(conn, user_id)
-    except Exception:
-        cert_row = None
+    # --- Cert row (from the dashboard snapshot) ---
+    cert_row = snapshot.certificate
 
-    # --- Auto-upgrade once per session for existing students ---
+    # --- Auto-upgrade once per session for existing students (queued) ---
     auto_key = f"cert_autoupgrade_done_{user_id}"
     if cert_row and not st.session_state.get(auto_key, False):
         current_ver = cert_row.get("template_version")
-        resolved = _resolve_certificate_path(cert_row.get("certificate_path") or cert_row.get("path") or "")
+        resolved = resolve_certificate(cert_row)
 
         if (not current_ver) or (current_ver != EXPECTED_TEMPLATE_VERSION) or (resolved is None):
-            # force regeneration using new template/version
-            issue_certificate(user_id, _get_full_name())
-            # reload cert row
-            with read_conn() as conn:
-                cert_row = _get_certificate_row(conn, user_id)
+            # regenerate in the background instead of blocking this page
+            st.session_state["cert_job_id"] = enqueue_certificate(user_id, _get_full_name())
 
         st.session_state[auto_key] = True
 
+    # --- Background job status ---
+    job = get_latest_job(user_id)
+    job_active = bool(job and job["status"] in ACTIVE_STATUSES)
+
+    if job_active:
+        st.info("⏳ Your certificate is being prepared. This usually takes a few seconds.")
+        if st.button("🔄 Check status", key="cert_job_refresh_btn"):
+            st.rerun()
+    elif job and job["status"] == "failed" and job["id"] == st.session_state.get("cert_job_id"):
+        st.error(f"Certificate generation failed: {job.get('error') or 'unknown error'}")
+
     # --- Always show upgrade/regenerate button for everyone ---
-    if st.button("🔁 Upgrade / Regenerate Certificate (New Design)", key="regen_new_design_btn"):
-        issue_certificate(user_id, _get_full_name())
-        st.success("Certificate updated. Reloading…")
+    if st.button("🔁 Upgrade / Regenerate Certificate (New Design)", key="regen_new_design_btn", disabled=job_active):
+        st.session_state["cert_job_id"] = enqueue_certificate(user_id, _get_full_name())
+        st.success("Certificate update queued. Reloading…")
         st.rerun()
 
     # --- Download / Generate UI ---
-    raw_path = None
-    resolved_path = None
-    if cert_row:
-        for k in ["certificate_path", "file_path", "path", "pdf_path"]:
-            if cert_row.get(k):
-                raw_path = cert_row.get(k)
-                break
-        resolved_path = _resolve_certificate_path(raw_path) if raw_path else None
+    # Cached: no filesystem probe per render once the row is resolved
+    resolved_path = resolve_certificate(cert_row)
 
     if resolved_path:
         st.success("Certificate available")
-        with open(resolved_path, "rb") as f:
-            st.download_button(
-                "⬇️ Download Certificate (PDF)",
-                data=f.read(),
-                file_name=f"Chumcred_Certificate_{user.get('username','student')}.pdf",
-                mime="application/pdf",
-                key="download_certificate_btn",
-            )
-    else:
+        render_file_download(
+            "⬇️ Download Certificate (PDF)",
+            resolved_path,
+            f"Chumcred_Certificate_{user.get('username','student')}.pdf",
+            mime="application/pdf",
+            key="download_certificate_btn",
+        )
+    elif not job_active:
         st.info("Certificate not generated yet.")
-        if can_issue_certificate(user_id):
+        if snapshot.certificate_eligible:
             if st.button("Generate Certificate", key="generate_certificate_btn"):
-                issue_certificate(user_id, _get_full_name())
-                st.success("Certificate generated. Reloading…")
+                st.session_state["cert_job_id"] = enqueue_certificate(user_id, _get_full_name())
+                st.success("Certificate generation queued. Reloading…")
                 st.rerun()
 
     # =================================================
@@ -521,10 +335,7 @@ def student_router(user):
         st.markdown(username)
 
         # Count ONLY Weeks 1–6 (ignore Week 0 and any stray keys)
-        completed = 0
-        for wk in range(1, TOTAL_WEEKS + 1):
-            if progress.get(wk) == "completed":
-                completed += 1
+        completed = snapshot.completed_weeks
 
         ratio = completed / TOTAL_WEEKS
         ratio = max(0.0, min(1.0, ratio))
@@ -536,10 +347,16 @@ def student_router(user):
             st.session_state["selected_week"] = 0
             st.rerun()
 
+        label = f"📢 Announcements ({unread} new)" if unread else "📢 Announcements"
+        if st.button(label, key="student_announcements_btn"):
+            st.session_state["page"] = "announcements"
+            st.rerun()
+
         if st.button("🆘 Help & Support", key="student_help_support_btn"):
             st.session_state["page"] = "support"
             st.rerun()
 
         if st.button("🚪 Logout", key="student_logout_btn"):
+            forget_session()
             st.session_state.clear()
             st.rerun()
\ No newline at end of file
@@ -17,7 +17,8 @@ from typing import Dict, List
 
 import streamlit as st
 
-from services.db import read_conn
+from services.db import ordered_columns, read_conn
+from services.write_queue import run_write
 
 
 def _now() -> str:
@@ -32,12 +33,12 @@ def _table_exists(conn, table: str) -> bool:
     return row is not None
 
 
-def _cols(conn, table: str) -> List[str]:
-    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+def _cols(table: str) -> List[str]:
+    return list(ordered_columns(table))
 
 
 def _insert_support_ticket(conn, user: Dict, subject: str, message: str) -> int:
-    cols = _cols(conn, "support_tickets")
+    cols = _cols("support_tickets")
 
     # map schema differences
     uid_col = "user_id" if "user_id" in cols else ("student_user_id" if "student_user_id" in cols else None)
@@ -104,9 +105,7 @@ def support_page(user: Dict):
             st.stop()
 
         try:
-            with read_conn() as conn:
-                ticket_id = _insert_support_ticket(conn, user, subject.strip(), message.strip())
-                conn.commit()
+            ticket_id = run_write(_insert_support_ticket, user, subject.strip(), message.strip())
 
             st.success(f"✅ Submitted! Ticket ID: {ticket_id if ticket_id else 'created'}")
             st.rerun()
@@ -118,7 +117,7 @@ def support_page(user: Dict):
     st.markdown("### Your recent tickets")
 
     with read_conn() as conn:
-        cols = _cols(conn, "support_tickets")
+        cols = _cols("support_tickets")
         uid_col = "user_id" if "user_id" in cols else ("student_user_id" if "student_user_id" in cols else None)
         uname_col = "username" if "username" in cols else ("student_username" if "student_username" in cols else None)
 
@@ -132,7 +131,7 @@ def support_page(user: Dict):
             where_sql = f"WHERE {uname_col} = ?"
             params = [user.get("username")]
 
-        order_sql = "ORDER BY datetime(created_at) DESC" if "created_at" in cols else "ORDER BY id DESC"
+        order_sql = "ORDER BY created_ts DESC, id DESC" if "created_ts" in cols else "ORDER BY id DESC"
 
         rows = conn.execute(
             f"SELECT * FROM support_tickets {where_sql} {order_sql} LIMIT 20",